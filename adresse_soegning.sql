@@ -0,0 +1,77 @@
+-- ============================================================================
+-- ADRESSE SØGNING - Trigram-indekseret adressesøgning (autocomplete)
+-- ============================================================================
+-- Baggrund:
+--   Adressefilteret i dashboardet søger med ILIKE '%tekst%' på
+--   bbr_potentiale.adressebetegnelse og bygning_aggregat.adresse. Uden
+--   indeks skannes hele tabellen ved hver søgning.
+--
+--   pg_trgm-indekser (GIN) understøtter både ILIKE '%tekst%' (mindst 3 tegn)
+--   og trigram-lighed. soeg_adresser(tekst, antal) returnerer de bedste
+--   adresser med bygnings-ID, rangeret efter word_similarity, så også
+--   delvise og stavefejlsramte søgninger ("vestregade 12") finder adressen.
+--
+--   Funktionen er dashboardets autocomplete, men kan kaldes fra enhver
+--   klient (Grafana-variabler, psql, andre tjenester).
+--
+-- Kræver pg_trgm (contrib). Kør EFTER bygning_aggregat.sql - og igen hvis
+-- bygning_aggregat.sql køres på ny (DROP ... CASCADE fjerner indekset).
+--
+-- Latenstid før/efter: python -m benchmarks.adresse_benchmark
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- -----------------------------------------------------------------------------
+-- 1. TRIGRAM-INDEKSER
+-- -----------------------------------------------------------------------------
+CREATE INDEX IF NOT EXISTS idx_bbr_potentiale_adresse_trgm
+    ON bbr_potentiale USING GIN (adressebetegnelse gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_bygning_aggregat_adresse_trgm
+    ON bygning_aggregat USING GIN (adresse gin_trgm_ops);
+
+
+-- -----------------------------------------------------------------------------
+-- 2. FUNKTION: Top-k adresser for en søgetekst
+-- -----------------------------------------------------------------------------
+-- Kandidater findes med <% (word_similarity over
+-- pg_trgm.word_similarity_threshold, standard 0,6) via GIN-indekset.
+-- En adresse med flere enheder i samme bygning returneres én gang.
+-- Ved lige word_similarity vinder adressen der ligner hele søgeteksten mest.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION soeg_adresser(p_soegning TEXT, p_antal INTEGER DEFAULT 10)
+RETURNS TABLE (adresse TEXT, bygning_id UUID, lighed REAL) AS $$
+    SELECT
+        bp.adressebetegnelse,
+        bp.bygning,
+        word_similarity(p_soegning, bp.adressebetegnelse)
+    FROM potentialeberegner.bbr_potentiale bp
+    WHERE p_soegning <% bp.adressebetegnelse
+      AND bp.bygning IS NOT NULL
+    GROUP BY bp.adressebetegnelse, bp.bygning
+    ORDER BY word_similarity(p_soegning, bp.adressebetegnelse) DESC,
+             similarity(p_soegning, bp.adressebetegnelse) DESC,
+             bp.adressebetegnelse
+    LIMIT p_antal;
+$$ LANGUAGE sql STABLE PARALLEL SAFE;
+
+COMMENT ON FUNCTION soeg_adresser(TEXT, INTEGER) IS 'Top-k adresser med bygnings-ID rangeret efter trigram-lighed (autocomplete)';
+
+
+-- -----------------------------------------------------------------------------
+-- 3. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+-- Forslag mens der tastes
+SELECT * FROM soeg_adresser('vestergade 12', 10);
+
+-- Stavefejl
+SELECT * FROM soeg_adresser('vestregade 12 aarhus', 5);
+
+-- Tjek at indekset bruges (Bitmap Index Scan on idx_bbr_potentiale_adresse_trgm)
+EXPLAIN ANALYZE
+SELECT adressebetegnelse FROM bbr_potentiale WHERE 'vestergade 12' <% adressebetegnelse;
+*/
@@ -6,16 +6,20 @@ Version 2: Med detalje-mode for enkelt bygning
 
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
-import numpy as np
-from sqlalchemy import create_engine, text
-import folium
-from folium import plugins
-from streamlit_folium import st_folium
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+import hashlib
+import tempfile
+import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from potentialeberegner import Katalog, beregn_potentialer
+from potentialeberegner import figurer
+from potentialeberegner.data import Datalag, KORT_MAX_PUNKTER, kombo_mix, mangler_objekt
+from potentialeberegner.db import connection_string, lav_engine, pool_indstillinger
+from potentialeberegner.eksport import FORMATER, NIVEAU_TITLER, eksporter, filnavn
+from potentialeberegner.filtre import ALLE, normaliser_filter
+from potentialeberegner.resultatcache import ResultatCache
 
 # =============================================================================
 # PAGE CONFIG
@@ -32,663 +36,230 @@ st.set_page_config(
 # DATABASE CONNECTION (credentials fra Streamlit Secrets)
 # =============================================================================
 
+# Forbindelsespulje fra [pool] i secrets (se secrets.toml.template)
+POOL = pool_indstillinger(dict(st.secrets.get("pool", {})))
+
 @st.cache_resource
 def get_engine():
     """Opret database connection med credentials fra secrets"""
-    db = st.secrets["database"]
-    connection_string = f"postgresql://{db['user']}:{db['password']}@{db['host']}:{db['port']}/{db['database']}"
-    return create_engine(connection_string)
-
-def query_df(sql):
-    """Kør SQL og returner DataFrame"""
-    engine = get_engine()
-    with engine.connect() as conn:
-        return pd.read_sql(text(sql), conn)
-
-def query_gdf(sql):
-    """Kør SQL og returner GeoDataFrame"""
-    engine = get_engine()
-    with engine.connect() as conn:
-        return gpd.read_postgis(text(sql), conn, geom_col='the_geom')
+    return lav_engine(connection_string(st.secrets["database"]), **POOL)
+
+def hent_samtidig(opgaver):
+    """
+    Kør cachede hentefunktioner samtidig, så sektionerne bagefter rammer cachen.
+    opgaver er (funktion, argumenter)-par. Fejl ignoreres her - sektionen kalder
+    funktionen igen og viser selv fejlen.
+    """
+    if len(opgaver) < 2:
+        return
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=min(len(opgaver), POOL['pool_size']),
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    ) as executor:
+        wait([executor.submit(funktion, *argumenter) for funktion, argumenter in opgaver])
 
 # =============================================================================
 # CONSTANTS
 # =============================================================================
 
 SCHEMA = st.secrets.get("schema", "potentialeberegner")
-KORT_MAX_PUNKTER = 2000
-
-# Farvepalette for anvendelser
-ANVENDELSE_FARVER = {
-    'Daginstitution': '#e41a1c',
-    '(UDFASES) Daginstitution.': '#e41a1c',
-    'Grundskole': '#377eb8',
-    'Universitet': '#4daf4a',
-    'Anden enhed til undervisning og forskning': '#4daf4a',
-    'Enhed til kontor': '#984ea3',
-    '(UDFASES) Offentlig administration.': '#984ea3',
-    'Bibliotek': '#ff7f00',
-    'Forsamlingshus': '#ffff33',
-    'Anden enhed til kulturelle formål': '#a65628',
-    'Sundhedscenter, lægehus, fødeklinik mv.': '#f781bf',
-    'Svømmehal': '#00bcd4',
-    'Idrætshal': '#2196f3',
-    'Anden enhed til idrætsformål': '#03a9f4',
-    'Klubhus i forbindelse med fritid- og idræt': '#009688',
-    'Feriecenter, center til campingplads mv.': '#8bc34a',
-    'Bolig i etageejendom, flerfamiliehus eller to-familiehus': '#795548',
-    'Bolig i døgninstitution': '#9e9e9e',
-}
+# Data-caches har dataversion i nøglen og gælder til næste genberegning;
+# ttl rydder kun entries for gamle versioner ud af hukommelsen
+CACHE_TTL = 24 * 3600
+# Fliseserver (python -m potentialeberegner.fliser) - bruges til kortet uden filter
+FLISE_URL = st.secrets.get("fliser", {}).get("url")
+
+@st.cache_resource
+def get_datalag():
+    """
+    Datalaget (potentialeberegner.data) med den delte resultatcache fra
+    [resultatcache] i secrets som backend - uden den kun st.cache_data.
+    """
+    return Datalag(get_engine(), SCHEMA, cache=ResultatCache.fra_secrets(st.secrets.get("resultatcache")))
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-def get_color(anvendelse):
-    """Returner farve for anvendelse"""
-    if pd.isna(anvendelse):
-        return '#999999'
-    first_type = anvendelse.split(',')[0].strip()
-    return ANVENDELSE_FARVER.get(first_type, '#999999')
-
-def get_radius(investering):
-    """Beregn radius baseret på investering"""
-    if pd.isna(investering) or investering <= 0:
-        return 4
-    return min(4 + np.sqrt(investering) / 50, 20)
-
-@st.cache_data(ttl=300)
-def find_bygning_id(filter_type, filter_value):
-    """Find bygnings-ID baseret på filter - returnerer None hvis flere/ingen bygninger"""
-    if filter_type == 'Bygning ID':
-        return filter_value
-    elif filter_type == 'Adresse' and filter_value:
-        sql = f"""
-        SELECT DISTINCT bygning 
-        FROM {SCHEMA}.bbr_potentiale 
-        WHERE adressebetegnelse ILIKE '%{filter_value}%'
-        AND bygning IS NOT NULL
-        LIMIT 2
-        """
-        result = query_df(sql)
-        if len(result) == 1:
-            return result['bygning'].iloc[0]
-    return None
-
-def build_filter_clause(filter_type, filter_value, bygning_id=None, use_bygning_view=False):
-    """Bygger WHERE clause baseret på filter"""
-    if filter_type == 'Alle' or not filter_value:
-        return ''
+def start_visning(udstraekning, detalje_mode, filter_type, filter_value):
+    """Første kortudsnit for et filter: centrum og bbox fra udstrækningen, zoom efter filtertype"""
+    if len(udstraekning) == 0 or udstraekning['antal_bygninger'].iloc[0] == 0:
+        return None
+    u = udstraekning.iloc[0]
     
-    # Hvis vi har fundet et specifikt bygnings-ID, brug det
-    if bygning_id and filter_type in ['Adresse', 'Bygning ID']:
-        if use_bygning_view:
-            return f"AND bygning_id = '{bygning_id}'"
-        else:
-            return f"AND bp.bygning = '{bygning_id}'"
-    
-    if use_bygning_view:
-        if filter_type == 'Bygning ID':
-            return f"AND bygning_id = '{filter_value}'"
-        elif filter_type == 'Adresse':
-            return f"AND adresse ILIKE '%{filter_value}%'"
-        elif filter_type == 'Kommune':
-            return f"AND kommunekode = '{filter_value}'"
+    if detalje_mode:
+        zoom = 16
+    elif filter_type == 'Kommune' and filter_value:
+        zoom = 11
     else:
-        if filter_type == 'Bygning ID':
-            return f"AND bp.bygning = '{filter_value}'"
-        elif filter_type == 'Adresse':
-            return f"AND bp.adressebetegnelse ILIKE '%{filter_value}%'"
-        elif filter_type == 'Kommune':
-            return f"AND bp.kommunekode = '{filter_value}'"
+        zoom = 7
     
-    return ''
+    return {
+        'center': (round((u['syd'] + u['nord']) / 2, 4), round((u['vest'] + u['oest']) / 2, 4)),
+        'zoom': zoom,
+        'bbox': tuple(round(float(u[k]), 4) for k in ['vest', 'syd', 'oest', 'nord']),
+    }
+
+def kort_visning_fra(kort_state):
+    """Udsnit (center, zoom, bbox) fra st_folium's returværdi - None hvis kortet ikke har rapporteret endnu"""
+    if not kort_state or not kort_state.get('bounds') or not kort_state.get('center'):
+        return None
+    sw = kort_state['bounds'].get('_southWest') or {}
+    ne = kort_state['bounds'].get('_northEast') or {}
+    if sw.get('lat') is None or ne.get('lat') is None or kort_state.get('zoom') is None:
+        return None
+    
+    return {
+        'center': (round(kort_state['center']['lat'], 4), round(kort_state['center']['lng'], 4)),
+        'zoom': int(kort_state['zoom']),
+        'bbox': (round(sw['lng'], 4), round(sw['lat'], 4), round(ne['lng'], 4), round(ne['lat'], 4)),
+    }
+
+@st.cache_data(ttl=CACHE_TTL)
+def find_bygning_id(filter_type, filter_value, dataversion):
+    """Find bygnings-ID baseret på filter - returnerer None hvis flere/ingen bygninger"""
+    return get_datalag().find_bygning_id(normaliser_filter(filter_type, filter_value))
 
 # =============================================================================
 # CACHED DATA FUNCTIONS - OVERBLIK MODE
+# Forespørgslerne ligger i potentialeberegner.data; her caches de per proces
+# med dataversion i nøglen.
 # =============================================================================
 
-@st.cache_data(ttl=300)
-def get_filter_options():
+@st.cache_data(ttl=CACHE_TTL)
+def get_filter_options(dataversion):
     """Hent unikke kommuner med navn til filter dropdowns"""
-    # Kommune kode til navn mapping
-    kommune_navne = {
-        '0101': 'København', '0147': 'Frederiksberg', '0151': 'Ballerup', '0153': 'Brøndby',
-        '0155': 'Dragør', '0157': 'Gentofte', '0159': 'Gladsaxe', '0161': 'Glostrup',
-        '0163': 'Herlev', '0165': 'Albertslund', '0167': 'Hvidovre', '0169': 'Høje-Taastrup',
-        '0173': 'Lyngby-Taarbæk', '0175': 'Rødovre', '0183': 'Ishøj', '0185': 'Tårnby',
-        '0187': 'Vallensbæk', '0190': 'Furesø', '0201': 'Allerød', '0210': 'Fredensborg',
-        '0217': 'Helsingør', '0219': 'Hillerød', '0223': 'Hørsholm', '0230': 'Rudersdal',
-        '0240': 'Egedal', '0250': 'Frederikssund', '0253': 'Greve', '0259': 'Køge',
-        '0260': 'Halsnæs', '0265': 'Roskilde', '0269': 'Solrød', '0270': 'Gribskov',
-        '0306': 'Odsherred', '0316': 'Holbæk', '0320': 'Faxe', '0326': 'Kalundborg',
-        '0329': 'Ringsted', '0330': 'Slagelse', '0336': 'Stevns', '0340': 'Sorø',
-        '0350': 'Lejre', '0360': 'Lolland', '0370': 'Næstved', '0376': 'Guldborgsund',
-        '0390': 'Vordingborg', '0400': 'Bornholm', '0410': 'Middelfart', '0411': 'Christiansø',
-        '0420': 'Assens', '0430': 'Faaborg-Midtfyn', '0440': 'Kerteminde', '0450': 'Nyborg',
-        '0461': 'Odense', '0479': 'Svendborg', '0480': 'Nordfyns', '0482': 'Langeland',
-        '0492': 'Ærø', '0510': 'Haderslev', '0530': 'Billund', '0540': 'Sønderborg',
-        '0550': 'Tønder', '0561': 'Esbjerg', '0563': 'Fanø', '0573': 'Varde',
-        '0575': 'Vejen', '0580': 'Aabenraa', '0607': 'Fredericia', '0615': 'Horsens',
-        '0621': 'Kolding', '0630': 'Vejle', '0657': 'Herning', '0661': 'Holstebro',
-        '0665': 'Lemvig', '0671': 'Struer', '0706': 'Syddjurs', '0707': 'Norddjurs',
-        '0710': 'Favrskov', '0727': 'Odder', '0730': 'Randers', '0740': 'Silkeborg',
-        '0741': 'Samsø', '0746': 'Skanderborg', '0751': 'Aarhus', '0756': 'Ikast-Brande',
-        '0760': 'Ringkøbing-Skjern', '0766': 'Hedensted', '0773': 'Morsø', '0779': 'Skive',
-        '0787': 'Thisted', '0791': 'Viborg', '0810': 'Brønderslev', '0813': 'Frederikshavn',
-        '0820': 'Vesthimmerlands', '0825': 'Læsø', '0840': 'Rebild', '0846': 'Mariagerfjord',
-        '0849': 'Jammerbugt', '0851': 'Aalborg', '0860': 'Hjørring'
-    }
-    
-    kommuner = query_df(f"""
-        SELECT DISTINCT kommunekode 
-        FROM {SCHEMA}.bbr_potentiale 
-        WHERE kommunekode IS NOT NULL 
-        ORDER BY kommunekode
-    """)
-    
-    # Returner dict med kode som nøgle og navn som værdi
-    result = {}
-    for kode in kommuner['kommunekode'].tolist():
-        navn = kommune_navne.get(kode, f"Kommune {kode}")
-        result[kode] = f"{navn} ({kode})"
-    return result
-
-@st.cache_data(ttl=300)
-def get_adresse_options():
-    """Hent unikke adresser til dropdown (begrænset til unikke bygnings-adresser)"""
-    adresser = query_df(f"""
-        SELECT DISTINCT ON (bygning)
-            adressebetegnelse AS adresse
-        FROM {SCHEMA}.bbr_potentiale 
-        WHERE adressebetegnelse IS NOT NULL
-          AND bygning IS NOT NULL
-        ORDER BY bygning, adressebetegnelse
-        LIMIT 5000
-    """)
-    return sorted(adresser['adresse'].dropna().tolist())
+    return get_datalag().kommuner()
 
-@st.cache_data(ttl=300)
-def get_statistik(filter_clause):
-    """Hent overordnet statistik"""
-    sql = f"""
-    SELECT 
-        COUNT(DISTINCT bp.bygning) AS antal_bygninger,
-        COUNT(*) AS antal_enheder,
-        ROUND(COUNT(*)::NUMERIC / NULLIF(COUNT(DISTINCT bp.bygning), 0), 1) AS gns_enheder_per_bygning,
-        COALESCE(SUM(bp.total_antal_sensorer), 0) AS total_sensorer,
-        COALESCE(SUM(bp.samlet_investering_min_kr), 0) AS total_investering_min,
-        COALESCE(SUM(bp.samlet_investering_max_kr), 0) AS total_investering_max,
-        ROUND(COALESCE(SUM(bp.samlet_investering_max_kr), 0) / NULLIF(COUNT(DISTINCT bp.bygning), 0), 0) AS gns_investering_per_bygning
-    FROM {SCHEMA}.bbr_potentiale bp
-    WHERE bp.bygning IS NOT NULL
-    {filter_clause}
+@st.cache_resource(max_entries=1)
+def get_adresse_indeks(dataversion):
+    """
+    Alle adresser med bygning som AdresseIndeks - ét per proces, delt af alle sessioner.
+    dataversion er med i cache-nøglen, så indekset bygges igen efter en genberegning.
     """
-    return query_df(sql)
+    return get_datalag().adresse_indeks()
 
-@st.cache_data(ttl=300)
-def get_anvendelse_data(filter_clause):
-    """Hent data per anvendelse"""
-    sql = f"""
-    SELECT 
-        bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-        COUNT(DISTINCT bp.bygning) AS antal_bygninger,
-        COUNT(*) AS antal_enheder,
-        ROUND(COUNT(*)::NUMERIC / NULLIF(COUNT(DISTINCT bp.bygning), 0), 1) AS gns_enheder_per_bygning,
-        COALESCE(SUM(bp.total_antal_sensorer), 0) AS total_sensorer,
-        COALESCE(SUM(bp.samlet_investering_min_kr), 0) AS investering_min_kr,
-        COALESCE(SUM(bp.samlet_investering_max_kr), 0) AS investering_max_kr
-    FROM {SCHEMA}.bbr_potentiale bp
-    WHERE bp.bygning IS NOT NULL
-      AND bp.enh020_enhedens_anvendelse_txt IS NOT NULL
-    {filter_clause}
-    GROUP BY bp.enh020_enhedens_anvendelse_txt
-    ORDER BY investering_max_kr DESC
+def adresse_forslag(soegning, dataversion, antal=10):
+    """
+    Adresseforslag (adresse, bygning_id) fra adresseindekset i hukommelsen.
+    Uden præfiks- eller ordmatch (fx stavefejl) spørges soeg_adresser i databasen.
     """
-    return query_df(sql)
+    forslag = pd.DataFrame(get_adresse_indeks(dataversion).soeg(soegning, antal), columns=['adresse', 'bygning_id'])
+    if len(forslag) == 0 and len(soegning) >= 3:
+        try:
+            forslag = get_adresse_forslag(soegning.lower(), dataversion, antal)[['adresse', 'bygning_id']]
+        except Exception:
+            pass  # adresse_soegning.sql (pg_trgm) er ikke installeret
+    return forslag
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_adresse_forslag(soegning, dataversion, antal=10):
+    """Bedste adresser med bygnings-ID for en søgetekst (soeg_adresser i adresse_soegning.sql)"""
+    return get_datalag().soeg_adresser(soegning, antal)
+
+@st.cache_data(ttl=CACHE_TTL)
+def hent_overblik(filtr, dataversion):
+    """Overbliksdata (dict med en DataFrame per del) fra overblik_kube eller bbr_potentiale"""
+    return get_datalag().hent_overblik(filtr, dataversion)
+
+def get_statistik(filtr, dataversion):
+    """Hent overordnet statistik"""
+    return hent_overblik(filtr, dataversion)['statistik']
 
-@st.cache_data(ttl=300)
-def get_sensor_data(filter_clause):
+def get_anvendelse_data(filtr, dataversion):
+    """Hent data per anvendelse"""
+    return hent_overblik(filtr, dataversion)['anvendelse']
+
+def get_sensor_data(filtr, dataversion):
     """Hent sensor data aggregeret"""
-    sql = f"""
-    SELECT 
-        sensor_elem->>'type' AS sensor_type,
-        COUNT(DISTINCT bp.id) AS antal_enheder,
-        SUM((sensor_elem->>'antal')::INTEGER) AS total_antal_sensorer,
-        SUM((sensor_elem->>'pris_total_min')::NUMERIC) AS total_pris_min,
-        SUM((sensor_elem->>'pris_total_max')::NUMERIC) AS total_pris_max
-    FROM {SCHEMA}.bbr_potentiale bp,
-         jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-    WHERE bp.bygning IS NOT NULL
-    {filter_clause}
-    GROUP BY sensor_elem->>'type'
-    ORDER BY total_antal_sensorer DESC
-    """
-    return query_df(sql)
+    return hent_overblik(filtr, dataversion)['sensor']
 
-@st.cache_data(ttl=300)
-def get_kommune_data(filter_clause):
+def get_kommune_data(filtr, dataversion):
     """Hent kommune data"""
-    sql = f"""
-    SELECT 
-        bp.kommunekode,
-        COUNT(DISTINCT bp.bygning) AS antal_bygninger,
-        COUNT(*) AS antal_enheder,
-        COALESCE(SUM(bp.total_antal_sensorer), 0) AS total_sensorer,
-        COALESCE(SUM(bp.samlet_investering_min_kr), 0) AS investering_min_kr,
-        COALESCE(SUM(bp.samlet_investering_max_kr), 0) AS investering_max_kr
-    FROM {SCHEMA}.bbr_potentiale bp
-    WHERE bp.bygning IS NOT NULL
-      AND bp.kommunekode IS NOT NULL
-    {filter_clause}
-    GROUP BY bp.kommunekode
-    ORDER BY investering_max_kr DESC
-    """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_geodata(filter_clause_view):
-    """Hent geodata til kort"""
-    sql = f"""
-    SELECT 
-        bygning_id,
-        antal_enheder,
-        anvendelsestyper,
-        adresse,
-        kommunekode,
-        total_sensorer,
-        investering_min_kr,
-        investering_max_kr,
-        investerings_niveau,
-        the_geom,
-        latitude,
-        longitude
-    FROM {SCHEMA}.v_bygning_geomap
-    WHERE the_geom IS NOT NULL
-    {filter_clause_view}
-    LIMIT {KORT_MAX_PUNKTER}
-    """
-    return query_gdf(sql)
+    return hent_overblik(filtr, dataversion)['kommune']
 
-@st.cache_data(ttl=300)
-def get_top_bygninger(filter_clause_view):
-    """Hent top bygninger"""
-    sql = f"""
-    SELECT 
-        adresse,
-        anvendelsestyper,
-        kommunekode,
-        antal_enheder,
-        total_sensorer,
-        investering_min_kr,
-        investering_max_kr
-    FROM {SCHEMA}.v_bygning_geomap
-    WHERE 1=1
-    {filter_clause_view}
-    ORDER BY investering_max_kr DESC
-    LIMIT 20
-    """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_usecase_data(filter_clause):
+def get_usecase_data(filtr, dataversion):
     """Hent use case data aggregeret"""
-    sql = f"""
-    SELECT 
-        uc_elem->>'navn' AS use_case_navn,
-        uc_elem->>'kategori' AS kategori,
-        COUNT(DISTINCT bp.id) AS antal_enheder
-    FROM {SCHEMA}.bbr_potentiale bp,
-         jsonb_array_elements(bp.use_cases) AS uc_elem
-    WHERE bp.bygning IS NOT NULL
-    {filter_clause}
-    GROUP BY uc_elem->>'navn', uc_elem->>'kategori'
-    ORDER BY antal_enheder DESC
-    """
-    return query_df(sql)
+    return hent_overblik(filtr, dataversion)['usecase']
 
-@st.cache_data(ttl=300)
-def get_facilitet_data(filter_clause):
+def get_facilitet_data(filtr, dataversion):
     """Hent facilitet data"""
-    sql = f"""
-    SELECT 
-        bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-        COUNT(*) AS antal_enheder,
-        COALESCE(SUM(bp.antal_toiletter), 0) AS total_toiletter,
-        COALESCE(SUM(bp.antal_badevaerelser), 0) AS total_badevaerelser,
-        COALESCE(SUM(bp.antal_koekken), 0) AS total_koekken,
-        COALESCE(SUM(bp.antal_toiletter + bp.antal_badevaerelser + bp.antal_koekken), 0) AS total_faciliteter
-    FROM {SCHEMA}.bbr_potentiale bp
-    WHERE bp.enh020_enhedens_anvendelse_txt IS NOT NULL
-    {filter_clause}
-    GROUP BY bp.enh020_enhedens_anvendelse_txt
-    ORDER BY total_faciliteter DESC
-    LIMIT 15
-    """
-    return query_df(sql)
+    return hent_overblik(filtr, dataversion)['facilitet']
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_kort_udstraekning(filtr, dataversion):
+    """Hent udstrækning (WGS84) af bygninger med koordinater for filteret"""
+    return get_datalag().kort_udstraekning(filtr)
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_geodata(filtr, bbox, dataversion):
+    """Hent bygninger inden for kortudsnittet (største investering først)"""
+    return get_datalag().geodata(filtr, bbox, dataversion=dataversion)
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_kort_klynger(filtr, bbox, celle, dataversion):
+    """Hent bygninger samlet i grid-celler (celle i grader) inden for kortudsnittet"""
+    return get_datalag().kort_klynger(filtr, bbox, celle, dataversion=dataversion)
+
+def aktuel_dataversion():
+    """Dataversion til cache-nøglerne, læst én gang per kørsel af scriptet"""
+    return get_datalag().aktuel_dataversion()
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_top_bygninger(filtr, dataversion):
+    """Hent top bygninger"""
+    return get_datalag().top_bygninger(filtr, dataversion=dataversion)
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_kombo_besparelse(filtr, dataversion):
+    """Kombo-besparelse for filteret: dict med DataFrames 'kombo' og 'kommune'"""
+    return get_datalag().kombo_besparelse(filtr, dataversion=dataversion)
 
 # =============================================================================
 # CACHED DATA FUNCTIONS - DETALJE MODE (enkelt bygning)
 # =============================================================================
 
-@st.cache_data(ttl=300)
-def get_bygning_info(bygning_id):
-    """Hent detaljeret info om en enkelt bygning"""
-    sql = f"""
-    SELECT 
-        bg.bygning_id,
-        bg.adresse,
-        bg.anvendelsestyper,
-        bg.kommunekode,
-        bg.antal_enheder,
-        bg.total_sensorer,
-        bg.investering_min_kr,
-        bg.investering_max_kr,
-        bg.investerings_niveau,
-        bg.total_toiletter,
-        bg.total_badevaerelser,
-        bg.total_koekken,
-        bg.samlet_areal_m2
-    FROM {SCHEMA}.v_investering_per_bygning bg
-    WHERE bg.bygning_id = '{bygning_id}'
-    """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_sensor_usecase_breakdown(bygning_id):
-    """Hent detaljeret sensor-breakdown per use case for en bygning"""
-    sql = f"""
-    WITH bygning_sensorer AS (
-        SELECT 
-            bp.id AS enhed_id,
-            bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-            sensor_elem->>'type' AS sensor_type,
-            (sensor_elem->>'antal')::INTEGER AS antal,
-            (sensor_elem->>'pris_total_min')::NUMERIC AS pris_min,
-            (sensor_elem->>'pris_total_max')::NUMERIC AS pris_max,
-            sensor_elem->'for_use_cases' AS use_case_ids
-        FROM {SCHEMA}.bbr_potentiale bp,
-             jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-        WHERE bp.bygning = '{bygning_id}'
-    ),
-    sensor_med_usecases AS (
-        SELECT 
-            bs.sensor_type,
-            bs.antal,
-            bs.pris_min,
-            bs.pris_max,
-            uc.use_case_navn
-        FROM bygning_sensorer bs,
-             jsonb_array_elements_text(bs.use_case_ids) AS uc_id
-        JOIN {SCHEMA}.use_cases uc ON uc.id = uc_id::INTEGER
-    )
-    SELECT 
-        use_case_navn,
-        sensor_type,
-        SUM(antal) AS antal_sensorer,
-        SUM(pris_min) AS pris_min,
-        SUM(pris_max) AS pris_max
-    FROM sensor_med_usecases
-    GROUP BY use_case_navn, sensor_type
-    ORDER BY use_case_navn, antal_sensorer DESC
+@st.cache_data(ttl=CACHE_TTL)
+def get_beregnings_katalog(dataversion):
+    """Hent katalogtabellerne til what-if beregning"""
+    return get_datalag().beregnings_katalog()
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_bygning_enheder(bygning_id, dataversion):
+    """Hent BBR-input for bygningens enheder til what-if beregning"""
+    return get_datalag().bygning_enheder(bygning_id)
+
+@st.cache_resource(max_entries=1)
+def get_kombo_katalog(dataversion):
     """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_usecase_summary(bygning_id):
-    """Hent use case summary med antal enheder og sensorer for en bygning"""
-    sql = f"""
-    WITH bygning_usecases AS (
-        SELECT 
-            bp.id AS enhed_id,
-            uc_elem->>'navn' AS use_case_navn,
-            uc_elem->>'kategori' AS kategori
-        FROM {SCHEMA}.bbr_potentiale bp,
-             jsonb_array_elements(bp.use_cases) AS uc_elem
-        WHERE bp.bygning = '{bygning_id}'
-    ),
-    bygning_sensorer AS (
-        SELECT 
-            bp.id AS enhed_id,
-            sensor_elem->>'type' AS sensor_type,
-            (sensor_elem->>'antal')::INTEGER AS antal,
-            (sensor_elem->>'pris_total_min')::NUMERIC AS pris_min,
-            (sensor_elem->>'pris_total_max')::NUMERIC AS pris_max,
-            sensor_elem->'for_use_cases' AS use_case_ids
-        FROM {SCHEMA}.bbr_potentiale bp,
-             jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-        WHERE bp.bygning = '{bygning_id}'
-    ),
-    usecase_sensor_count AS (
-        SELECT 
-            uc.use_case_navn,
-            SUM(bs.antal) AS sensorer_til_usecase
-        FROM bygning_sensorer bs,
-             jsonb_array_elements_text(bs.use_case_ids) AS uc_id
-        JOIN {SCHEMA}.use_cases uc ON uc.id = uc_id::INTEGER
-        GROUP BY uc.use_case_navn
-    )
-    SELECT 
-        bu.use_case_navn,
-        bu.kategori,
-        COUNT(DISTINCT bu.enhed_id) AS antal_enheder,
-        COALESCE(usc.sensorer_til_usecase, 0) AS antal_sensorer
-    FROM bygning_usecases bu
-    LEFT JOIN usecase_sensor_count usc ON bu.use_case_navn = usc.use_case_navn
-    GROUP BY bu.use_case_navn, bu.kategori, usc.sensorer_til_usecase
-    ORDER BY antal_sensorer DESC
+    Kombo-kataloget som KomboKatalog - ét per proces, så løsninger per
+    sensor-signatur deles af alle sessioner.
     """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_sensor_summary(bygning_id):
-    """Hent sensor summary for en bygning"""
-    sql = f"""
-    SELECT 
-        sensor_elem->>'type' AS sensor_type,
-        SUM((sensor_elem->>'antal')::INTEGER) AS antal,
-        SUM((sensor_elem->>'pris_total_min')::NUMERIC) AS pris_min,
-        SUM((sensor_elem->>'pris_total_max')::NUMERIC) AS pris_max
-    FROM {SCHEMA}.bbr_potentiale bp,
-         jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-    WHERE bp.bygning = '{bygning_id}'
-    GROUP BY sensor_elem->>'type'
-    ORDER BY antal DESC
+    return get_datalag().kombo_katalog()
+
+def get_kombo_mix(sensor_df, dataversion):
+    """Bedste kombo-mix uden overlap ud fra bygningens sensor_summary"""
+    return kombo_mix(get_kombo_katalog(dataversion), sensor_df)
+
+def vis_kombo_tabel(raekker):
+    """Kombo-rækker (get_kombo_alternativer-form) som visningstabel"""
+    kombo_display = figurer.kombo_tabel(raekker)
+    st.dataframe(kombo_display, hide_index=True, use_container_width=True, height=min(350, 50 + len(kombo_display) * 35))
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=500)
+def hent_bygning(bygning_id, dataversion):
     """
-    return query_df(sql)
-
-@st.cache_data(ttl=300)
-def get_sensor_with_usecases(bygning_id):
-    """Hent sensorer med tilhørende use cases for en bygning"""
-    sql = f"""
-    WITH sensor_usecase_data AS (
-        SELECT 
-            sensor_elem->>'type' AS sensor_type,
-            (sensor_elem->>'antal')::INTEGER AS antal,
-            (sensor_elem->>'pris_total_min')::NUMERIC AS pris_min,
-            (sensor_elem->>'pris_total_max')::NUMERIC AS pris_max,
-            sensor_elem->'for_use_cases' AS use_case_ids
-        FROM {SCHEMA}.bbr_potentiale bp,
-             jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-        WHERE bp.bygning = '{bygning_id}'
-    ),
-    sensor_with_uc_names AS (
-        SELECT 
-            s.sensor_type,
-            s.antal,
-            s.pris_min,
-            s.pris_max,
-            uc.use_case_navn
-        FROM sensor_usecase_data s,
-             jsonb_array_elements_text(s.use_case_ids) AS uc_id
-        LEFT JOIN {SCHEMA}.use_cases uc ON uc.id = uc_id::INTEGER
-    )
-    SELECT 
-        sensor_type,
-        SUM(antal) AS antal,
-        SUM(pris_min) AS pris_min,
-        SUM(pris_max) AS pris_max,
-        STRING_AGG(DISTINCT use_case_navn, ', ' ORDER BY use_case_navn) AS use_cases
-    FROM sensor_with_uc_names
-    GROUP BY sensor_type
-    ORDER BY antal DESC
+    Detaljedata for en bygning: info, sensor_usecase_breakdown, usecase_summary,
+    sensor_summary, sensor_with_usecases og kombos - fra bygning_detaljer.sql,
+    eller del for del uden den. dataversion er med i cache-nøglen, så en
+    genberegning giver nye data uden at vente på ttl.
     """
-    return query_df(sql)
+    return get_datalag().hent_bygning(bygning_id)
 
-@st.cache_data(ttl=300)
-def get_kombo_alternativer(bygning_id):
-    """Hent kombo-alternativer for en bygning via database-funktion"""
-    try:
-        sql = f"SELECT {SCHEMA}.get_kombo_alternativer('{bygning_id}'::UUID) AS kombos"
-        result = query_df(sql)
-        if len(result) > 0 and result['kombos'].iloc[0]:
-            import json
-            kombos = result['kombos'].iloc[0]
-            if isinstance(kombos, str):
-                return json.loads(kombos)
-            if isinstance(kombos, list):
-                return kombos
-            return []
-        return []
-    except Exception as e:
-        # Fallback hvis funktionen ikke findes - beregn i Python
-        try:
-            return get_kombo_alternativer_fallback(bygning_id)
-        except Exception as e2:
-            # Hvis fallback også fejler, returner tom liste med fejl-info
-            return {'error': f"DB: {e}, Fallback: {e2}"}
-
-@st.cache_data(ttl=300)
-def get_kombo_alternativer_fallback(bygning_id):
-    """Fallback beregning af kombo-alternativer hvis DB-funktion ikke findes"""
-    # Hent antal sensorer per type i bygningen
-    sensor_df = get_sensor_summary(bygning_id)
-    if len(sensor_df) == 0:
-        return []
-    
-    # Hent pris per stk fra iot_sensor_types
-    try:
-        pris_sql = f"""
-        SELECT sensor_type, pris_min_kr, pris_max_kr
-        FROM {SCHEMA}.iot_sensor_types
-        """
-        pris_df = query_df(pris_sql)
-        pris_lookup = {row['sensor_type']: {'pris_min': float(row['pris_min_kr']), 'pris_max': float(row['pris_max_kr'])} 
-                       for _, row in pris_df.iterrows()}
-    except Exception:
-        return []
-    
-    # Hent aktive kombos med deres komponent-priser
-    try:
-        kombo_sql = f"""
-        SELECT 
-            k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr,
-            ARRAY_AGG(ist.sensor_type ORDER BY ist.sensor_type) AS komponenter,
-            SUM(ist.pris_min_kr) AS enkelt_pris_min,
-            SUM(ist.pris_max_kr) AS enkelt_pris_max
-        FROM {SCHEMA}.iot_sensor_kombos k
-        JOIN {SCHEMA}.kombo_komponenter kk ON kk.kombo_id = k.id
-        JOIN {SCHEMA}.iot_sensor_types ist ON ist.id = kk.sensor_type_id
-        WHERE k.aktiv = TRUE
-        GROUP BY k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr
-        """
-        kombo_df = query_df(kombo_sql)
-    except Exception:
-        return []
-    
-    if len(kombo_df) == 0:
-        return []
-    
-    # Byg sensor antal lookup (kun antal, ikke pris)
-    sensor_antal = {}
-    for _, row in sensor_df.iterrows():
-        sensor_antal[row['sensor_type']] = int(row['antal'])
-    
-    # Alias: Bevægelsessensor og Tilstedeværelsessensor er ens (PIR)
-    pir_aliases = ['Bevægelsessensor', 'Tilstedeværelsessensor']
-    pir_antal = None
-    pir_name = None
-    for alias in pir_aliases:
-        if alias in sensor_antal:
-            pir_antal = sensor_antal[alias]
-            pir_name = alias
-            break
-    
-    # Tilføj aliaser
-    if pir_antal is not None:
-        for alias in pir_aliases:
-            if alias not in sensor_antal:
-                sensor_antal[alias] = pir_antal
-    
-    alternativer = []
-    for _, kombo in kombo_df.iterrows():
-        komponenter = kombo['komponenter']
-        if komponenter is None or (hasattr(komponenter, '__len__') and len(komponenter) == 0):
-            continue
-        
-        if hasattr(komponenter, 'tolist'):
-            komponenter = komponenter.tolist()
-        elif not isinstance(komponenter, list):
-            komponenter = list(komponenter)
-        
-        # Fjern duplikater (f.eks. både Bevægelsessensor og Tilstedeværelsessensor)
-        unique_komponenter = []
-        has_pir = False
-        for k in komponenter:
-            if k in pir_aliases:
-                if not has_pir:
-                    has_pir = True
-                    unique_komponenter.append(k)
-            else:
-                unique_komponenter.append(k)
-        
-        # Tjek om alle komponenter findes i bygningen
-        matched_komponenter = []
-        all_found = True
-        for k in unique_komponenter:
-            if k in sensor_antal:
-                matched_komponenter.append(k)
-            elif k in pir_aliases and pir_antal is not None:
-                matched_komponenter.append(pir_name)
-            else:
-                all_found = False
-                break
-        
-        if not all_found or len(matched_komponenter) == 0:
-            continue
-        
-        # Antal kombos = minimum antal af alle komponenter
-        try:
-            antal = min(sensor_antal.get(k, 0) for k in matched_komponenter)
-        except (ValueError, KeyError):
-            continue
-        if antal <= 0:
-            continue
-        
-        # Beregn enkelt-pris per stk (sum af komponenternes priser fra iot_sensor_types)
-        enkelt_pris_per_stk_min = sum(pris_lookup.get(k, {'pris_min': 0})['pris_min'] for k in matched_komponenter)
-        enkelt_pris_per_stk_max = sum(pris_lookup.get(k, {'pris_max': 0})['pris_max'] for k in matched_komponenter)
-        
-        # Kombo-pris per stk
-        kombo_pris_per_stk_min = float(kombo['pris_min_kr'])
-        kombo_pris_per_stk_max = float(kombo['pris_max_kr'])
-        
-        # Vis hvis der er POTENTIEL besparelse (enkelt_max > kombo_min)
-        if enkelt_pris_per_stk_max > kombo_pris_per_stk_min:
-            alternativer.append({
-                'kombo_navn': kombo['kombo_navn'],
-                'erstatter': matched_komponenter,
-                'antal': antal,
-                'kombo_pris_min': kombo_pris_per_stk_min * antal,
-                'kombo_pris_max': kombo_pris_per_stk_max * antal,
-                'enkelt_pris_min': enkelt_pris_per_stk_min * antal,
-                'enkelt_pris_max': enkelt_pris_per_stk_max * antal,
-                'besparelse_min': (enkelt_pris_per_stk_min - kombo_pris_per_stk_max) * antal,
-                'besparelse_max': (enkelt_pris_per_stk_max - kombo_pris_per_stk_min) * antal
-            })
-    
-    alternativer.sort(key=lambda x: x['besparelse_max'], reverse=True)
-    return alternativer
+
+# Samme dataversion til alle forespørgsler i denne kørsel (også i trådpuljen)
+dataversion = aktuel_dataversion()
 
 # =============================================================================
 # SIDEBAR - FILTERS
@@ -705,12 +276,13 @@ filter_type = st.sidebar.selectbox(
 )
 
 filter_value = None
+valgt_bygning_id = None  # Bygning fra adresseforslag
 kommune_kode = None  # Til SQL queries
 selected_kommune = None  # Kommune navn til visning
 
 if filter_type == "Kommune":
     try:
-        kommuner_dict = get_filter_options()
+        kommuner_dict = get_filter_options(dataversion)
         kommune_options = [""] + list(kommuner_dict.values())
         selected_kommune = st.sidebar.selectbox("Vælg kommune", kommune_options)
         
@@ -724,16 +296,26 @@ if filter_type == "Kommune":
     except Exception as e:
         st.sidebar.error(f"Kunne ikke hente kommuner: {e}")
 elif filter_type == "Adresse":
-    try:
-        adresser = get_adresse_options()
-        filter_value = st.sidebar.selectbox(
-            "Vælg adresse", 
-            [""] + adresser,
-            help="Vælg en adresse fra listen"
-        )
-    except Exception as e:
-        st.sidebar.error(f"Kunne ikke hente adresser: {e}")
-        filter_value = st.sidebar.text_input("Søg adresse", placeholder="f.eks. Vestergade")
+    soegning = st.sidebar.text_input("Søg adresse", placeholder="f.eks. Vestergade 12").strip()
+    # Uden valgt forslag filtreres på søgeteksten (alle bygninger hvor adressen indeholder den)
+    filter_value = soegning
+    if len(soegning) >= 2:
+        try:
+            forslag = adresse_forslag(soegning, dataversion)
+            if len(forslag) > 0:
+                valgt = st.sidebar.selectbox(
+                    "Vælg adresse",
+                    [None] + list(range(len(forslag))),
+                    format_func=lambda i: "" if i is None else forslag['adresse'].iloc[i],
+                    help="Adresser der begynder med søgeteksten, eller hvor alle ord matcher"
+                )
+                if valgt is not None:
+                    filter_value = forslag['adresse'].iloc[valgt]
+                    valgt_bygning_id = str(forslag['bygning_id'].iloc[valgt])
+            else:
+                st.sidebar.caption("Ingen adresser ligner søgeteksten")
+        except Exception as e:
+            st.sidebar.error(f"Kunne ikke søge i adresser: {e}")
 elif filter_type == "Bygning ID":
     filter_value = st.sidebar.text_input("Bygning ID", placeholder="UUID")
 
@@ -742,13 +324,12 @@ bygning_id = None
 detalje_mode = False
 
 if filter_type in ['Adresse', 'Bygning ID'] and filter_value:
-    bygning_id = find_bygning_id(filter_type, filter_value)
+    bygning_id = valgt_bygning_id or find_bygning_id(filter_type, filter_value, dataversion)
     if bygning_id:
         detalje_mode = True
 
-# Byg filter clauses
-filter_clause = build_filter_clause(filter_type, filter_value, bygning_id, use_bygning_view=False)
-filter_clause_view = build_filter_clause(filter_type, filter_value, bygning_id, use_bygning_view=True)
+# Normaliseret filter - cache-nøgle og bundne parametre i alle forespørgsler
+filtr = normaliser_filter(filter_type, filter_value, bygning_id)
 
 # Filter beskrivelse
 if filter_type == "Alle":
@@ -787,6 +368,46 @@ else:
     show_faciliteter = st.sidebar.checkbox("Faciliteter", value=True)
     show_sensor_usecase_breakdown = False
 
+st.sidebar.divider()
+
+st.sidebar.header("📥 Eksport")
+eksport_niveau = st.sidebar.selectbox("Niveau", list(NIVEAU_TITLER), format_func=NIVEAU_TITLER.get)
+eksport_format = st.sidebar.selectbox("Format", list(FORMATER), format_func=str.upper)
+if st.sidebar.button("Forbered eksport", help="Eksporterer det aktuelle filter"):
+    # Rækkerne streames fra databasen direkte til en midlertidig fil;
+    # download-knappen læser filen, som slettes bagefter
+    try:
+        with st.spinner(f"Eksporterer {NIVEAU_TITLER[eksport_niveau].lower()}..."), tempfile.TemporaryFile() as fil:
+            antal_raekker = eksporter(get_engine(), eksport_niveau, filtr, eksport_format, fil, SCHEMA)
+            fil.seek(0)
+            st.sidebar.download_button(
+                f"⬇️ Hent {antal_raekker:,} rækker",
+                data=fil,
+                file_name=filnavn(eksport_niveau, filtr, eksport_format),
+                mime=FORMATER[eksport_format][1],
+            )
+    except Exception as e:
+        st.sidebar.error(f"Eksport fejlede: {e}")
+
+# Hent data til de valgte sektioner samtidig (én forbindelse per forespørgsel),
+# så siden venter på den langsomste forespørgsel og ikke summen af dem
+if detalje_mode:
+    # Hele detaljevisningen kommer i ét kald (bygning_detaljer)
+    opgaver = []
+    if show_statistik or show_sensorer or show_use_cases or show_faciliteter or show_sensor_usecase_breakdown:
+        opgaver.append((hent_bygning, (bygning_id, dataversion)))
+else:
+    opgaver = []
+    if show_statistik or show_anvendelse or show_sensorer or show_kommuner or show_use_cases or show_faciliteter:
+        opgaver.append((hent_overblik, (filtr, dataversion)))
+    if show_top_bygninger:
+        opgaver.append((get_top_bygninger, (filtr, dataversion)))
+    if show_statistik or show_kommuner:
+        opgaver.append((get_kombo_besparelse, (filtr, dataversion)))
+if show_kort:
+    opgaver.append((get_kort_udstraekning, (filtr, dataversion)))
+hent_samtidig(opgaver)
+
 # =============================================================================
 # MAIN CONTENT
 # =============================================================================
@@ -829,7 +450,7 @@ if detalje_mode and show_statistik:
     st.caption("Samlet oversigt over bygningen med faciliteter, sensorbehov og investeringsmuligheder.")
     
     try:
-        bygning_info = get_bygning_info(bygning_id)
+        bygning_info = hent_bygning(bygning_id, dataversion)['info']
         
         if len(bygning_info) > 0:
             info = bygning_info.iloc[0]
@@ -884,23 +505,11 @@ if detalje_mode and show_sensorer:
     
     try:
         # Hent breakdown data og aggreger til unikke sensortyper
-        breakdown_df = get_sensor_usecase_breakdown(bygning_id)
+        breakdown_df = hent_bygning(bygning_id, dataversion)['sensor_usecase_breakdown']
         
         if len(breakdown_df) > 0:
             # Aggreger til unikke sensortyper (MAX antal per type, da samme sensor bruges til flere use cases)
-            # Priserne i breakdown_df er ALLEREDE totaler, så vi skal ikke gange igen
-            sensor_summary = breakdown_df.groupby('sensor_type').agg({
-                'antal_sensorer': 'max',  # MAX fordi samme sensor bruges til flere use cases
-                'pris_min': 'max',        # MAX af totalpris (da den allerede er antal × stykpris)
-                'pris_max': 'max',        # MAX af totalpris
-                'use_case_navn': lambda x: ', '.join(sorted(set(x)))
-            }).reset_index()
-            
-            sensor_summary.columns = ['Sensortype', 'Antal', 'Pris total min', 'Pris total max', 'Use cases']
-            sensor_summary['Pris (min-max)'] = sensor_summary.apply(
-                lambda r: f"{r['Pris total min']:,.0f} - {r['Pris total max']:,.0f} kr", axis=1
-            )
-            sensor_summary = sensor_summary.sort_values('Antal', ascending=False)
+            sensor_summary = figurer.sensor_oversigt(breakdown_df)
             
             # Hovedtabel
             st.dataframe(
@@ -927,6 +536,39 @@ if detalje_mode and show_sensorer:
             *Se "Kombo-sensorer" nedenfor for lavere investering.*
             """)
             
+            # What-if: genberegn lokalt med ændrede priser/sensortyper (ingen DB-genberegning)
+            with st.expander("🧮 What-if beregning", expanded=False):
+                katalog = get_beregnings_katalog(dataversion)
+                sensor_typer = katalog.sensor_typer[katalog.sensor_typer['aktiv']]
+                fravalgte = st.multiselect(
+                    "Fravælg sensortyper",
+                    options=sorted(sensor_typer['sensor_type']),
+                    key="whatif_fravalgte"
+                )
+                pris_faktor = st.slider(
+                    "Prisjustering (%)", min_value=50, max_value=150, value=100, step=5,
+                    key="whatif_pris"
+                ) / 100
+                
+                justerede = katalog.sensor_typer.copy()
+                justerede.loc[justerede['sensor_type'].isin(fravalgte), 'aktiv'] = False
+                justerede['pris_min_kr'] = justerede['pris_min_kr'] * pris_faktor
+                justerede['pris_max_kr'] = justerede['pris_max_kr'] * pris_faktor
+                whatif_katalog = Katalog(
+                    use_cases=katalog.use_cases,
+                    sensor_typer=justerede,
+                    use_case_sensor=katalog.use_case_sensor,
+                    anvendelse_use_case=katalog.anvendelse_use_case,
+                )
+                
+                whatif = beregn_potentialer(get_bygning_enheder(bygning_id, dataversion), whatif_katalog, som_json=False)
+                
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Sensorer", f"{whatif['total_antal_sensorer'].sum():,.0f}")
+                col2.metric("Investering min", f"{whatif['samlet_investering_min_kr'].sum():,.0f} kr")
+                col3.metric("Investering max", f"{whatif['samlet_investering_max_kr'].sum():,.0f} kr")
+                st.caption("Beregnet lokalt ud fra katalogtabellerne – databasen opdateres ikke.")
+            
         else:
             st.info("Ingen sensordata fundet")
             
@@ -943,17 +585,19 @@ if detalje_mode and show_statistik:
     st.caption("Kombinationssensorer dækker flere funktioner i én enhed og giver lavere samlet investering.")
     
     try:
-        kombos = get_kombo_alternativer(bygning_id)
+        bygning = hent_bygning(bygning_id, dataversion)
+        kombos = bygning['kombos']
         
         if isinstance(kombos, dict) and 'error' in kombos:
             st.warning(f"Kombo-beregning fejlede: {kombos['error']}")
             st.caption("Kør `kombo_sensorer.sql` i databasen for at aktivere.")
         elif kombos and len(kombos) > 0:
-            # Beregn samlet investering for kombo-sensorer
-            total_kombo_min = sum(k['kombo_pris_min'] for k in kombos)
-            total_kombo_max = sum(k['kombo_pris_max'] for k in kombos)
-            total_besparelse = sum(k['besparelse_max'] for k in kombos)
-            antal_kombos = len(kombos)
+            # Bedste mix uden overlap - her kan besparelserne summeres
+            mix = get_kombo_mix(bygning['sensor_summary'], dataversion)
+            total_kombo_min = sum(k['kombo_pris_min'] for k in mix)
+            total_kombo_max = sum(k['kombo_pris_max'] for k in mix)
+            total_besparelse = sum(k['besparelse_max'] for k in mix)
+            antal_kombos = sum(k['antal'] for k in mix)
             
             # Fremhævet investerings-boks
             st.markdown("""
@@ -978,33 +622,25 @@ if detalje_mode and show_statistik:
             - **Besparelse**: Hvad du sparer vs. at købe enkelt-sensorer
             """)
             
-            # Kombo tabel MED erstatter-info
-            kombo_df = pd.DataFrame(kombos)
-            
-            # Tilføj "Erstatter" kolonne fra 'erstatter' listen
-            kombo_df['Erstatter'] = kombo_df['erstatter'].apply(
-                lambda x: ', '.join(x) if isinstance(x, list) else str(x)
-            )
-            
-            kombo_display = kombo_df[['kombo_navn', 'antal', 'Erstatter', 'enkelt_pris_max', 'kombo_pris_max', 'besparelse_max']].copy()
-            kombo_display.columns = ['Kombo-sensor', 'Antal', 'Erstatter (sensortyper)', 'Enkelt-pris', 'Kombo-pris', 'Besparelse']
-            kombo_display['Enkelt-pris'] = kombo_display['Enkelt-pris'].apply(lambda x: f"{x:,.0f} kr")
-            kombo_display['Kombo-pris'] = kombo_display['Kombo-pris'].apply(lambda x: f"{x:,.0f} kr")
-            kombo_display['Besparelse'] = kombo_display['Besparelse'].apply(lambda x: f"{x:,.0f} kr")
+            if mix:
+                vis_kombo_tabel(mix)
+                
+                # Samlet besparelse med mere detalje
+                kombo_liste = ', '.join([f"{k['kombo_navn']} ({k['antal']} stk)" for k in mix])
+                st.success(f"""
+                💰 **Samlet potentiel besparelse:** {total_besparelse:,.0f} kr  
+                *Ved at bruge: {kombo_liste}*
+                """)
+            else:
+                st.info("Ingen kombination af kombo-sensorer er billigere end enkelt-sensorer ved middelpriser. Se alternativerne nedenfor.")
             
-            st.dataframe(kombo_display, hide_index=True, use_container_width=True, height=min(350, 50 + len(kombo_display) * 35))
-            
-            # Samlet besparelse med mere detalje
-            kombo_liste = ', '.join([f"{k['kombo_navn']} ({k['antal']} stk)" for k in kombos])
-            st.success(f"""
-            💰 **Samlet potentiel besparelse:** {total_besparelse:,.0f} kr  
-            *Ved at bruge: {kombo_liste}*
-            """)
+            with st.expander(f"Alle kombo-alternativer hver for sig ({len(kombos)})"):
+                vis_kombo_tabel(kombos)
             
             # Forklaring
             with st.expander("⚠️ Vigtigt om besparelsesberegningen"):
                 st.markdown("""
-                **Hvorfor kan besparelserne ikke altid summeres direkte?**
+                **Hvorfor kan alternativerne ikke summeres direkte?**
                 
                 Flere kombo-sensorer kan indeholde de samme sensortyper. For eksempel:
                 - "Temperatur + Luftfugtighed" indeholder temperaturføler
@@ -1012,7 +648,9 @@ if detalje_mode and show_statistik:
                 
                 Hvis du vælger begge, får du **to** temperaturfølere – men har måske kun brug for **én**.
                 
-                **Anbefaling:** Vælg den kombo-sensor der bedst matcher dit behov, eller kontakt en rådgiver.
+                **Anbefalingen** ovenfor er derfor det mix af kombo-sensorer, hvor hver sensor i bygningen
+                højst dækkes af én kombo, og som giver den største samlede besparelse (beregnet ud fra
+                middelpriserne). Resten købes som enkelt-sensorer.
                 """)
         else:
             # Ingen kombo-sensorer matcher
@@ -1039,13 +677,11 @@ if detalje_mode and show_use_cases:
     st.caption("IoT use cases identificeret for bygningen.")
     
     try:
-        usecase_df = get_usecase_summary(bygning_id)
+        usecase_df = hent_bygning(bygning_id, dataversion)['usecase_summary']
         
         if len(usecase_df) > 0:
             # Aggreger til unikke use cases (fjern sensor-dubletter)
-            usecase_summary = usecase_df.groupby(['use_case_navn', 'kategori']).agg({
-                'antal_enheder': 'first'
-            }).reset_index()
+            usecase_summary = figurer.usecase_oversigt(usecase_df)
             
             # Vis tabel direkte (uden graf med misvisende sensor-tal)
             st.markdown("""
@@ -1082,27 +718,10 @@ if detalje_mode and show_sensor_usecase_breakdown:
     st.caption("Viser hvilke sensorer der bruges til hvilke use cases. Samme sensor kan dække flere use cases.")
     
     try:
-        breakdown_df = get_sensor_usecase_breakdown(bygning_id)
+        breakdown_df = hent_bygning(bygning_id, dataversion)['sensor_usecase_breakdown']
         
         if len(breakdown_df) > 0:
-            # Pivot tabel med MAX (ikke sum, da samme sensor bruges til flere)
-            pivot_df = breakdown_df.pivot_table(
-                index='use_case_navn',
-                columns='sensor_type',
-                values='antal_sensorer',
-                fill_value=0,
-                aggfunc='max'  # MAX fordi samme sensor bruges til flere use cases
-            )
-            
-            # Heatmap
-            fig_heatmap = px.imshow(
-                pivot_df,
-                labels=dict(x="Sensortype", y="Use Case", color="Antal"),
-                title="Sensor/Use Case Matrix",
-                color_continuous_scale='Blues',
-                aspect='auto'
-            )
-            fig_heatmap.update_layout(height=500)
+            fig_heatmap = figurer.sensor_usecase_matrix(breakdown_df)
             st.plotly_chart(fig_heatmap, use_container_width=True)
             
         else:
@@ -1132,7 +751,7 @@ if not detalje_mode and show_statistik:
         st.caption("Aggregerede nøgletal for alle bygninger i det valgte filter.")
     
     try:
-        statistik = get_statistik(filter_clause)
+        statistik = get_statistik(filtr, dataversion)
         
         # Hovedtal i fremhævet boks
         st.markdown("""
@@ -1165,9 +784,39 @@ if not detalje_mode and show_statistik:
         Tallene viser hvad det ville koste, hvis hver sensortype købes individuelt.
         
         **Lavere investering mulig:** Ved at bruge **kombo-sensorer** (kombinationssensorer) kan den samlede investering 
-        reduceres væsentligt. Vælg en specifik adresse i menuen for at se konkrete kombo-sensorer og besparelsesmuligheder.
+        reduceres væsentligt – se besparelsen for hele porteføljen nedenfor. Vælg en specifik adresse for at se de konkrete kombo-sensorer til den bygning.
         """)
         
+        # Samlet kombo-besparelse (kombo_batch.sql) - bedste kombo per bygning
+        try:
+            kombo_df = get_kombo_besparelse(filtr, dataversion)['kombo']
+        except Exception as e:
+            if not mangler_objekt(e):
+                st.error(f"Kunne ikke hente kombo-besparelse: {e}")
+            kombo_df = pd.DataFrame()  # kombo_batch.sql er ikke installeret
+        
+        if len(kombo_df) > 0:
+            st.markdown("""
+            <div style="background: #e8f5e9; padding: 15px; border-radius: 8px; 
+                        border-left: 4px solid #2e7d32; margin-bottom: 15px;">
+                <p style="margin: 0; color: #1b5e20; font-weight: bold;">✅ Besparelse med kombo-sensorer</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            col_k1, col_k2, col_k3 = st.columns(3)
+            with col_k1:
+                st.metric("Bygninger med kombo-mulighed", f"{kombo_df['antal_bygninger'].sum():,.0f}")
+            with col_k2:
+                st.metric("Antal kombo-sensorer", f"{kombo_df['antal_kombos'].sum():,.0f}")
+            with col_k3:
+                besparelse_max = kombo_df['besparelse_max'].sum()
+                st.metric("Besparelse (bedste enkelte alternativ)", f"{besparelse_max:,.0f} kr", delta=f"-{besparelse_max:,.0f} kr")
+            
+            kombo_display = figurer.kombo_besparelse_tabel(kombo_df)
+            st.dataframe(kombo_display, hide_index=True, use_container_width=True)
+            st.caption("Besparelsen er det bedste enkelte kombo-alternativ per bygning, da alternativerne erstatter de samme sensorer. "
+                       "Detaljevisningen for en adresse viser i stedet det mix af kombo-sensorer, der ikke overlapper, og kan derfor vise en større besparelse.")
+        
         # Info om kombo-sensorer
         with st.expander("ℹ️ Hvad er en kombo-sensor?", expanded=False):
             st.markdown("""
@@ -1183,7 +832,7 @@ if not detalje_mode and show_statistik:
             - ✅ Færre enheder at installere og vedligeholde
             - ✅ Samme funktionalitet som enkelt-sensorer
             
-            Vælg en specifik adresse for at se tilgængelige kombo-sensorer.
+            Besparelsen for de valgte bygninger ses ovenfor; vælg en specifik adresse for at se de kombo-sensorer, der passer til bygningen.
             """)
             
     except Exception as e:
@@ -1198,34 +847,17 @@ if not detalje_mode and show_anvendelse:
     st.caption("Fordeling af investeringsbehov på tværs af bygningsanvendelser (skoler, institutioner, boliger mv.).")
     
     try:
-        anvendelse_df = get_anvendelse_data(filter_clause)
+        anvendelse_df = get_anvendelse_data(filtr, dataversion)
         
         if len(anvendelse_df) > 0:
             col1, col2 = st.columns(2)
             
             with col1:
-                fig_bar = px.bar(
-                    anvendelse_df.head(15),
-                    x='investering_max_kr',
-                    y='anvendelse',
-                    orientation='h',
-                    title='Investering per anvendelsestype (Top 15)',
-                    labels={'investering_max_kr': 'Investering (max kr)', 'anvendelse': 'Anvendelse'},
-                    color='antal_bygninger',
-                    color_continuous_scale='Blues'
-                )
-                fig_bar.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+                fig_bar = figurer.anvendelse_investering(anvendelse_df)
                 st.plotly_chart(fig_bar, width="stretch")
             
             with col2:
-                fig_pie = px.pie(
-                    anvendelse_df.head(10),
-                    values='antal_bygninger',
-                    names='anvendelse',
-                    title='Fordeling af bygninger (Top 10)',
-                    hole=0.4
-                )
-                fig_pie.update_layout(height=500)
+                fig_pie = figurer.anvendelse_fordeling(anvendelse_df)
                 st.plotly_chart(fig_pie, width="stretch")
         else:
             st.info("Ingen data fundet for dette filter")
@@ -1242,20 +874,10 @@ if not detalje_mode and show_sensorer:
     st.caption("De mest anvendte sensortyper på tværs af alle bygninger i filteret.")
     
     try:
-        sensor_df = get_sensor_data(filter_clause)
+        sensor_df = get_sensor_data(filtr, dataversion)
         
         if len(sensor_df) > 0:
-            fig_sensor = px.bar(
-                sensor_df.head(15),
-                x='total_antal_sensorer',
-                y='sensor_type',
-                orientation='h',
-                title='Mest anvendte sensortyper (Top 15)',
-                labels={'total_antal_sensorer': 'Antal sensorer', 'sensor_type': 'Sensortype'},
-                color='total_pris_max',
-                color_continuous_scale='Oranges'
-            )
-            fig_sensor.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+            fig_sensor = figurer.sensortyper(sensor_df)
             st.plotly_chart(fig_sensor, width="stretch")
         else:
             st.info("Ingen sensordata fundet")
@@ -1272,20 +894,21 @@ if not detalje_mode and show_kommuner:
     st.caption("Investeringsbehov fordelt på kommuner.")
     
     try:
-        kommune_df = get_kommune_data(filter_clause)
+        kommune_df = get_kommune_data(filtr, dataversion)
         
         if len(kommune_df) > 0:
-            fig_kommune = px.bar(
-                kommune_df.head(20),
-                x='kommunekode',
-                y='investering_max_kr',
-                title='Investering per kommune (Top 20)',
-                labels={'investering_max_kr': 'Investering (max kr)', 'kommunekode': 'Kommune'},
-                color='antal_bygninger',
-                color_continuous_scale='Greens'
-            )
-            fig_kommune.update_layout(height=400)
+            fig_kommune = figurer.kommune_investering(kommune_df)
             st.plotly_chart(fig_kommune, width="stretch")
+            
+            try:
+                kombo_kommune_df = get_kombo_besparelse(filtr, dataversion)['kommune']
+            except Exception as e:
+                if not mangler_objekt(e):
+                    st.error(f"Kunne ikke hente kombo-besparelse: {e}")
+                kombo_kommune_df = pd.DataFrame()  # kombo_batch.sql er ikke installeret
+            if len(kombo_kommune_df) > 0:
+                fig_kombo = figurer.kombo_per_kommune(kombo_kommune_df)
+                st.plotly_chart(fig_kombo, width="stretch")
         else:
             st.info("Ingen kommunedata fundet")
             
@@ -1298,84 +921,71 @@ if not detalje_mode and show_kommuner:
 
 if show_kort:
     st.header("🗺️ Kort over bygninger")
-    st.caption("Geografisk visning af bygninger. Markørernes størrelse viser investeringspotentialet – større markør = højere investering. Klik for detaljer.")
+    st.caption("Geografisk visning af bygninger. Markørernes størrelse viser investeringspotentialet – større markør = højere investering. Klik for detaljer. Ved lav zoom samles bygningerne i klynger med summeret investering.")
     
     try:
-        gdf = get_geodata(filter_clause_view)
+        # Kortudsnittet gemmes i session_state, så hver panorering/zoom kun henter det synlige område.
+        # Nyt filter nulstiller udsnittet til filterets udstrækning.
+        # Kortkomponenten får en nøgle per filter, så et gammelt udsnit ikke genbruges.
+        kort_noegle = 'bygningskort_' + hashlib.md5(str(filtr).encode()).hexdigest()[:8]
+        if st.session_state.get('kort_filter') != filtr:
+            st.session_state['kort_filter'] = filtr
+            st.session_state['kort_visning'] = start_visning(
+                get_kort_udstraekning(filtr, dataversion), detalje_mode, filter_type, filter_value
+            )
+        else:
+            # Seneste udsnit fra kortkomponenten (bounds/zoom efter panorering)
+            seneste = kort_visning_fra(st.session_state.get(kort_noegle))
+            if seneste is not None:
+                st.session_state['kort_visning'] = seneste
         
-        if len(gdf) > 0:
-            # Konverter til WGS84
-            gdf = gdf.to_crs(epsg=4326)
-            
-            # Beregn center
-            center_lat = gdf.geometry.centroid.y.mean()
-            center_lon = gdf.geometry.centroid.x.mean()
-            
-            # Juster zoom baseret på filter
-            if detalje_mode:
-                zoom = 16
-            elif filter_type == 'Kommune' and filter_value:
-                zoom = 11
-            else:
-                zoom = 7
+        visning = st.session_state['kort_visning']
+        
+        if visning is not None:
+            # folium og streamlit_folium indlæses først, når kortet tegnes
+            import folium
+            from streamlit_folium import st_folium
+            from potentialeberegner.kort import KLYNGE_ZOOM, bygningslag, flise_lag, klynge_celle, klyngelag
             
-            # Opret kort
             m = folium.Map(
-                location=[center_lat, center_lon],
-                zoom_start=zoom,
-                tiles='CartoDB positron'
+                location=list(visning['center']),
+                zoom_start=visning['zoom'],
+                tiles='CartoDB positron',
+                prefer_canvas=True
             )
             
-            # Tilføj markers med forbedret popup
-            for idx in range(len(gdf)):
-                row = gdf.iloc[idx]
-                geom = gdf.geometry.iloc[idx]
-                
-                if geom is None:
-                    continue
-                
-                if geom.geom_type == 'Point':
-                    lat, lon = geom.y, geom.x
-                else:
-                    centroid = geom.centroid
-                    lat, lon = centroid.y, centroid.x
-                
-                color = get_color(row['anvendelsestyper'])
-                radius = get_radius(row['investering_max_kr'])
-                
-                # Forbedret popup med mere info
-                popup_html = f"""
-                <div style="min-width: 250px;">
-                    <h4 style="margin: 0 0 10px 0;">{row['adresse'] or 'Ukendt adresse'}</h4>
-                    <table style="width: 100%; font-size: 12px;">
-                        <tr><td><b>Anvendelse:</b></td><td>{row['anvendelsestyper']}</td></tr>
-                        <tr><td><b>Kommune:</b></td><td>{row['kommunekode']}</td></tr>
-                        <tr><td><b>Enheder:</b></td><td>{row['antal_enheder']:,.0f}</td></tr>
-                        <tr><td><b>Sensorer:</b></td><td>{row['total_sensorer']:,.0f}</td></tr>
-                        <tr><td><b>Investering:</b></td><td>{row['investering_min_kr']:,.0f} - {row['investering_max_kr']:,.0f} kr</td></tr>
-                        <tr><td><b>Niveau:</b></td><td>{row['investerings_niveau']}</td></tr>
-                    </table>
-                    <p style="margin: 10px 0 0 0; font-size: 10px; color: #666;">
-                        Bygning ID: {str(row['bygning_id'])[:8]}...
-                    </p>
-                </div>
-                """
-                
-                folium.CircleMarker(
-                    location=[lat, lon],
-                    radius=radius,
-                    color=color,
-                    fill=True,
-                    fillColor=color,
-                    fillOpacity=0.7,
-                    weight=1,
-                    popup=folium.Popup(popup_html, max_width=350)
-                ).add_to(m)
+            brug_fliser = bool(FLISE_URL) and filtr == ALLE
+            if brug_fliser:
+                # Uden filter: alle bygninger som vektorfliser, som browseren henter selv
+                flise_lag(FLISE_URL, dataversion).add_to(m)
+                beskrivelse = "Viser alle bygninger som vektorfliser"
+            elif visning['zoom'] < KLYNGE_ZOOM:
+                # Lav zoom: grid-klynger med summeret investering beregnet i databasen
+                klynge_df = get_kort_klynger(filtr, visning['bbox'], klynge_celle(visning['zoom']), dataversion)
+                klyngelag(klynge_df).add_to(m)
+                beskrivelse = (f"Viser {klynge_df['antal_bygninger'].sum():,.0f} bygninger samlet i "
+                               f"{len(klynge_df):,} klynger – zoom ind for enkelte bygninger")
+            else:
+                # Høj zoom: enkelte bygninger i udsnittet
+                geo_df = get_geodata(filtr, visning['bbox'], dataversion)
+                bygningslag(geo_df).add_to(m)
+                beskrivelse = f"Viser {len(geo_df):,} bygninger i udsnittet"
+                if len(geo_df) == KORT_MAX_PUNKTER:
+                    beskrivelse += f" (de {KORT_MAX_PUNKTER:,} med størst investering)"
             
-            # Vis kort
-            st_folium(m, height=500, width=None)
+            # Vis kort og returner udsnittet, så næste kørsel henter det nye område
+            kort_state = st_folium(
+                m, height=500, width=None, key=kort_noegle,
+                returned_objects=['bounds', 'zoom', 'center']
+            )
+            st.caption(beskrivelse)
             
-            st.caption(f"Viser {len(gdf)} bygninger (max {KORT_MAX_PUNKTER})")
+            ny_visning = kort_visning_fra(kort_state)
+            if ny_visning is not None and ny_visning != visning:
+                st.session_state['kort_visning'] = ny_visning
+                # Fliselaget henter selv nye områder - kun punkter/klynger kræver ny kørsel
+                if not brug_fliser:
+                    st.rerun()
         else:
             st.info("Ingen bygninger med geometri fundet")
             
@@ -1391,7 +1001,7 @@ if not detalje_mode and show_top_bygninger:
     st.caption("Bygninger med størst investeringspotentiale sorteret efter maksimal investering.")
     
     try:
-        top_df = get_top_bygninger(filter_clause_view)
+        top_df = get_top_bygninger(filtr, dataversion)
         
         if len(top_df) > 0:
             # Formater tal
@@ -1401,6 +1011,7 @@ if not detalje_mode and show_top_bygninger:
             st.dataframe(
                 top_df,
                 column_config={
+                    "bygning_id": None,
                     "adresse": "Adresse",
                     "anvendelsestyper": "Anvendelse",
                     "kommunekode": "Kommune",
@@ -1427,20 +1038,10 @@ if not detalje_mode and show_use_cases:
     st.caption("De mest anvendte IoT use cases på tværs af alle bygninger.")
     
     try:
-        usecase_df = get_usecase_data(filter_clause)
+        usecase_df = get_usecase_data(filtr, dataversion)
         
         if len(usecase_df) > 0:
-            fig_usecase = px.bar(
-                usecase_df.head(15),
-                x='antal_enheder',
-                y='use_case_navn',
-                orientation='h',
-                title='Mest anvendte use cases (Top 15)',
-                labels={'antal_enheder': 'Antal enheder', 'use_case_navn': 'Use case'},
-                color='kategori',
-                color_discrete_sequence=px.colors.qualitative.Set2
-            )
-            fig_usecase.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+            fig_usecase = figurer.use_cases(usecase_df)
             st.plotly_chart(fig_usecase, width="stretch")
         else:
             st.info("Ingen use case data fundet")
@@ -1459,7 +1060,7 @@ if show_faciliteter:
     try:
         if detalje_mode:
             # Enkelt bygning - vis simpel oversigt
-            bygning_info = get_bygning_info(bygning_id)
+            bygning_info = hent_bygning(bygning_id, dataversion)['info']
             if len(bygning_info) > 0:
                 info = bygning_info.iloc[0]
                 
@@ -1472,41 +1073,10 @@ if show_faciliteter:
                     st.metric("🍳 Køkkener", f"{info['total_koekken']:,.0f}")
         else:
             # Overblik - vis graf
-            facilitet_df = get_facilitet_data(filter_clause)
+            facilitet_df = get_facilitet_data(filtr, dataversion)
             
             if len(facilitet_df) > 0:
-                fig_facilitet = go.Figure()
-                
-                fig_facilitet.add_trace(go.Bar(
-                    name='Toiletter',
-                    x=facilitet_df['anvendelse'],
-                    y=facilitet_df['total_toiletter'],
-                    marker_color='#2196f3'
-                ))
-                
-                fig_facilitet.add_trace(go.Bar(
-                    name='Badeværelser',
-                    x=facilitet_df['anvendelse'],
-                    y=facilitet_df['total_badevaerelser'],
-                    marker_color='#4caf50'
-                ))
-                
-                fig_facilitet.add_trace(go.Bar(
-                    name='Køkkener',
-                    x=facilitet_df['anvendelse'],
-                    y=facilitet_df['total_koekken'],
-                    marker_color='#ff9800'
-                ))
-                
-                fig_facilitet.update_layout(
-                    barmode='stack',
-                    title='Faciliteter per anvendelsestype',
-                    xaxis_title='Anvendelse',
-                    yaxis_title='Antal',
-                    height=450,
-                    xaxis_tickangle=-45
-                )
-                
+                fig_facilitet = figurer.faciliteter(facilitet_df)
                 st.plotly_chart(fig_facilitet, width="stretch")
             else:
                 st.info("Ingen facilitetdata fundet")
@@ -0,0 +1,344 @@
+-- ============================================================================
+-- BATCH-BEREGNING - Mængdebaseret genberegning af alle potentialer
+-- ============================================================================
+-- Baggrund:
+--   update_all_potentialer() kalder update_enhed_potentiale() én gang per
+--   enhed, som igen kalder get_use_cases_for_anvendelse() og
+--   get_sensors_with_quantities(). Ved et landsdækkende datasæt tager det
+--   flere timer efter hver prisændring.
+--
+--   Denne fil beregner use cases, sensorer, antal og investering for alle
+--   enheder i få store statements. Use cases og sensor-skabeloner beregnes
+--   én gang per anvendelsestekst (katalog-størrelse), og kun sensorantallet
+--   beregnes per enhed.
+--
+--   Resultatet er det samme som get_sensors_with_quantities() fra
+--   patch_co2_500m2.sql (SUM af antal, areal_per_500m2, sorteret efter antal).
+--   Bemærk: patchen opretter en NUMERIC-overload, så update_enhed_potentiale()
+--   (som sender areal som INTEGER) stadig rammer den oprindelige version.
+--
+-- Kør EFTER potentialeberegner_v2.sql og evt. patches.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. FUNKTION: Mængdebaseret beregning for alle (eller udvalgte) enheder
+-- -----------------------------------------------------------------------------
+-- p_ids = NULL beregner alle enheder, ellers kun de angivne id'er.
+-- p_anvendelser begrænser til enheder med de angivne anvendelsestekster
+-- (bruges af den inkrementelle genberegning i inkrementel_beregning.sql).
+-- p_kommunekode begrænser til én kommune. Med partitionering.sql rører
+-- beregningen så kun kommunens partition; planen laves derfor for de
+-- konkrete argumenter (plan_cache_mode), så partitionerne beskæres.
+-- Returnerer antal beregnede enheder, antal rækker der faktisk blev ændret,
+-- og varighed.
+-- -----------------------------------------------------------------------------
+DROP FUNCTION IF EXISTS beregn_potentialer(INTEGER[]) CASCADE;
+DROP FUNCTION IF EXISTS beregn_potentialer(INTEGER[], TEXT[]) CASCADE;
+
+CREATE OR REPLACE FUNCTION beregn_potentialer(
+    p_ids INTEGER[] DEFAULT NULL,
+    p_anvendelser TEXT[] DEFAULT NULL,
+    p_kommunekode VARCHAR DEFAULT NULL
+)
+RETURNS TABLE(antal_enheder INTEGER, antal_opdateret INTEGER, varighed INTERVAL) AS $$
+DECLARE
+    v_start TIMESTAMPTZ := clock_timestamp();
+    v_beregnet INTEGER;
+    v_opdateret INTEGER;
+BEGIN
+    WITH enheder AS (
+        -- Samme facilitet-logik som update_enhed_potentiale()
+        SELECT
+            bp.id,
+            bp.enh020_enhedens_anvendelse_txt AS anvendelse_txt,
+            -- NULL toiletforhold nulstiller ikke (som IF ... NOT IN i plpgsql)
+            CASE
+                WHEN bp.enh032_toiletforhold_txt NOT IN ('Vandskyllende toilet i enheden', 'Vandskyllende toilet uden for enheden') THEN 0
+                ELSE COALESCE(bp.enh065_antal_vandskyllede_toiletter, 0)
+            END AS antal_toiletter,
+            COALESCE(bp.enh066_antal_badevaerelser, 0) AS antal_badevaerelser,
+            CASE
+                WHEN bp.enh034_koekkenforhold_txt IN ('Eget køkken med afløb', 'Adgang til fælles køkken') THEN 1
+                ELSE 0
+            END AS antal_koekken,
+            COALESCE(bp.enh026_enhedenssamledeareal, 100) AS areal_m2
+        FROM potentialeberegner.bbr_potentiale bp
+        WHERE (p_ids IS NULL OR bp.id = ANY(p_ids))
+          AND (p_anvendelser IS NULL OR bp.enh020_enhedens_anvendelse_txt = ANY(p_anvendelser))
+          AND (p_kommunekode IS NULL OR bp.kommunekode = p_kommunekode)
+    ),
+    anvendelse_use_cases AS (
+        -- Use cases per anvendelsestekst (som get_use_cases_for_anvendelse)
+        SELECT
+            aucm.anvendelse_tekst,
+            jsonb_agg(
+                jsonb_build_object(
+                    'id', uc.id,
+                    'navn', uc.use_case_navn,
+                    'kategori', uc.kategori,
+                    'relevans', aucm.relevans_score,
+                    'link', uc.link
+                ) ORDER BY aucm.relevans_score DESC, aucm.id
+                -- id som tiebreak, så rækkefølgen ikke afhænger af fysisk rækkefølge
+            ) AS use_cases,
+            COUNT(*)::INTEGER AS antal_use_cases
+        FROM potentialeberegner.anvendelse_use_case_mapping aucm
+        JOIN potentialeberegner.use_cases uc ON uc.id = aucm.use_case_id
+        GROUP BY aucm.anvendelse_tekst
+    ),
+    sensor_skabelon AS (
+        -- Én række per anvendelse og sensortype. get_sensors_with_quantities
+        -- summerer antal over alle use cases der bruger sensoren, så antallet
+        -- kan beregnes ud fra hvor mange mappings der har hver multiplikator-kilde.
+        SELECT
+            aucm.anvendelse_tekst,
+            ist.id,
+            ist.sensor_type,
+            ist.pris_min_kr,
+            ist.pris_max_kr,
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde = 'toilet') AS n_toilet,
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde = 'badevaerelser') AS n_badevaerelser,
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde = 'koekken') AS n_koekken,
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde = 'areal_per_100m2') AS n_areal_100,
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde = 'areal_per_500m2') AS n_areal_500,
+            -- 'enhed' og ukendte kilder giver 1
+            COUNT(*) FILTER (WHERE ucsm.multiplikator_kilde IS NULL OR ucsm.multiplikator_kilde NOT IN (
+                'toilet', 'badevaerelser', 'koekken', 'areal_per_100m2', 'areal_per_500m2'
+            )) AS n_fast,
+            -- De felter der ikke afhænger af enheden bygges én gang her
+            jsonb_build_object(
+                'id', ist.id,
+                'type', ist.sensor_type,
+                'pris_min', ist.pris_min_kr,
+                'pris_max', ist.pris_max_kr,
+                'er_primaer', BOOL_OR(ucsm.er_primaer),
+                'for_use_cases', array_agg(DISTINCT ucsm.use_case_id)
+            ) AS sensor_json
+        FROM potentialeberegner.anvendelse_use_case_mapping aucm
+        JOIN potentialeberegner.use_case_sensor_mapping ucsm ON ucsm.use_case_id = aucm.use_case_id
+        JOIN potentialeberegner.iot_sensor_types ist ON ist.id = ucsm.sensor_type_id
+        WHERE ist.aktiv = TRUE
+        GROUP BY aucm.anvendelse_tekst, ist.id, ist.sensor_type, ist.pris_min_kr, ist.pris_max_kr
+    ),
+    enhed_sensorer AS (
+        -- Kun antal afhænger af enheden
+        SELECT
+            e.id AS enhed_id,
+            ss.id,
+            ss.sensor_type,
+            ss.pris_min_kr,
+            ss.pris_max_kr,
+            ss.sensor_json,
+            (ss.n_fast
+             + ss.n_toilet * GREATEST(e.antal_toiletter, 1)
+             + ss.n_badevaerelser * GREATEST(e.antal_badevaerelser, 1)
+             + ss.n_koekken * GREATEST(e.antal_koekken, 1)
+             + ss.n_areal_100 * GREATEST(CEIL(e.areal_m2::NUMERIC / 100), 1)
+             + ss.n_areal_500 * GREATEST(CEIL(e.areal_m2::NUMERIC / 500), 1)
+            )::NUMERIC AS antal
+        FROM enheder e
+        JOIN sensor_skabelon ss ON ss.anvendelse_tekst = e.anvendelse_txt
+    ),
+    enhed_sensor_json AS (
+        SELECT
+            enhed_id,
+            jsonb_agg(
+                sensor_json || jsonb_build_object(
+                    'antal', antal,
+                    'pris_total_min', antal * pris_min_kr,
+                    'pris_total_max', antal * pris_max_kr
+                )
+                ORDER BY antal DESC, sensor_type
+            ) AS iot_sensorer,
+            COUNT(*)::INTEGER AS antal_sensor_typer,
+            SUM(antal)::INTEGER AS total_antal_sensorer,
+            SUM(antal * pris_min_kr) AS investering_min,
+            SUM(antal * pris_max_kr) AS investering_max
+        FROM enhed_sensorer
+        GROUP BY enhed_id
+    ),
+    resultat AS (
+        SELECT
+            e.id,
+            e.antal_toiletter,
+            e.antal_badevaerelser,
+            e.antal_koekken,
+            COALESCE(auc.use_cases, '[]'::JSONB) AS use_cases,
+            COALESCE(esj.iot_sensorer, '[]'::JSONB) AS iot_sensorer,
+            COALESCE(auc.antal_use_cases, 0) AS antal_use_cases,
+            COALESCE(esj.antal_sensor_typer, 0) AS antal_sensor_typer,
+            COALESCE(esj.total_antal_sensorer, 0) AS total_antal_sensorer,
+            COALESCE(esj.investering_min, 0) AS investering_min,
+            COALESCE(esj.investering_max, 0) AS investering_max
+        FROM enheder e
+        LEFT JOIN anvendelse_use_cases auc ON auc.anvendelse_tekst = e.anvendelse_txt
+        LEFT JOIN enhed_sensor_json esj ON esj.enhed_id = e.id
+    ),
+    opdateret AS (
+        -- Kun rækker hvor resultatet faktisk ændres skrives (mindre WAL, bloat og GIN-vedligehold)
+        UPDATE potentialeberegner.bbr_potentiale bp SET
+            antal_toiletter = r.antal_toiletter,
+            antal_badevaerelser = r.antal_badevaerelser,
+            antal_koekken = r.antal_koekken,
+            use_cases = r.use_cases,
+            iot_sensorer = r.iot_sensorer,
+            antal_use_cases = r.antal_use_cases,
+            antal_sensor_typer = r.antal_sensor_typer,
+            total_antal_sensorer = r.total_antal_sensorer,
+            samlet_investering_min_kr = r.investering_min,
+            samlet_investering_max_kr = r.investering_max,
+            updated_at = CURRENT_TIMESTAMP
+        FROM resultat r
+        WHERE bp.id = r.id
+          AND (p_kommunekode IS NULL OR bp.kommunekode = p_kommunekode)
+          AND (bp.antal_toiletter, bp.antal_badevaerelser, bp.antal_koekken,
+               bp.use_cases, bp.iot_sensorer,
+               bp.antal_use_cases, bp.antal_sensor_typer, bp.total_antal_sensorer,
+               bp.samlet_investering_min_kr, bp.samlet_investering_max_kr)
+              IS DISTINCT FROM
+              (r.antal_toiletter, r.antal_badevaerelser, r.antal_koekken,
+               r.use_cases, r.iot_sensorer,
+               r.antal_use_cases, r.antal_sensor_typer, r.total_antal_sensorer,
+               r.investering_min, r.investering_max)
+        RETURNING bp.id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM resultat),
+        (SELECT COUNT(*) FROM opdateret)
+    INTO v_beregnet, v_opdateret;
+
+    antal_enheder := v_beregnet;
+    antal_opdateret := v_opdateret;
+    varighed := clock_timestamp() - v_start;
+    RAISE NOTICE 'beregn_potentialer: % enheder beregnet, % opdateret på %',
+        antal_enheder, antal_opdateret, varighed;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql
+SET plan_cache_mode = force_custom_plan;
+
+
+-- -----------------------------------------------------------------------------
+-- 2. EFTERBEHANDLING: Afledte tabeller der opdateres efter en genberegning
+-- -----------------------------------------------------------------------------
+-- Scripts med afledte tabeller (fx bygning_aggregat.sql) registrerer deres
+-- opdatering her. afslut_genberegning() kaldes én gang efter en samlet
+-- genberegning - ikke per del, så parallelle kørsler ikke opdaterer for hver del.
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS genberegning_efterbehandling (
+    navn TEXT PRIMARY KEY,
+    sql TEXT NOT NULL,                           -- Statement der køres med EXECUTE
+    raekkefoelge INTEGER DEFAULT 100,
+    aktiv BOOLEAN DEFAULT TRUE
+);
+
+CREATE OR REPLACE FUNCTION afslut_genberegning()
+RETURNS INTEGER AS $$
+DECLARE
+    v_trin RECORD;
+    v_start TIMESTAMPTZ;
+    v_count INTEGER := 0;
+BEGIN
+    FOR v_trin IN
+        SELECT navn, sql FROM potentialeberegner.genberegning_efterbehandling
+        WHERE aktiv
+        ORDER BY raekkefoelge, navn
+    LOOP
+        v_start := clock_timestamp();
+        EXECUTE v_trin.sql;
+        v_count := v_count + 1;
+        RAISE NOTICE 'afslut_genberegning: % på %', v_trin.navn, clock_timestamp() - v_start;
+    END LOOP;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 3. DATAVERSION: Tæller som caches nøgles på
+-- -----------------------------------------------------------------------------
+-- Én række. Tælles op som sidste trin i afslut_genberegning() og når et
+-- katalog ændres (statement-triggers nedenfor), så dashboardet og
+-- fliseserveren kan cache indtil data faktisk ændres i stedet for i fast tid.
+-- Triggerne sættes på de katalogtabeller der findes; køres kombo_sensorer.sql
+-- igen (DROP TABLE), køres denne fil også igen.
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS dataversion (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 1,
+    opdateret TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO dataversion (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+COMMENT ON TABLE dataversion IS 'Tæller for afledte data - øges af afslut_genberegning() og ved katalogændringer';
+
+INSERT INTO genberegning_efterbehandling (navn, sql, raekkefoelge) VALUES
+('dataversion', 'UPDATE potentialeberegner.dataversion SET version = version + 1, opdateret = CURRENT_TIMESTAMP', 1000)
+ON CONFLICT (navn) DO UPDATE SET sql = EXCLUDED.sql, raekkefoelge = EXCLUDED.raekkefoelge;
+
+CREATE OR REPLACE FUNCTION trg_dataversion_op()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE potentialeberegner.dataversion SET version = version + 1, opdateret = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_tabel TEXT;
+BEGIN
+    FOREACH v_tabel IN ARRAY ARRAY['iot_sensor_types', 'use_cases', 'use_case_sensor_mapping',
+                                   'anvendelse_use_case_mapping', 'iot_sensor_kombos', 'kombo_komponenter']
+    LOOP
+        CONTINUE WHEN to_regclass('potentialeberegner.' || v_tabel) IS NULL;
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_dataversion ON potentialeberegner.%I', v_tabel);
+        EXECUTE format(
+            'CREATE TRIGGER trg_dataversion
+             AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON potentialeberegner.%I
+             FOR EACH STATEMENT EXECUTE FUNCTION potentialeberegner.trg_dataversion_op()',
+            v_tabel
+        );
+    END LOOP;
+END $$;
+
+
+-- -----------------------------------------------------------------------------
+-- 4. ERSTAT update_all_potentialer() MED DEN MÆNGDEBASEREDE VERSION
+-- -----------------------------------------------------------------------------
+-- Signaturen er uændret, så eksisterende scripts og patches virker som før.
+-- update_enhed_potentiale() bevares til enkelt-enheder.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION update_all_potentialer()
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    SELECT antal_enheder INTO v_count FROM potentialeberegner.beregn_potentialer();
+    PERFORM potentialeberegner.afslut_genberegning();
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 5. VERIFIKATION: Sammenlign med get_sensors_with_quantities() (stikprøve)
+-- -----------------------------------------------------------------------------
+-- Forventet: 0 afvigelser
+-- -----------------------------------------------------------------------------
+/*
+SELECT * FROM beregn_potentialer();
+
+SELECT COUNT(*) AS afvigelser
+FROM (SELECT * FROM bbr_potentiale ORDER BY random() LIMIT 1000) bp
+WHERE bp.iot_sensorer IS DISTINCT FROM get_sensors_with_quantities(
+    ARRAY(SELECT (elem->>'id')::INTEGER FROM jsonb_array_elements(bp.use_cases) elem),
+    bp.antal_toiletter,
+    bp.antal_badevaerelser,
+    bp.antal_koekken,
+    COALESCE(bp.enh026_enhedenssamledeareal, 100)::NUMERIC
+);
+*/
@@ -0,0 +1,147 @@
+"""
+Benchmark: adressesøgning med og uden trigram-indeks
+
+Opretter en midlertidig tabel med syntetiske adresser (standard én million)
+og måler latenstid for:
+
+    ilike        ILIKE '%tekst%' som find_bygning_id, uden indeks (før)
+    ilike+trgm   samme forespørgsel med GIN-trigramindeks
+    soeg+trgm    rangeret top-k som soeg_adresser() i adresse_soegning.sql
+
+Søgetekster er hele adresser, vej + nummer, begyndelsen af en vej og
+stavefejl. Kræver pg_trgm i databasen; tabellen forsvinder når forbindelsen
+lukkes.
+
+Kør fra repo-roden:
+    python -m benchmarks.adresse_benchmark
+    python -m benchmarks.adresse_benchmark --antal 200000 --gentag 10 --db-url postgresql://...
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from potentialeberegner.db import DEFAULT_SECRETS, lav_engine
+
+VEJ_FORLED = ['Vester', 'Øster', 'Nørre', 'Sønder', 'Ny', 'Gammel', 'Kirke', 'Skole', 'Mølle',
+              'Strand', 'Bøge', 'Ege', 'Birke', 'Lind', 'Rose', 'Enghave', 'Skov', 'Havne',
+              'Stations', 'Kongens', 'Dronning', 'Jernbane', 'Park', 'Bakke', 'Sø']
+VEJ_EFTERLED = ['gade', 'vej', 'allé', 'stræde', 'torv', 'vænget', 'parken', 'stien']
+BYER = ['1000 København K', '2000 Frederiksberg', '2800 Kongens Lyngby', '3000 Helsingør',
+        '4000 Roskilde', '4600 Køge', '4700 Næstved', '5000 Odense C', '5700 Svendborg',
+        '6000 Kolding', '6700 Esbjerg', '7100 Vejle', '7400 Herning', '7500 Holstebro',
+        '8000 Aarhus C', '8600 Silkeborg', '8700 Horsens', '8800 Viborg', '8900 Randers C',
+        '9000 Aalborg', '9800 Hjørring', '9900 Frederikshavn', '3700 Rønne', '4200 Slagelse',
+        '4300 Holbæk', '6400 Sønderborg', '6100 Haderslev', '7700 Thisted', '9400 Nørresundby',
+        '8500 Grenaa', '5800 Nyborg', '4800 Nykøbing F', '3400 Hillerød', '2630 Taastrup',
+        '2600 Glostrup']
+HUSNUMRE = 150
+
+SOEGNINGER = [
+    'Vestergade 12, 8000 Aarhus C',   # hel adresse
+    'Møllevej 7',                     # vej + nummer
+    'Skolestræde',                    # vej
+    'Rosevæ',                         # begyndelsen af en vej (mens der tastes)
+    'Vestregade 12 Aarhus',           # stavefejl
+    'Kirkeallé 140, 9400',            # vej + nummer + postnummer
+    'Sygehusvej 3',                   # findes ikke
+]
+
+ILIKE_SQL = """
+SELECT DISTINCT bygning
+FROM adresse_bench
+WHERE adressebetegnelse ILIKE :moenster
+LIMIT 2
+"""
+
+# Samme forespørgsel som soeg_adresser() i adresse_soegning.sql
+SOEG_SQL = """
+SELECT adressebetegnelse, bygning, word_similarity(:soegning, adressebetegnelse) AS lighed
+FROM adresse_bench
+WHERE :soegning <% adressebetegnelse
+GROUP BY adressebetegnelse, bygning
+ORDER BY lighed DESC, similarity(:soegning, adressebetegnelse) DESC, adressebetegnelse
+LIMIT :antal
+"""
+
+
+def opret_adresser(conn, antal):
+    """Midlertidig tabel med antal syntetiske adresser (vej, husnummer, by) og bygnings-ID"""
+    veje = [forled + efterled for forled in VEJ_FORLED for efterled in VEJ_EFTERLED]
+    conn.execute(text("""
+        CREATE TEMP TABLE adresse_bench AS
+        WITH navne AS (
+            SELECT CAST(:veje AS TEXT[]) AS veje, CAST(:byer AS TEXT[]) AS byer
+        )
+        SELECT
+            veje[1 + i % cardinality(veje)] || ' ' ||
+            (1 + (i / cardinality(veje)) % :husnumre) || ', ' ||
+            byer[1 + (i / (cardinality(veje) * :husnumre)) % cardinality(byer)] AS adressebetegnelse,
+            md5(i::TEXT)::UUID AS bygning
+        FROM navne, generate_series(0, :antal - 1) AS i
+    """), {'veje': veje, 'byer': BYER, 'husnumre': HUSNUMRE, 'antal': antal})
+    conn.execute(text("ANALYZE adresse_bench"))
+
+
+def maal(conn, sql, params, gentag):
+    """Latenstider i ms for gentag kørsler"""
+    tider = []
+    for _ in range(gentag):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        tider.append((time.perf_counter() - start) * 1000)
+    return tider
+
+
+def percentil(tider, p):
+    tider = sorted(tider)
+    return tider[min(len(tider) - 1, int(round(p / 100 * (len(tider) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark af adressesøgning (pg_trgm)")
+    parser.add_argument('--antal', type=int, default=1_000_000, help="Antal syntetiske adresser")
+    parser.add_argument('--gentag', type=int, default=5, help="Kørsler per søgetekst")
+    parser.add_argument('--top', type=int, default=10, help="Antal forslag (top-k)")
+    parser.add_argument('--db-url', help="Database-URL (ellers DATABASE_URL eller secrets.toml)")
+    parser.add_argument('--secrets', default=DEFAULT_SECRETS, help="Sti til secrets.toml")
+    args = parser.parse_args(argv)
+
+    engine = lav_engine(args.db_url, args.secrets)
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        opret_adresser(conn, args.antal)
+        print(f"{args.antal:,} adresser oprettet på {time.perf_counter() - start:.1f} s")
+
+        resultater = {}
+        ilike = [{'moenster': f"%{s}%"} for s in SOEGNINGER]
+        resultater['ilike'] = [t for p in ilike for t in maal(conn, ILIKE_SQL, p, args.gentag)]
+
+        start = time.perf_counter()
+        conn.execute(text("CREATE INDEX ON adresse_bench USING GIN (adressebetegnelse gin_trgm_ops)"))
+        conn.execute(text("ANALYZE adresse_bench"))
+        print(f"GIN-trigramindeks bygget på {time.perf_counter() - start:.1f} s")
+
+        resultater['ilike+trgm'] = [t for p in ilike for t in maal(conn, ILIKE_SQL, p, args.gentag)]
+        resultater['soeg+trgm'] = [
+            t for s in SOEGNINGER
+            for t in maal(conn, SOEG_SQL, {'soegning': s.lower(), 'antal': args.top}, args.gentag)
+        ]
+
+        print()
+        print(f"{'metode':>12} | {'median (ms)':>11} | {'p95 (ms)':>9} | {'max (ms)':>9}")
+        print("-" * 52)
+        for metode, tider in resultater.items():
+            print(f"{metode:>12} | {statistics.median(tider):>11.1f} | {percentil(tider, 95):>9.1f} | {max(tider):>9.1f}")
+
+        print()
+        print("Forslag (3 bedste):")
+        for s in SOEGNINGER:
+            forslag = conn.execute(text(SOEG_SQL), {'soegning': s.lower(), 'antal': 3}).fetchall()
+            print(f"  {s!r}: {', '.join(r.adressebetegnelse for r in forslag) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
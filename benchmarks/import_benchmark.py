@@ -0,0 +1,103 @@
+"""
+Benchmark: koldstart og hukommelse for dashboardets imports
+
+Importerer hvert scenarie i en frisk Python-proces (så intet er importeret
+i forvejen) og måler importtid og maksimal RSS for processen:
+
+    før          app.py's imports med geopandas, folium, streamlit_folium
+                 og plotly øverst i modulet (som før lazy-loading)
+    efter        app.py's imports nu (læses fra app.py)
+    + grafer     efter + plotly, når første graf tegnes
+    + kort       efter + folium og streamlit_folium, når kortet tegnes
+    worker       potentialeberegner.data (datalaget uden Streamlit)
+
+Hvert scenarie køres --gentag gange; tabellen viser medianen.
+
+Kør fra repo-roden:
+    python -m benchmarks.import_benchmark
+    python -m benchmarks.import_benchmark --gentag 10
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROD = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importeres kun når sektionen med kort eller grafer tegnes
+KORT = [
+    'import folium',
+    'from streamlit_folium import st_folium',
+    'from potentialeberegner import kort',
+]
+GRAFER = [
+    'import plotly.express as px',
+    'import plotly.graph_objects as go',
+]
+# Øverst i app.py før lazy-loading (ud over de nuværende imports)
+FOER = ['import geopandas as gpd', 'import numpy as np', 'from plotly.subplots import make_subplots'] + KORT + GRAFER
+
+# Kører i underprocessen: importer, mål tid og RSS, skriv JSON
+_MAALING = """
+import json, resource, sys, time
+start = time.perf_counter()
+for linje in json.loads(sys.argv[1]):
+    exec(linje)
+sekunder = time.perf_counter() - start
+print(json.dumps({
+    'sekunder': sekunder,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'moduler': len(sys.modules),
+}))
+"""
+
+
+def app_imports(sti=os.path.join(ROD, 'app.py')):
+    """Import-sætningerne på modulniveau i app.py"""
+    with open(sti, encoding='utf-8') as f:
+        modul = ast.parse(f.read())
+    return [ast.unparse(node) for node in modul.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def maal(linjer):
+    """Importtid (s), maksimal RSS (MB) og antal moduler for linjer i en ny proces"""
+    resultat = subprocess.run(
+        [sys.executable, '-c', _MAALING, json.dumps(linjer)],
+        cwd=ROD, capture_output=True, text=True, check=True,
+    )
+    return json.loads(resultat.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark af koldstart for dashboardets imports")
+    parser.add_argument('--gentag', type=int, default=5, help="Antal processer per scenarie")
+    args = parser.parse_args(argv)
+
+    efter = app_imports()
+    scenarier = [
+        ('før', efter + FOER),
+        ('efter', efter),
+        ('+ grafer', efter + GRAFER),
+        ('+ kort', efter + KORT),
+        ('worker', ['from potentialeberegner.data import Datalag']),
+    ]
+
+    # Første kørsel varmer diskcachen og .pyc-filerne op
+    maal(efter + FOER)
+
+    print(f"{'scenarie':<10} | {'import (s)':>10} | {'RSS (MB)':>9} | {'moduler':>8}")
+    print("-" * 46)
+    for navn, linjer in scenarier:
+        maalinger = [maal(linjer) for _ in range(args.gentag)]
+        sekunder = statistics.median(m['sekunder'] for m in maalinger)
+        rss = statistics.median(m['rss_mb'] for m in maalinger)
+        moduler = maalinger[0]['moduler']
+        print(f"{navn:<10} | {sekunder:>10.2f} | {rss:>9.0f} | {moduler:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: kombo-mix uden overlap for mange bygninger
+
+Løser det bedste kombo-mix (potentialeberegner.kombo) for syntetiske
+bygninger med kataloget fra kombo_sensorer.sql og måler:
+
+    uden memo   hver bygning løses for sig
+    med memo    loes_bygninger(), én løsning per sensor-signatur
+
+og sammenligner den samlede besparelse med det bedste enkelte alternativ
+per bygning (bedste = TRUE i bygning_kombo, kombo_batch.sql).
+
+Kør fra repo-roden:
+    python -m benchmarks.kombo_benchmark
+    python -m benchmarks.kombo_benchmark --antal 1000 10000 100000 --max-uden-memo 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from potentialeberegner.kombo import KomboKatalog
+
+# Priser per stk og kombos som i iot_sensor_types og kombo_sensorer.sql
+SENSOR_PRISER = {
+    'Temperaturføler': (150, 400),
+    'Luftfugtighedssensor': (200, 500),
+    'CO2-måler': (350, 800),
+    'Støjsensor': (400, 900),
+    'Tilstedeværelsessensor': (300, 700),
+    'Bevægelsessensor': (150, 400),
+}
+KOMBOS = [
+    (1, 'Temperatur + Luftfugtighed', 400, 500, ['Temperaturføler', 'Luftfugtighedssensor']),
+    (2, 'Temperatur + PIR', 400, 500, ['Temperaturføler', 'Tilstedeværelsessensor', 'Bevægelsessensor']),
+    (3, 'Temperatur + Luftfugtighed + CO2', 1100, 1200,
+     ['Temperaturføler', 'Luftfugtighedssensor', 'CO2-måler']),
+    (4, 'Temperatur + Luftfugtighed + CO2 + PIR', 1200, 1300,
+     ['Temperaturføler', 'Luftfugtighedssensor', 'CO2-måler', 'Tilstedeværelsessensor', 'Bevægelsessensor']),
+    (5, 'Temperatur + Luftfugtighed + Støjsensor', 1200, 1300,
+     ['Temperaturføler', 'Luftfugtighedssensor', 'Støjsensor']),
+]
+
+# Sensorer per enhed og per bygning for nogle bygningsprofiler; sensorantal
+# følger antal enheder, så mange bygninger deler signatur som i bbr_sensor_linje
+PROFILER = {
+    'Bolig': ({'Temperaturføler': 1, 'Tilstedeværelsessensor': 2, 'Bevægelsessensor': 2, 'CO2-måler': 1},
+              {'Luftfugtighedssensor': 1}),
+    'Kontor': ({'Temperaturføler': 2, 'Tilstedeværelsessensor': 3, 'Bevægelsessensor': 3, 'CO2-måler': 2},
+               {'Luftfugtighedssensor': 2, 'Støjsensor': 1}),
+    'Institution': ({'Temperaturføler': 3, 'Tilstedeværelsessensor': 4, 'Bevægelsessensor': 4,
+                     'CO2-måler': 3, 'Luftfugtighedssensor': 1}, {}),
+    'Erhverv': ({'Temperaturføler': 1, 'Bevægelsessensor': 2, 'CO2-måler': 1},
+                {'Luftfugtighedssensor': 1, 'Støjsensor': 1}),
+}
+
+
+def syntetiske_sensorer(antal, seed=42):
+    """Sensorlinjer (bygning_id, sensor_type, antal) for antal bygninger"""
+    rng = np.random.default_rng(seed)
+    profiler = rng.choice(list(PROFILER), antal, p=[0.6, 0.15, 0.1, 0.15])
+    enheder = np.minimum(rng.geometric(0.08, antal), 60)
+    raekker = []
+    for bygning_id, (profil, n) in enumerate(zip(profiler, enheder)):
+        per_enhed, per_bygning = PROFILER[profil]
+        for sensor_type, antal_per_enhed in per_enhed.items():
+            raekker.append((bygning_id, sensor_type, antal_per_enhed * int(n)))
+        for sensor_type, antal_sensorer in per_bygning.items():
+            raekker.append((bygning_id, sensor_type, antal_sensorer))
+    df = pd.DataFrame(raekker, columns=['bygning_id', 'sensor_type', 'antal'])
+    return df.groupby(['bygning_id', 'sensor_type'], as_index=False)['antal'].sum()
+
+
+def bedste_enkelt(katalog, sensorer):
+    """Summen af den største besparelse fra ét alternativ per bygning (middelpris)"""
+    total = 0.0
+    for _, gruppe in sensorer.groupby('bygning_id'):
+        antal = dict(zip(gruppe['sensor_type'], gruppe['antal']))
+        bedste = 0.0
+        for v in katalog.varianter:
+            x = min(antal.get(t, 0) for t in v.typer)
+            bedste = max(bedste, x * v.besparelse / 100)
+        total += bedste
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark af kombo-mix per bygning")
+    parser.add_argument('--antal', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Antal bygninger der måles på")
+    parser.add_argument('--max-uden-memo', type=int, default=10000,
+                        help="Spring målingen uden memo (og bedste enkelt) over over dette antal")
+    args = parser.parse_args(argv)
+
+    print(f"{'bygninger':>10} | {'signaturer':>10} | {'uden memo (s)':>13} | {'med memo (s)':>12} | "
+          f"{'mix (kr)':>12} | {'bedste enkelt (kr)':>18}")
+    print("-" * 92)
+    for antal in args.antal:
+        sensorer = syntetiske_sensorer(antal)
+
+        if antal <= args.max_uden_memo:
+            katalog = KomboKatalog(SENSOR_PRISER, KOMBOS)
+            start = time.perf_counter()
+            for _, gruppe in sensorer.groupby('bygning_id'):
+                katalog._loesninger.clear()  # ingen genbrug mellem bygninger
+                katalog.loes(dict(zip(gruppe['sensor_type'], gruppe['antal'])))
+            uden = f"{time.perf_counter() - start:>13.2f}"
+        else:
+            uden = f"{'-':>13}"
+
+        katalog = KomboKatalog(SENSOR_PRISER, KOMBOS)
+        start = time.perf_counter()
+        mix = katalog.loes_bygninger(sensorer)
+        med = time.perf_counter() - start
+
+        mix_kr = ((mix['besparelse_min'] + mix['besparelse_max']) / 2).sum()
+        if antal <= args.max_uden_memo:
+            enkelt = f"{bedste_enkelt(katalog, sensorer):>18,.0f}"
+        else:
+            enkelt = f"{'-':>18}"
+        print(f"{antal:>10} | {katalog.antal_signaturer:>10} | {uden} | {med:>12.2f} | "
+              f"{mix_kr:>12,.0f} | {enkelt}")
+
+
+if __name__ == '__main__':
+    main()
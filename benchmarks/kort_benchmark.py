@@ -0,0 +1,119 @@
+"""
+Benchmark: bygningskort før og efter vektoriseret kortlag
+
+Sammenligner den tidligere løkke (én folium.CircleMarker med Popup per
+bygning) med potentialeberegner.kort.bygningslag() på syntetiske bygninger.
+Måler byggetid (lag + render af HTML) og HTML-størrelse.
+
+Kør fra repo-roden:
+    python -m benchmarks.kort_benchmark
+    python -m benchmarks.kort_benchmark --antal 2000 20000 100000 --max-foer 20000
+"""
+
+import argparse
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+
+from potentialeberegner.kort import ANVENDELSE_FARVER, bygningslag, get_color, get_radius
+
+
+def syntetiske_bygninger(antal, seed=42):
+    """Bygninger spredt over Danmark med kolonnerne fra bygning_aggregat"""
+    rng = np.random.default_rng(seed)
+    anvendelser = np.array(list(ANVENDELSE_FARVER) + ['Ukendt anvendelse'])
+    investering_max = rng.gamma(2.0, 15000, antal).round(2)
+    return pd.DataFrame({
+        'bygning_id': [f"{i:08x}-0000-4000-8000-000000000000" for i in range(antal)],
+        'antal_enheder': rng.integers(1, 40, antal),
+        'anvendelsestyper': rng.choice(anvendelser, antal),
+        'adresse': [f"Testvej {i}, {1000 + i % 8999} By" for i in range(antal)],
+        'kommunekode': rng.choice(['0101', '0147', '0461', '0751', '0851'], antal),
+        'total_sensorer': rng.integers(1, 400, antal),
+        'investering_min_kr': (investering_max * 0.7).round(2),
+        'investering_max_kr': investering_max,
+        'investerings_niveau': 'Medium (20.000-50.000 kr)',
+        'latitude': rng.uniform(54.6, 57.7, antal),
+        'longitude': rng.uniform(8.1, 12.6, antal),
+    })
+
+
+def kort_foer(df):
+    """Den tidligere løkke fra app.py (række for række)"""
+    m = folium.Map(location=[56.0, 10.5], zoom_start=7, tiles='CartoDB positron')
+    for idx in range(len(df)):
+        row = df.iloc[idx]
+        lat, lon = row['latitude'], row['longitude']
+
+        color = get_color(row['anvendelsestyper'])
+        radius = get_radius(row['investering_max_kr'])
+
+        popup_html = f"""
+        <div style="min-width: 250px;">
+            <h4 style="margin: 0 0 10px 0;">{row['adresse'] or 'Ukendt adresse'}</h4>
+            <table style="width: 100%; font-size: 12px;">
+                <tr><td><b>Anvendelse:</b></td><td>{row['anvendelsestyper']}</td></tr>
+                <tr><td><b>Kommune:</b></td><td>{row['kommunekode']}</td></tr>
+                <tr><td><b>Enheder:</b></td><td>{row['antal_enheder']:,.0f}</td></tr>
+                <tr><td><b>Sensorer:</b></td><td>{row['total_sensorer']:,.0f}</td></tr>
+                <tr><td><b>Investering:</b></td><td>{row['investering_min_kr']:,.0f} - {row['investering_max_kr']:,.0f} kr</td></tr>
+                <tr><td><b>Niveau:</b></td><td>{row['investerings_niveau']}</td></tr>
+            </table>
+            <p style="margin: 10px 0 0 0; font-size: 10px; color: #666;">
+                Bygning ID: {str(row['bygning_id'])[:8]}...
+            </p>
+        </div>
+        """
+
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=radius,
+            color=color,
+            fill=True,
+            fillColor=color,
+            fillOpacity=0.7,
+            weight=1,
+            popup=folium.Popup(popup_html, max_width=350)
+        ).add_to(m)
+    return m
+
+
+def kort_efter(df):
+    """Vektoriseret lag fra potentialeberegner.kort"""
+    m = folium.Map(location=[56.0, 10.5], zoom_start=7, tiles='CartoDB positron', prefer_canvas=True)
+    bygningslag(df).add_to(m)
+    return m
+
+
+def maal(byg_kort, df):
+    """Returner (sekunder, HTML-bytes) for at bygge og rendere kortet"""
+    start = time.perf_counter()
+    html = byg_kort(df).get_root().render()
+    return time.perf_counter() - start, len(html.encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark af bygningskortet")
+    parser.add_argument('--antal', type=int, nargs='+', default=[2000, 20000, 100000],
+                        help="Antal bygninger der måles på")
+    parser.add_argument('--max-foer', type=int, default=20000,
+                        help="Spring den gamle løkke over over dette antal (den er langsom)")
+    args = parser.parse_args(argv)
+
+    print(f"{'bygninger':>10} | {'før (s)':>9} | {'før (MB)':>9} | {'efter (s)':>9} | {'efter (MB)':>10}")
+    print("-" * 60)
+    for antal in args.antal:
+        df = syntetiske_bygninger(antal)
+        if antal <= args.max_foer:
+            tid_foer, stoerrelse_foer = maal(kort_foer, df)
+            foer = f"{tid_foer:>9.2f} | {stoerrelse_foer / 1e6:>9.2f}"
+        else:
+            foer = f"{'-':>9} | {'-':>9}"
+        tid_efter, stoerrelse_efter = maal(kort_efter, df)
+        print(f"{antal:>10} | {foer} | {tid_efter:>9.2f} | {stoerrelse_efter / 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+-- ============================================================================
+-- BYGNING AGGREGAT - Materialiseret bygningstabel til kort og bygningsopslag
+-- ============================================================================
+-- Baggrund:
+--   v_bygning_geomap og v_investering_per_bygning grupperer hele
+--   bbr_potentiale per bygning, tager geometri med DISTINCT ON og kalder
+--   ST_Transform per række - også når dashboardet kun skal bruge én bygning
+--   eller top 20.
+--
+--   bygning_aggregat er samme data materialiseret én gang med indekser på
+--   bygning_id, kommunekode og investering_max_kr. Den opdateres med
+--   REFRESH ... CONCURRENTLY fra afslut_genberegning(), så læsere aldrig
+--   blokeres mens den opdateres.
+--
+-- Kør EFTER bygning_views.sql og batch_beregning.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. MATERIALIZED VIEW
+-- -----------------------------------------------------------------------------
+-- Kolonner som v_bygning_geomap plus gennemsnit fra v_investering_per_bygning.
+-- -----------------------------------------------------------------------------
+DROP MATERIALIZED VIEW IF EXISTS bygning_aggregat CASCADE;
+
+CREATE MATERIALIZED VIEW bygning_aggregat AS
+WITH bygning_stats AS (
+    SELECT
+        bygning AS bygning_id,
+        COUNT(*) AS antal_enheder,
+        SUM(enh026_enhedenssamledeareal) AS samlet_areal_m2,
+        STRING_AGG(DISTINCT enh020_enhedens_anvendelse_txt, ', ') AS anvendelsestyper,
+        MAX(kommunekode) AS kommunekode,
+        MAX(adressebetegnelse) AS adresse,
+        SUM(antal_toiletter) AS total_toiletter,
+        SUM(antal_badevaerelser) AS total_badevaerelser,
+        SUM(antal_koekken) AS total_koekken,
+        SUM(antal_use_cases) AS total_use_cases,
+        SUM(total_antal_sensorer) AS total_sensorer,
+        SUM(samlet_investering_min_kr) AS investering_min_kr,
+        SUM(samlet_investering_max_kr) AS investering_max_kr,
+        ROUND(AVG(total_antal_sensorer), 1) AS gns_sensorer_per_enhed,
+        ROUND(AVG(samlet_investering_max_kr), 0) AS gns_investering_per_enhed
+    FROM bbr_potentiale
+    WHERE bygning IS NOT NULL
+    GROUP BY bygning
+),
+bygning_geom AS (
+    SELECT DISTINCT ON (bygning)
+        bygning,
+        the_geom
+    FROM bbr_potentiale
+    WHERE bygning IS NOT NULL
+      AND the_geom IS NOT NULL
+    ORDER BY bygning, id
+)
+SELECT
+    bs.*,
+    CASE
+        WHEN bs.investering_max_kr >= 100000 THEN 'Meget høj (100.000+ kr)'
+        WHEN bs.investering_max_kr >= 50000 THEN 'Høj (50.000-100.000 kr)'
+        WHEN bs.investering_max_kr >= 20000 THEN 'Medium (20.000-50.000 kr)'
+        WHEN bs.investering_max_kr > 0 THEN 'Lav (< 20.000 kr)'
+        ELSE 'Ingen'
+    END AS investerings_niveau,
+    -- Geometri (original EPSG:25832)
+    bg.the_geom,
+    -- Koordinater (WGS84) beregnes én gang ved refresh
+    ST_Y(ST_Transform(ST_Centroid(bg.the_geom), 4326)) AS latitude,
+    ST_X(ST_Transform(ST_Centroid(bg.the_geom), 4326)) AS longitude,
+    -- Punkt i web mercator (EPSG:3857) til vektorfliser (bygning_fliser.sql)
+    ST_Transform(ST_Centroid(bg.the_geom), 3857) AS punkt_3857
+FROM bygning_stats bs
+LEFT JOIN bygning_geom bg ON bs.bygning_id = bg.bygning;
+
+-- Unikt indeks er påkrævet for REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX idx_bygning_aggregat_bygning_id ON bygning_aggregat(bygning_id);
+CREATE INDEX idx_bygning_aggregat_kommunekode ON bygning_aggregat(kommunekode);
+CREATE INDEX idx_bygning_aggregat_investering ON bygning_aggregat(investering_max_kr DESC);
+CREATE INDEX idx_bygning_aggregat_geom ON bygning_aggregat USING GIST (the_geom);
+CREATE INDEX idx_bygning_aggregat_punkt_3857 ON bygning_aggregat USING GIST (punkt_3857);
+
+COMMENT ON MATERIALIZED VIEW bygning_aggregat IS 'Bygningsniveau-aggregat af bbr_potentiale (opdateres af afslut_genberegning)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. OPDATERING EFTER GENBEREGNING
+-- -----------------------------------------------------------------------------
+INSERT INTO genberegning_efterbehandling (navn, sql, raekkefoelge) VALUES
+('bygning_aggregat', 'REFRESH MATERIALIZED VIEW CONCURRENTLY potentialeberegner.bygning_aggregat', 10)
+ON CONFLICT (navn) DO UPDATE SET sql = EXCLUDED.sql, raekkefoelge = EXCLUDED.raekkefoelge;
+
+-- Manuel opdatering (fx efter import af BBR-data uden genberegning):
+-- SELECT afslut_genberegning();
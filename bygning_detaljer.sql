@@ -0,0 +1,146 @@
+-- ============================================================================
+-- BYGNING DETALJER - Hele detaljevisningen for én bygning som ét JSON-dokument
+-- ============================================================================
+-- Baggrund:
+--   Detaljevisningen i dashboardet hentede bygningsinfo, sensoroversigt,
+--   use case-oversigt, sensor/use case-breakdown og kombo-alternativer med
+--   hver sin forespørgsel på samme bygning, og flere af dem udfoldede de
+--   samme sensorlinjer (use_case_ids) igen.
+--
+--   bygning_detaljer(bygning_id) returnerer det hele i ét kald. Sensorlinjerne
+--   udfoldes én gang (CTE'en linje_use_cases bruges af flere dele), og
+--   use_cases-JSON'en udfoldes én gang per enhed.
+--
+--   Nøgler i dokumentet (hver del er et array af rækker, som i dashboardet):
+--     info                       bygning_aggregat-rækken (0 eller 1 række)
+--     sensor_usecase_breakdown   sensorer per use case og sensortype
+--     usecase_summary            use cases med antal enheder og sensorer
+--     sensor_summary             sensorer per sensortype
+--     sensor_with_usecases       sensorer per sensortype med use case-navne
+--     kombos                     get_kombo_alternativer() (kombo_sensorer.sql)
+--
+-- Kør EFTER kombo_sensorer.sql og bygning_aggregat.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. FUNKTION: Detaljer for én bygning
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bygning_detaljer(p_bygning_id UUID)
+RETURNS JSONB AS $$
+    WITH linjer AS (
+        SELECT sl.sensor_type, sl.antal, sl.pris_total_min, sl.pris_total_max, sl.use_case_ids
+        FROM potentialeberegner.bbr_sensor_linje sl
+        WHERE sl.bygning = p_bygning_id
+    ),
+    linje_use_cases AS (
+        -- Sensorlinje × use case (use_case_id er NULL hvis use casen ikke findes)
+        SELECT l.sensor_type, l.antal, l.pris_total_min, l.pris_total_max, uc.id AS use_case_id, uc.use_case_navn
+        FROM linjer l,
+             unnest(l.use_case_ids) AS uc_id
+        LEFT JOIN potentialeberegner.use_cases uc ON uc.id = uc_id
+    ),
+    enhed_use_cases AS (
+        SELECT
+            bp.id AS enhed_id,
+            uc_elem->>'navn' AS use_case_navn,
+            uc_elem->>'kategori' AS kategori
+        FROM potentialeberegner.bbr_potentiale bp,
+             jsonb_array_elements(bp.use_cases) AS uc_elem
+        WHERE bp.bygning = p_bygning_id
+    ),
+    breakdown AS (
+        SELECT
+            use_case_navn,
+            sensor_type,
+            SUM(antal) AS antal_sensorer,
+            SUM(pris_total_min) AS pris_min,
+            SUM(pris_total_max) AS pris_max
+        FROM linje_use_cases
+        WHERE use_case_id IS NOT NULL
+        GROUP BY use_case_navn, sensor_type
+    ),
+    usecase_sensorer AS (
+        SELECT use_case_navn, SUM(antal_sensorer) AS sensorer_til_usecase
+        FROM breakdown
+        GROUP BY use_case_navn
+    ),
+    usecase_summary AS (
+        SELECT
+            eu.use_case_navn,
+            eu.kategori,
+            COUNT(DISTINCT eu.enhed_id) AS antal_enheder,
+            COALESCE(us.sensorer_til_usecase, 0) AS antal_sensorer
+        FROM enhed_use_cases eu
+        LEFT JOIN usecase_sensorer us ON us.use_case_navn = eu.use_case_navn
+        GROUP BY eu.use_case_navn, eu.kategori, us.sensorer_til_usecase
+    ),
+    sensor_summary AS (
+        SELECT
+            sensor_type,
+            SUM(antal) AS antal,
+            SUM(pris_total_min) AS pris_min,
+            SUM(pris_total_max) AS pris_max
+        FROM linjer
+        GROUP BY sensor_type
+    ),
+    sensor_with_usecases AS (
+        SELECT
+            sensor_type,
+            SUM(antal) AS antal,
+            SUM(pris_total_min) AS pris_min,
+            SUM(pris_total_max) AS pris_max,
+            STRING_AGG(DISTINCT use_case_navn, ', ' ORDER BY use_case_navn) AS use_cases
+        FROM linje_use_cases
+        GROUP BY sensor_type
+    )
+    SELECT jsonb_build_object(
+        'info', COALESCE((
+            SELECT jsonb_agg(bg)
+            FROM (
+                SELECT
+                    ba.bygning_id,
+                    ba.adresse,
+                    ba.anvendelsestyper,
+                    ba.kommunekode,
+                    ba.antal_enheder,
+                    ba.total_sensorer,
+                    ba.investering_min_kr,
+                    ba.investering_max_kr,
+                    ba.investerings_niveau,
+                    ba.total_toiletter,
+                    ba.total_badevaerelser,
+                    ba.total_koekken,
+                    ba.samlet_areal_m2
+                FROM potentialeberegner.bygning_aggregat ba
+                WHERE ba.bygning_id = p_bygning_id
+            ) bg
+        ), '[]'::JSONB),
+        'sensor_usecase_breakdown', COALESCE((
+            SELECT jsonb_agg(b ORDER BY b.use_case_navn, b.antal_sensorer DESC, b.sensor_type) FROM breakdown b
+        ), '[]'::JSONB),
+        'usecase_summary', COALESCE((
+            SELECT jsonb_agg(u ORDER BY u.antal_sensorer DESC, u.use_case_navn) FROM usecase_summary u
+        ), '[]'::JSONB),
+        'sensor_summary', COALESCE((
+            SELECT jsonb_agg(s ORDER BY s.antal DESC, s.sensor_type) FROM sensor_summary s
+        ), '[]'::JSONB),
+        'sensor_with_usecases', COALESCE((
+            SELECT jsonb_agg(s ORDER BY s.antal DESC, s.sensor_type) FROM sensor_with_usecases s
+        ), '[]'::JSONB),
+        'kombos', potentialeberegner.get_kombo_alternativer(p_bygning_id)
+    );
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION bygning_detaljer(UUID) IS 'Detaljevisningen for én bygning (info, sensorer, use cases, kombos) som JSONB';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+SELECT jsonb_pretty(bygning_detaljer(
+    (SELECT bygning FROM bbr_potentiale WHERE bygning IS NOT NULL LIMIT 1)
+));
+*/
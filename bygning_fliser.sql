@@ -0,0 +1,68 @@
+-- ============================================================================
+-- BYGNING FLISER - Vektorfliser (MVT) med alle bygninger fra bygning_aggregat
+-- ============================================================================
+-- Baggrund:
+--   Kortet i dashboardet henter bygninger som DataFrame og sender dem til
+--   browseren som GeoJSON/markører. For hele landet er det hundredtusindvis
+--   af punkter per visning.
+--
+--   bygning_flise(z, x, y) returnerer én Mapbox Vector Tile med bygningerne
+--   i flisen. Browseren henter kun de fliser der er synlige, og hver flise
+--   kan caches. Signaturen (z, x, y) -> BYTEA er den som pg_tileserv og
+--   Martin finder automatisk, men fliserne serveres normalt af
+--   potentialeberegner/fliser.py, som cacher dem per z/x/y og dataversion.
+--
+--   dataversion (batch_beregning.sql) tælles op af afslut_genberegning()
+--   efter hver genberegning, så caches kan se hvornår bygning_aggregat har
+--   ændret sig.
+--
+-- Kræver PostGIS 3.1+ (ST_TileEnvelope med margin).
+-- Kør EFTER bygning_aggregat.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. FUNKTION: Én vektorflise
+-- -----------------------------------------------------------------------------
+-- Laget hedder 'bygninger'. Attributter: bygning_id, adresse,
+-- anvendelsestyper, kommunekode, antal_enheder, total_sensorer,
+-- investering_min_kr, investering_max_kr og investerings_niveau.
+-- Tal castes til INTEGER/BIGINT, da ST_AsMVT ikke har en NUMERIC-type.
+-- Flisen udvides med en margin svarende til buffer (64/4096), så
+-- cirkler ved flisekanten ikke klippes.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bygning_flise(z INTEGER, x INTEGER, y INTEGER)
+RETURNS BYTEA AS $$
+    WITH mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ba.punkt_3857, ST_TileEnvelope(z, x, y), 4096, 64, TRUE) AS geom,
+            ba.bygning_id::TEXT AS bygning_id,
+            ba.adresse,
+            ba.anvendelsestyper,
+            ba.kommunekode,
+            ba.antal_enheder::INTEGER AS antal_enheder,
+            ba.total_sensorer::INTEGER AS total_sensorer,
+            ROUND(ba.investering_min_kr)::BIGINT AS investering_min_kr,
+            ROUND(ba.investering_max_kr)::BIGINT AS investering_max_kr,
+            ba.investerings_niveau
+        FROM potentialeberegner.bygning_aggregat ba
+        WHERE ba.punkt_3857 && ST_TileEnvelope(z, x, y, margin => 64.0 / 4096)
+    )
+    SELECT ST_AsMVT(mvtgeom, 'bygninger', 4096, 'geom')
+    FROM mvtgeom;
+$$ LANGUAGE sql STABLE PARALLEL SAFE;
+
+COMMENT ON FUNCTION bygning_flise(INTEGER, INTEGER, INTEGER) IS 'Mapbox Vector Tile med bygninger fra bygning_aggregat (lag: bygninger)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+-- Flise over København ved zoom 12 (antal bytes)
+SELECT length(bygning_flise(12, 2191, 1280));
+
+-- Nuværende dataversion
+SELECT version, opdateret FROM dataversion;
+*/
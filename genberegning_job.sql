@@ -0,0 +1,63 @@
+-- ============================================================================
+-- GENBEREGNING JOB - Fremdrift for parallel, opdelt genberegning
+-- ============================================================================
+-- Bruges af Python-driveren:
+--   python -m potentialeberegner.genberegning --opdeling kommune --workers 8
+--
+-- Hver kørsel opdeles i dele (én per kommunekode eller id-interval). Hver del
+-- genberegnes og committes i sin egen transaktion, og status gemmes her, så
+-- en afbrudt kørsel kan genoptages med --koersel <navn>.
+--
+-- Kør EFTER batch_beregning.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. JOB-TABEL
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS genberegning_job (
+    id SERIAL PRIMARY KEY,
+    koersel TEXT NOT NULL,                       -- Navn på kørslen (genoptages på navnet)
+    opdeling TEXT NOT NULL CHECK (opdeling IN ('kommune', 'interval')),
+    kommunekode VARCHAR(4),                      -- Sat ved opdeling = 'kommune'
+    id_fra INTEGER,                              -- Sat ved opdeling = 'interval' (inklusiv)
+    id_til INTEGER,                              -- Sat ved opdeling = 'interval' (eksklusiv)
+    status TEXT NOT NULL DEFAULT 'ventende'
+        CHECK (status IN ('ventende', 'koerer', 'faerdig', 'fejl')),
+    antal_enheder INTEGER,
+    antal_opdateret INTEGER,
+    varighed INTERVAL,
+    fejl TEXT,
+    startet TIMESTAMPTZ,
+    afsluttet TIMESTAMPTZ,
+    oprettet TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Én række per del i en kørsel (COALESCE da den ubrugte nøgle er NULL)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_genberegning_job_del
+    ON genberegning_job(koersel, COALESCE(kommunekode, ''), COALESCE(id_fra, -1));
+
+CREATE INDEX IF NOT EXISTS idx_genberegning_job_status ON genberegning_job(koersel, status);
+
+COMMENT ON TABLE genberegning_job IS 'Dele af en parallel genberegning og deres status (se potentialeberegner/genberegning.py)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. VIEW: Fremdrift per kørsel
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE VIEW v_genberegning_fremdrift AS
+SELECT
+    koersel,
+    opdeling,
+    COUNT(*) AS antal_dele,
+    COUNT(*) FILTER (WHERE status = 'faerdig') AS faerdige,
+    COUNT(*) FILTER (WHERE status = 'koerer') AS koerer,
+    COUNT(*) FILTER (WHERE status = 'fejl') AS fejlede,
+    SUM(antal_enheder) AS antal_enheder,
+    SUM(antal_opdateret) AS antal_opdateret,
+    MIN(startet) AS startet,
+    MAX(afsluttet) AS seneste_afsluttet
+FROM genberegning_job
+GROUP BY koersel, opdeling
+ORDER BY MIN(oprettet) DESC;
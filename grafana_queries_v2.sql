@@ -3,6 +3,8 @@
 -- ============================================================================
 -- Formål: Investeringsoversigt - antal sensorer og prisspænd
 -- Koordinater transformeres fra EPSG:25832 (UTM32N) til WGS84 (lat/lng)
+-- Sensor-queries læser bbr_sensor_linje (sensor_linjer.sql) i stedet for JSON
+-- Statistik-panels læser overblik_kube (overblik_kube.sql)
 -- ============================================================================
 
 
@@ -67,14 +69,13 @@ SELECT
     bp.adressebetegnelse AS adresse,
     bp.enh020_enhedens_anvendelse_txt AS anvendelse,
     bp.enh026_enhedenssamledeareal AS areal_m2,
-    (SELECT SUM((s->>'antal')::INTEGER) 
-     FROM jsonb_array_elements(bp.iot_sensorer) s 
-     WHERE s->>'type' = 'CO2-måler') AS antal_af_sensor,
+    sl.antal AS antal_af_sensor,
     bp.total_antal_sensorer,
     ST_Y(ST_Transform(ST_Centroid(bp.the_geom), 4326)) AS latitude,
     ST_X(ST_Transform(ST_Centroid(bp.the_geom), 4326)) AS longitude
-FROM bbr_potentiale bp
-WHERE bp.iot_sensorer @> '[{"type": "CO2-måler"}]'
+FROM bbr_sensor_linje sl
+JOIN bbr_potentiale bp ON bp.id = sl.enhed_id
+WHERE sl.sensor_type = 'CO2-måler'
   AND bp.the_geom IS NOT NULL;
 
 
@@ -110,19 +111,18 @@ SELECT
     bp.id,
     bp.adressebetegnelse AS adresse,
     bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-    sensor_elem->>'type' AS sensor_type,
-    (sensor_elem->>'antal')::INTEGER AS antal,
-    (sensor_elem->>'pris_min')::NUMERIC AS stk_pris_min,
-    (sensor_elem->>'pris_max')::NUMERIC AS stk_pris_max,
-    (sensor_elem->>'pris_total_min')::NUMERIC AS total_pris_min,
-    (sensor_elem->>'pris_total_max')::NUMERIC AS total_pris_max,
-    (sensor_elem->>'er_primaer')::BOOLEAN AS er_primaer,
+    sl.sensor_type,
+    sl.antal,
+    sl.pris_min AS stk_pris_min,
+    sl.pris_max AS stk_pris_max,
+    sl.pris_total_min AS total_pris_min,
+    sl.pris_total_max AS total_pris_max,
+    sl.er_primaer,
     ST_Y(ST_Transform(ST_Centroid(bp.the_geom), 4326)) AS latitude,
     ST_X(ST_Transform(ST_Centroid(bp.the_geom), 4326)) AS longitude
-FROM bbr_potentiale bp,
-     jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-WHERE bp.the_geom IS NOT NULL
-  AND jsonb_array_length(bp.iot_sensorer) > 0;
+FROM bbr_sensor_linje sl
+JOIN bbr_potentiale bp ON bp.id = sl.enhed_id
+WHERE bp.the_geom IS NOT NULL;
 
 
 -- ============================================================================
@@ -305,6 +305,11 @@ ORDER BY uc.kategori;
 -- ============================================================================
 -- AGGREGEREDE QUERIES TIL DASHBOARD STATISTIK
 -- ============================================================================
+-- Læser overblik_kube (overblik_kube.sql), som opdateres efter hver
+-- genberegning. Kuben tæller enheder med bygning (som Streamlit-dashboardet).
+-- Per kommune: erstat NOT k.per_kommune med
+--   k.per_kommune AND k.kommunekode = '${kommune}'
+-- ============================================================================
 
 -- STAT: Samlet investeringsoversigt
 SELECT 
@@ -322,77 +327,74 @@ WHERE total_antal_sensorer > 0;
 
 -- STAT: Investering per anvendelsestype
 SELECT 
-    bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-    COUNT(*) AS antal_enheder,
-    SUM(bp.total_antal_sensorer) AS total_sensorer,
-    SUM(bp.samlet_investering_min_kr) AS investering_min,
-    SUM(bp.samlet_investering_max_kr) AS investering_max
-FROM bbr_potentiale bp
-WHERE bp.enh020_enhedens_anvendelse_txt IS NOT NULL
-GROUP BY bp.enh020_enhedens_anvendelse_txt
+    k.anvendelse,
+    k.antal_enheder,
+    k.antal_sensorer AS total_sensorer,
+    k.investering_min_kr AS investering_min,
+    k.investering_max_kr AS investering_max
+FROM overblik_kube k
+WHERE k.niveau = 'anvendelse' AND NOT k.per_kommune
+  AND k.anvendelse IS NOT NULL
 ORDER BY investering_max DESC;
 
 
 -- STAT: Investering per kategori
 SELECT 
-    uc_elem->>'kategori' AS kategori,
-    COUNT(DISTINCT bp.id) AS antal_enheder
-FROM bbr_potentiale bp,
-     jsonb_array_elements(bp.use_cases) AS uc_elem
-GROUP BY uc_elem->>'kategori'
+    k.kategori,
+    k.antal_enheder
+FROM overblik_kube k
+WHERE k.niveau = 'kategori' AND NOT k.per_kommune
 ORDER BY antal_enheder DESC;
 
 
 -- STAT: Top 10 mest anvendte sensorer med priser
 SELECT 
-    sensor_elem->>'type' AS sensor_type,
-    COUNT(DISTINCT bp.id) AS antal_enheder,
-    SUM((sensor_elem->>'antal')::INTEGER) AS total_antal,
-    SUM((sensor_elem->>'pris_total_min')::NUMERIC) AS total_pris_min,
-    SUM((sensor_elem->>'pris_total_max')::NUMERIC) AS total_pris_max
-FROM bbr_potentiale bp,
-     jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-GROUP BY sensor_elem->>'type'
+    k.sensor_type,
+    k.antal_enheder,
+    k.antal_sensorer AS total_antal,
+    k.investering_min_kr AS total_pris_min,
+    k.investering_max_kr AS total_pris_max
+FROM overblik_kube k
+WHERE k.niveau = 'sensor' AND NOT k.per_kommune
 ORDER BY total_antal DESC
 LIMIT 10;
 
 
 -- STAT: Top 10 mest anvendte use cases
 SELECT 
-    uc_elem->>'navn' AS use_case,
-    uc_elem->>'kategori' AS kategori,
-    COUNT(DISTINCT bp.id) AS antal_enheder
-FROM bbr_potentiale bp,
-     jsonb_array_elements(bp.use_cases) AS uc_elem
-GROUP BY uc_elem->>'navn', uc_elem->>'kategori'
+    k.use_case_navn AS use_case,
+    k.kategori,
+    k.antal_enheder
+FROM overblik_kube k
+WHERE k.niveau = 'use_case' AND NOT k.per_kommune
 ORDER BY antal_enheder DESC
 LIMIT 10;
 
 
 -- STAT: Investering per kommune
 SELECT 
-    bp.kommunekode,
-    COUNT(*) AS antal_enheder,
-    SUM(bp.total_antal_sensorer) AS total_sensorer,
-    SUM(bp.samlet_investering_min_kr) AS investering_min,
-    SUM(bp.samlet_investering_max_kr) AS investering_max
-FROM bbr_potentiale bp
-WHERE bp.kommunekode IS NOT NULL
-GROUP BY bp.kommunekode
+    k.kommunekode,
+    k.antal_enheder,
+    k.antal_sensorer AS total_sensorer,
+    k.investering_min_kr AS investering_min,
+    k.investering_max_kr AS investering_max
+FROM overblik_kube k
+WHERE k.niveau = 'total' AND k.per_kommune
+  AND k.kommunekode IS NOT NULL
 ORDER BY investering_max DESC;
 
 
 -- STAT: Facilitet-oversigt
 SELECT 
-    bp.enh020_enhedens_anvendelse_txt AS anvendelse,
-    COUNT(*) AS antal_enheder,
-    SUM(bp.antal_toiletter) AS total_toiletter,
-    SUM(bp.antal_badevaerelser) AS total_badevaerelser,
-    SUM(bp.antal_koekken) AS total_koekken
-FROM bbr_potentiale bp
-WHERE bp.enh020_enhedens_anvendelse_txt IS NOT NULL
-GROUP BY bp.enh020_enhedens_anvendelse_txt
-ORDER BY (SUM(bp.antal_toiletter) + SUM(bp.antal_badevaerelser) + SUM(bp.antal_koekken)) DESC;
+    k.anvendelse,
+    k.alle_enheder AS antal_enheder,
+    k.total_toiletter,
+    k.total_badevaerelser,
+    k.total_koekken
+FROM overblik_kube k
+WHERE k.niveau = 'anvendelse' AND NOT k.per_kommune
+  AND k.anvendelse IS NOT NULL
+ORDER BY (k.total_toiletter + k.total_badevaerelser + k.total_koekken) DESC;
 
 
 -- ============================================================================
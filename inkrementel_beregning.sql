@@ -0,0 +1,224 @@
+-- ============================================================================
+-- INKREMENTEL GENBEREGNING - Genberegn kun enheder berørt af katalogændringer
+-- ============================================================================
+-- Baggrund:
+--   Efter en prisændring eller aktiv = FALSE i iot_sensor_types har man hidtil
+--   kørt update_all_potentialer(), som genberegner alle enheder.
+--
+--   En enheds use cases (og dermed sensorer) bestemmes udelukkende af dens
+--   anvendelsestekst. Triggers på katalogtabellerne registrerer derfor hvilke
+--   anvendelsestekster en ændring berører, og genberegn_aendrede() genberegner
+--   kun enheder med de anvendelser (via indekset på anvendelse_txt).
+--
+--   Registrering sker per række:
+--     iot_sensor_types            -> anvendelser hvis use cases bruger sensoren
+--     use_cases                   -> anvendelser der har use casen
+--     use_case_sensor_mapping     -> anvendelser der har use casen
+--     anvendelse_use_case_mapping -> anvendelsesteksten direkte
+--
+-- Kør EFTER batch_beregning.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. KØ: Anvendelsestekster der venter på genberegning
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS genberegning_koe (
+    anvendelse_tekst TEXT PRIMARY KEY,
+    aarsag TEXT,                                   -- Seneste tabel der markerede teksten
+    registreret TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE genberegning_koe IS 'Anvendelsestekster hvis enheder skal genberegnes efter katalogændringer';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. HJÆLPEFUNKTION: Markér anvendelser ud fra use cases
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION marker_anvendelser_for_use_cases(
+    p_use_case_ids INTEGER[],
+    p_aarsag TEXT
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO potentialeberegner.genberegning_koe (anvendelse_tekst, aarsag)
+    SELECT DISTINCT aucm.anvendelse_tekst, p_aarsag
+    FROM potentialeberegner.anvendelse_use_case_mapping aucm
+    WHERE aucm.use_case_id = ANY(p_use_case_ids)
+    ON CONFLICT (anvendelse_tekst) DO UPDATE SET
+        aarsag = EXCLUDED.aarsag,
+        registreret = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 3. TRIGGERS PÅ KATALOGTABELLERNE
+-- -----------------------------------------------------------------------------
+
+-- 3.1 Sensortyper: kun felter der indgår i beregningen
+CREATE OR REPLACE FUNCTION trg_sensor_type_aendret()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_sensor_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'UPDATE' AND (OLD.sensor_type, OLD.pris_min_kr, OLD.pris_max_kr, OLD.aktiv)
+            IS NOT DISTINCT FROM (NEW.sensor_type, NEW.pris_min_kr, NEW.pris_max_kr, NEW.aktiv) THEN
+        RETURN NULL;
+    END IF;
+
+    v_sensor_ids := CASE TG_OP
+        WHEN 'INSERT' THEN ARRAY[NEW.id]
+        WHEN 'DELETE' THEN ARRAY[OLD.id]
+        ELSE ARRAY[OLD.id, NEW.id]
+    END;
+
+    PERFORM potentialeberegner.marker_anvendelser_for_use_cases(
+        ARRAY(
+            SELECT ucsm.use_case_id
+            FROM potentialeberegner.use_case_sensor_mapping ucsm
+            WHERE ucsm.sensor_type_id = ANY(v_sensor_ids)
+        ),
+        TG_TABLE_NAME
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_genberegning ON iot_sensor_types;
+CREATE TRIGGER trg_genberegning
+AFTER INSERT OR UPDATE OR DELETE ON iot_sensor_types
+FOR EACH ROW EXECUTE FUNCTION trg_sensor_type_aendret();
+
+
+-- 3.2 Use cases: felter der indgår i use_cases JSON
+CREATE OR REPLACE FUNCTION trg_use_case_aendret()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND (OLD.use_case_navn, OLD.kategori, OLD.link)
+            IS NOT DISTINCT FROM (NEW.use_case_navn, NEW.kategori, NEW.link) THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM potentialeberegner.marker_anvendelser_for_use_cases(
+        CASE TG_OP WHEN 'DELETE' THEN ARRAY[OLD.id] ELSE ARRAY[NEW.id] END,
+        TG_TABLE_NAME
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_genberegning ON use_cases;
+CREATE TRIGGER trg_genberegning
+AFTER UPDATE OR DELETE ON use_cases
+FOR EACH ROW EXECUTE FUNCTION trg_use_case_aendret();
+
+
+-- 3.3 Use case -> sensor mapping
+CREATE OR REPLACE FUNCTION trg_use_case_sensor_aendret()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM potentialeberegner.marker_anvendelser_for_use_cases(
+        CASE TG_OP
+            WHEN 'INSERT' THEN ARRAY[NEW.use_case_id]
+            WHEN 'DELETE' THEN ARRAY[OLD.use_case_id]
+            ELSE ARRAY[OLD.use_case_id, NEW.use_case_id]
+        END,
+        TG_TABLE_NAME
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_genberegning ON use_case_sensor_mapping;
+CREATE TRIGGER trg_genberegning
+AFTER INSERT OR UPDATE OR DELETE ON use_case_sensor_mapping
+FOR EACH ROW EXECUTE FUNCTION trg_use_case_sensor_aendret();
+
+
+-- 3.4 Anvendelse -> use case mapping: teksten markeres direkte
+CREATE OR REPLACE FUNCTION trg_anvendelse_use_case_aendret()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO potentialeberegner.genberegning_koe (anvendelse_tekst, aarsag)
+    SELECT DISTINCT t.anvendelse_tekst, TG_TABLE_NAME
+    FROM (
+        SELECT OLD.anvendelse_tekst WHERE TG_OP IN ('UPDATE', 'DELETE')
+        UNION ALL
+        SELECT NEW.anvendelse_tekst WHERE TG_OP IN ('INSERT', 'UPDATE')
+    ) t(anvendelse_tekst)
+    WHERE t.anvendelse_tekst IS NOT NULL
+    ON CONFLICT (anvendelse_tekst) DO UPDATE SET
+        aarsag = EXCLUDED.aarsag,
+        registreret = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_genberegning ON anvendelse_use_case_mapping;
+CREATE TRIGGER trg_genberegning
+AFTER INSERT OR UPDATE OR DELETE ON anvendelse_use_case_mapping
+FOR EACH ROW EXECUTE FUNCTION trg_anvendelse_use_case_aendret();
+
+
+-- -----------------------------------------------------------------------------
+-- 4. FUNKTION: Genberegn enheder for markerede anvendelser
+-- -----------------------------------------------------------------------------
+-- Tømmer køen og genberegner i samme transaktion, så en fejl efterlader
+-- køen urørt. FOR UPDATE SKIP LOCKED lader to samtidige kald dele køen.
+-- Afledte tabeller opdateres bagefter med afslut_genberegning().
+-- -----------------------------------------------------------------------------
+DROP FUNCTION IF EXISTS genberegn_aendrede() CASCADE;
+
+CREATE OR REPLACE FUNCTION genberegn_aendrede()
+RETURNS TABLE(antal_anvendelser INTEGER, antal_enheder INTEGER, antal_opdateret INTEGER, varighed INTERVAL) AS $$
+DECLARE
+    v_anvendelser TEXT[];
+BEGIN
+    WITH udtaget AS (
+        DELETE FROM potentialeberegner.genberegning_koe gk
+        WHERE gk.anvendelse_tekst IN (
+            SELECT anvendelse_tekst FROM potentialeberegner.genberegning_koe
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING gk.anvendelse_tekst
+    )
+    SELECT array_agg(anvendelse_tekst) INTO v_anvendelser FROM udtaget;
+
+    antal_anvendelser := COALESCE(array_length(v_anvendelser, 1), 0);
+
+    IF antal_anvendelser = 0 THEN
+        antal_enheder := 0;
+        antal_opdateret := 0;
+        varighed := INTERVAL '0';
+        RETURN NEXT;
+        RETURN;
+    END IF;
+
+    SELECT bp.antal_enheder, bp.antal_opdateret, bp.varighed
+    INTO antal_enheder, antal_opdateret, varighed
+    FROM potentialeberegner.beregn_potentialer(NULL, v_anvendelser) bp;
+
+    PERFORM potentialeberegner.afslut_genberegning();
+
+    RAISE NOTICE 'genberegn_aendrede: % anvendelser, % enheder beregnet, % opdateret',
+        antal_anvendelser, antal_enheder, antal_opdateret;
+    RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 5. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+UPDATE iot_sensor_types SET pris_min_kr = 400, pris_max_kr = 900
+WHERE sensor_type = 'CO2-måler';
+
+-- Se hvad der venter
+SELECT * FROM genberegning_koe ORDER BY registreret;
+
+-- Genberegn kun de berørte enheder
+SELECT * FROM genberegn_aendrede();
+*/
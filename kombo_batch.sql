@@ -0,0 +1,261 @@
+-- ============================================================================
+-- KOMBO BATCH - Kombo-alternativer og besparelser for alle bygninger
+-- ============================================================================
+-- Baggrund:
+--   get_kombo_alternativer(bygning_id) i kombo_sensorer.sql beregner én
+--   bygning ad gangen, så overbliksvisningen kunne ikke vise hvad kombo-
+--   sensorer sparer for en hel kommune eller hele landet.
+--
+--   opdater_bygning_kombo() laver samme beregning for alle bygninger i ét
+--   mængdebaseret gennemløb og gemmer resultatet:
+--
+--     bygning_kombo      én række per bygning og kombo-alternativ (samme tal
+--                        som get_kombo_alternativer); bedste = det alternativ
+--                        med størst besparelse_max i bygningen
+--     kombo_besparelse   summer per kombo for hele landet (per_kommune =
+--                        FALSE) og per kommune
+--
+--   Alternativerne i en bygning erstatter de samme sensorer (fx Temperatur +
+--   Luftfugtighed og Temperatur + Luftfugtighed + CO2), så de kan ikke lægges
+--   sammen. Summerne tæller derfor kun det bedste alternativ per bygning, og
+--   rækkerne for de enkelte kombos summerer til kommunens/landets total.
+--
+--   Tabellerne opdateres af afslut_genberegning() efter bygning_aggregat
+--   (kommunekode tages derfra, som i dashboardets kommunefilter). Efter
+--   ændringer i iot_sensor_kombos/kombo_komponenter køres
+--   SELECT opdater_bygning_kombo();
+--
+-- Kør EFTER kombo_sensorer.sql og bygning_aggregat.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. TABELLER
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS bygning_kombo (
+    bygning_id UUID NOT NULL,
+    kommunekode VARCHAR(4),
+    kombo_id INTEGER NOT NULL,
+    kombo_navn TEXT NOT NULL,
+    erstatter TEXT[],                            -- Bygningens sensortyper der erstattes
+    antal INTEGER NOT NULL,                      -- Antal kombo-sensorer
+    kombo_pris_min NUMERIC(12,2),
+    kombo_pris_max NUMERIC(12,2),
+    enkelt_pris_min NUMERIC(12,2),
+    enkelt_pris_max NUMERIC(12,2),
+    besparelse_min NUMERIC(12,2),
+    besparelse_max NUMERIC(12,2),
+    bedste BOOLEAN NOT NULL DEFAULT FALSE,       -- Største besparelse_max i bygningen
+    PRIMARY KEY (bygning_id, kombo_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bygning_kombo_kommune ON bygning_kombo(kommunekode) WHERE bedste;
+
+COMMENT ON TABLE bygning_kombo IS 'Kombo-alternativer per bygning (opdateres af afslut_genberegning)';
+
+CREATE TABLE IF NOT EXISTS kombo_besparelse (
+    per_kommune BOOLEAN NOT NULL,                -- FALSE = hele landet
+    kommunekode VARCHAR(4),
+    kombo_navn TEXT NOT NULL,
+    antal_bygninger BIGINT,                      -- Bygninger hvor kombo'en er bedste alternativ
+    antal_kombos BIGINT,
+    kombo_pris_min NUMERIC,
+    kombo_pris_max NUMERIC,
+    enkelt_pris_min NUMERIC,
+    enkelt_pris_max NUMERIC,
+    besparelse_min NUMERIC,
+    besparelse_max NUMERIC
+);
+
+CREATE INDEX IF NOT EXISTS idx_kombo_besparelse ON kombo_besparelse(per_kommune, kommunekode);
+
+COMMENT ON TABLE kombo_besparelse IS 'Kombo-besparelse per kombo for hele landet og per kommune (opdateres af afslut_genberegning)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. FUNKTION: Beregn alle bygninger
+-- -----------------------------------------------------------------------------
+-- Samme regler som get_kombo_alternativer(): PIR-aliasing, alle komponenter
+-- skal findes i bygningen, antal = mindste antal blandt komponenterne, og
+-- kun alternativer med potentiel besparelse (enkelt_max > kombo_min).
+-- DELETE i stedet for TRUNCATE, så læsere ser de gamle tal indtil commit.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION opdater_bygning_kombo()
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM potentialeberegner.bygning_kombo;
+
+    WITH bygning_sensorer AS (
+        SELECT sl.bygning, sl.sensor_type, SUM(sl.antal) AS antal
+        FROM potentialeberegner.bbr_sensor_linje sl
+        WHERE sl.bygning IS NOT NULL
+        GROUP BY sl.bygning, sl.sensor_type
+    ),
+    sensor_grupper AS (
+        SELECT
+            bs.bygning,
+            bs.sensor_type,
+            bs.antal,
+            CASE
+                WHEN ist.sensor_type IN ('Bevægelsessensor', 'Tilstedeværelsessensor') THEN 'PIR_GROUP'
+                ELSE ist.sensor_type
+            END AS sensor_group
+        FROM bygning_sensorer bs
+        JOIN potentialeberegner.iot_sensor_types ist ON ist.sensor_type = bs.sensor_type
+    ),
+    kombo_komponenter_norm AS (
+        SELECT DISTINCT ON (kk.kombo_id, sensor_group)
+            kk.kombo_id,
+            CASE
+                WHEN ist.sensor_type IN ('Bevægelsessensor', 'Tilstedeværelsessensor') THEN 'PIR_GROUP'
+                ELSE ist.sensor_type
+            END AS sensor_group,
+            ist.pris_min_kr,
+            ist.pris_max_kr
+        FROM potentialeberegner.kombo_komponenter kk
+        JOIN potentialeberegner.iot_sensor_types ist ON ist.id = kk.sensor_type_id
+    ),
+    kombos AS (
+        SELECT
+            k.id AS kombo_id,
+            k.kombo_navn,
+            k.pris_min_kr AS kombo_pris_per_stk_min,
+            k.pris_max_kr AS kombo_pris_per_stk_max,
+            COUNT(*) AS komponenter_kraevet,
+            -- SUM(DISTINCT) som i get_kombo_alternativer()
+            SUM(DISTINCT kkn.pris_min_kr) AS enkelt_pris_per_stk_min,
+            SUM(DISTINCT kkn.pris_max_kr) AS enkelt_pris_per_stk_max
+        FROM potentialeberegner.iot_sensor_kombos k
+        JOIN kombo_komponenter_norm kkn ON kkn.kombo_id = k.id
+        WHERE k.aktiv = TRUE
+        GROUP BY k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr
+    ),
+    kombo_match AS (
+        -- Bygning × kombo for de komponenter bygningen har
+        SELECT
+            sg.bygning,
+            kkn.kombo_id,
+            COUNT(DISTINCT kkn.sensor_group) AS komponenter_fundet,
+            MIN(sg.antal) AS antal_kombos,
+            ARRAY_AGG(DISTINCT sg.sensor_type ORDER BY sg.sensor_type) AS erstatter_sensorer
+        FROM sensor_grupper sg
+        JOIN kombo_komponenter_norm kkn ON kkn.sensor_group = sg.sensor_group
+        GROUP BY sg.bygning, kkn.kombo_id
+    ),
+    alternativer AS (
+        SELECT
+            km.bygning,
+            k.kombo_id,
+            k.kombo_navn,
+            km.erstatter_sensorer,
+            km.antal_kombos,
+            k.kombo_pris_per_stk_min * km.antal_kombos AS kombo_pris_min,
+            k.kombo_pris_per_stk_max * km.antal_kombos AS kombo_pris_max,
+            k.enkelt_pris_per_stk_min * km.antal_kombos AS enkelt_pris_min,
+            k.enkelt_pris_per_stk_max * km.antal_kombos AS enkelt_pris_max,
+            (k.enkelt_pris_per_stk_min - k.kombo_pris_per_stk_max) * km.antal_kombos AS besparelse_min,
+            (k.enkelt_pris_per_stk_max - k.kombo_pris_per_stk_min) * km.antal_kombos AS besparelse_max
+        FROM kombo_match km
+        JOIN kombos k ON k.kombo_id = km.kombo_id
+        -- Alle komponenter skal være til stede
+        WHERE km.komponenter_fundet = k.komponenter_kraevet
+          AND km.antal_kombos > 0
+          AND k.enkelt_pris_per_stk_max > k.kombo_pris_per_stk_min
+    )
+    INSERT INTO potentialeberegner.bygning_kombo (
+        bygning_id, kommunekode, kombo_id, kombo_navn, erstatter, antal,
+        kombo_pris_min, kombo_pris_max, enkelt_pris_min, enkelt_pris_max,
+        besparelse_min, besparelse_max, bedste
+    )
+    SELECT
+        a.bygning,
+        ba.kommunekode,
+        a.kombo_id,
+        a.kombo_navn,
+        a.erstatter_sensorer,
+        a.antal_kombos,
+        a.kombo_pris_min,
+        a.kombo_pris_max,
+        a.enkelt_pris_min,
+        a.enkelt_pris_max,
+        a.besparelse_min,
+        a.besparelse_max,
+        ROW_NUMBER() OVER (PARTITION BY a.bygning ORDER BY a.besparelse_max DESC, a.kombo_id) = 1
+    FROM alternativer a
+    LEFT JOIN potentialeberegner.bygning_aggregat ba ON ba.bygning_id = a.bygning;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    DELETE FROM potentialeberegner.kombo_besparelse;
+
+    INSERT INTO potentialeberegner.kombo_besparelse (
+        per_kommune, kommunekode, kombo_navn, antal_bygninger, antal_kombos,
+        kombo_pris_min, kombo_pris_max, enkelt_pris_min, enkelt_pris_max,
+        besparelse_min, besparelse_max
+    )
+    SELECT
+        GROUPING(bk.kommunekode) = 0,
+        bk.kommunekode,
+        bk.kombo_navn,
+        COUNT(*),
+        SUM(bk.antal),
+        SUM(bk.kombo_pris_min),
+        SUM(bk.kombo_pris_max),
+        SUM(bk.enkelt_pris_min),
+        SUM(bk.enkelt_pris_max),
+        SUM(bk.besparelse_min),
+        SUM(bk.besparelse_max)
+    FROM potentialeberegner.bygning_kombo bk
+    WHERE bk.bedste
+    GROUP BY GROUPING SETS ((bk.kombo_navn), (bk.kommunekode, bk.kombo_navn));
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 3. OPDATERING EFTER GENBEREGNING
+-- -----------------------------------------------------------------------------
+-- Efter bygning_aggregat (10), som kommunekoden læses fra.
+-- -----------------------------------------------------------------------------
+INSERT INTO genberegning_efterbehandling (navn, sql, raekkefoelge) VALUES
+('bygning_kombo', 'SELECT potentialeberegner.opdater_bygning_kombo()', 15)
+ON CONFLICT (navn) DO UPDATE SET sql = EXCLUDED.sql, raekkefoelge = EXCLUDED.raekkefoelge;
+
+
+-- -----------------------------------------------------------------------------
+-- 4. FØRSTE OPFYLDNING
+-- -----------------------------------------------------------------------------
+SELECT opdater_bygning_kombo();
+
+
+-- -----------------------------------------------------------------------------
+-- 5. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+-- Samlet kombo-besparelse for en kommune
+SELECT SUM(antal_bygninger) AS bygninger, SUM(besparelse_min) AS min, SUM(besparelse_max) AS max
+FROM kombo_besparelse
+WHERE per_kommune AND kommunekode = '0101';
+
+-- Kommuner med størst besparelse
+SELECT kommunekode, SUM(besparelse_max) AS besparelse_max
+FROM kombo_besparelse
+WHERE per_kommune
+GROUP BY kommunekode
+ORDER BY besparelse_max DESC
+LIMIT 20;
+
+-- Kontrol mod get_kombo_alternativer() for én bygning (forventet: ingen rækker)
+SELECT elem->>'kombo_navn', (elem->>'besparelse_max')::NUMERIC
+FROM jsonb_array_elements(get_kombo_alternativer(
+    (SELECT bygning_id FROM bygning_kombo LIMIT 1)
+)) elem
+EXCEPT
+SELECT kombo_navn, besparelse_max FROM bygning_kombo
+WHERE bygning_id = (SELECT bygning_id FROM bygning_kombo LIMIT 1);
+*/
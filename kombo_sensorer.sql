@@ -2,6 +2,7 @@
 -- KOMBO-SENSORER - Database udvidelse (v4 - RETTET BEREGNING)
 -- ============================================================================
 -- RETTET: Bruger nu pris-per-stk fra iot_sensor_types, ikke total-pris fra bygning
+-- Læser sensorantal fra bbr_sensor_linje (kør sensor_linjer.sql først)
 -- ============================================================================
 
 SET search_path TO potentialeberegner, public;
@@ -60,12 +61,11 @@ BEGIN
     WITH bygning_sensorer AS (
         -- Kun hent ANTAL af hver sensortype i bygningen
         SELECT 
-            sensor_elem->>'type' AS sensor_type,
-            SUM((sensor_elem->>'antal')::INTEGER) AS antal
-        FROM potentialeberegner.bbr_potentiale bp,
-             jsonb_array_elements(bp.iot_sensorer) AS sensor_elem
-        WHERE bp.bygning = p_bygning_id
-        GROUP BY sensor_elem->>'type'
+            sl.sensor_type,
+            SUM(sl.antal) AS antal
+        FROM potentialeberegner.bbr_sensor_linje sl
+        WHERE sl.bygning = p_bygning_id
+        GROUP BY sl.sensor_type
     ),
     sensor_med_priser AS (
         -- Join med iot_sensor_types for at få PRIS PER STK
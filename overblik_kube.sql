@@ -0,0 +1,171 @@
+-- ============================================================================
+-- OVERBLIK KUBE - Foraggregerede nøgletal per kommune, anvendelse, sensor og use case
+-- ============================================================================
+-- Baggrund:
+--   Overbliksvisningen og Grafana-statistikken aggregerer hele bbr_potentiale
+--   (og bbr_sensor_linje) ved hver visning. Tiden vokser med antallet af
+--   BBR-enheder, selvom resultatet kun er nogle tusinde rækker.
+--
+--   overblik_kube indeholder de samme nøgletal beregnet én gang efter hver
+--   genberegning (via afslut_genberegning()). Hver række er et niveau:
+--
+--     niveau        dimension                 bruges til
+--     'total'       -                         statistik, kommuner
+--     'anvendelse'  anvendelse                anvendelser, faciliteter
+--     'sensor'      sensor_type               sensorer
+--     'use_case'    use_case_navn, kategori   use cases
+--     'kategori'    kategori                  use case-kategorier
+--
+--   Hvert niveau findes for hele landet (per_kommune = FALSE, kommunekode
+--   NULL) og per kommune (per_kommune = TRUE). Antal bygninger kan ikke
+--   summeres på tværs af rækker, så alle niveauer er beregnet direkte.
+--
+--   Som i dashboardet tælles kun enheder med bygning; alle_enheder og
+--   facilitet-kolonnerne tæller alle enheder med anvendelse.
+--   Use cases udledes af anvendelsen (en enheds use cases bestemmes af dens
+--   anvendelsestekst, se inkrementel_beregning.sql) og har derfor kun
+--   antal_enheder.
+--
+-- Kør EFTER sensor_linjer.sql og batch_beregning.sql.
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. TABEL
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS overblik_kube (
+    niveau TEXT NOT NULL,                        -- total, anvendelse, sensor, use_case, kategori
+    per_kommune BOOLEAN NOT NULL,                -- FALSE = hele landet
+    kommunekode TEXT,
+    anvendelse TEXT,
+    sensor_type TEXT,
+    use_case_navn TEXT,
+    kategori TEXT,
+    antal_bygninger BIGINT,
+    antal_enheder BIGINT,
+    antal_sensorer BIGINT,
+    investering_min_kr NUMERIC,                  -- Sensor-niveau: sensorens samlede pris
+    investering_max_kr NUMERIC,
+    alle_enheder BIGINT,                         -- Inkl. enheder uden bygning (faciliteter)
+    total_toiletter BIGINT,
+    total_badevaerelser BIGINT,
+    total_koekken BIGINT,
+    total_faciliteter BIGINT
+);
+
+CREATE INDEX IF NOT EXISTS idx_overblik_kube_niveau ON overblik_kube(niveau, per_kommune, kommunekode);
+
+COMMENT ON TABLE overblik_kube IS 'Foraggregerede overbliksnøgletal (opdateres af afslut_genberegning)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. FUNKTION: Genopbyg kuben
+-- -----------------------------------------------------------------------------
+-- DELETE i stedet for TRUNCATE, så læsere ser den gamle kube indtil commit.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION opdater_overblik_kube()
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM potentialeberegner.overblik_kube;
+
+    -- 2.1 Enheder: total og anvendelse, for hele landet og per kommune
+    INSERT INTO potentialeberegner.overblik_kube (
+        niveau, per_kommune, kommunekode, anvendelse,
+        antal_bygninger, antal_enheder, antal_sensorer, investering_min_kr, investering_max_kr,
+        alle_enheder, total_toiletter, total_badevaerelser, total_koekken, total_faciliteter
+    )
+    SELECT
+        CASE WHEN GROUPING(bp.enh020_enhedens_anvendelse_txt) = 0 THEN 'anvendelse' ELSE 'total' END,
+        GROUPING(bp.kommunekode) = 0,
+        bp.kommunekode,
+        bp.enh020_enhedens_anvendelse_txt,
+        COUNT(DISTINCT bp.bygning),
+        COUNT(*) FILTER (WHERE bp.bygning IS NOT NULL),
+        COALESCE(SUM(bp.total_antal_sensorer) FILTER (WHERE bp.bygning IS NOT NULL), 0),
+        COALESCE(SUM(bp.samlet_investering_min_kr) FILTER (WHERE bp.bygning IS NOT NULL), 0),
+        COALESCE(SUM(bp.samlet_investering_max_kr) FILTER (WHERE bp.bygning IS NOT NULL), 0),
+        COUNT(*),
+        COALESCE(SUM(bp.antal_toiletter), 0),
+        COALESCE(SUM(bp.antal_badevaerelser), 0),
+        COALESCE(SUM(bp.antal_koekken), 0),
+        COALESCE(SUM(bp.antal_toiletter + bp.antal_badevaerelser + bp.antal_koekken), 0)
+    FROM potentialeberegner.bbr_potentiale bp
+    WHERE bp.bygning IS NOT NULL OR bp.enh020_enhedens_anvendelse_txt IS NOT NULL
+    GROUP BY GROUPING SETS (
+        (),
+        (bp.kommunekode),
+        (bp.enh020_enhedens_anvendelse_txt),
+        (bp.kommunekode, bp.enh020_enhedens_anvendelse_txt)
+    );
+
+    -- 2.2 Sensorer fra linjetabellen
+    INSERT INTO potentialeberegner.overblik_kube (
+        niveau, per_kommune, kommunekode, sensor_type,
+        antal_bygninger, antal_enheder, antal_sensorer, investering_min_kr, investering_max_kr
+    )
+    SELECT
+        'sensor',
+        GROUPING(bp.kommunekode) = 0,
+        bp.kommunekode,
+        sl.sensor_type,
+        COUNT(DISTINCT sl.bygning),
+        COUNT(*),
+        SUM(sl.antal),
+        SUM(sl.pris_total_min),
+        SUM(sl.pris_total_max)
+    FROM potentialeberegner.bbr_sensor_linje sl
+    JOIN potentialeberegner.bbr_potentiale bp ON bp.id = sl.enhed_id
+    WHERE bp.bygning IS NOT NULL
+    GROUP BY GROUPING SETS ((sl.sensor_type), (bp.kommunekode, sl.sensor_type));
+
+    -- 2.3 Use cases og kategorier: use_cases udfoldes for én enhed per
+    -- anvendelse og vægtes med anvendelsens antal enheder
+    WITH anvendelse_use_cases AS (
+        SELECT k.per_kommune, k.kommunekode, k.anvendelse, k.antal_enheder, uc.use_case_navn, uc.kategori
+        FROM potentialeberegner.overblik_kube k,
+             LATERAL (
+                 SELECT DISTINCT uc_elem->>'navn' AS use_case_navn, uc_elem->>'kategori' AS kategori
+                 FROM (
+                     SELECT bp.use_cases
+                     FROM potentialeberegner.bbr_potentiale bp
+                     WHERE bp.enh020_enhedens_anvendelse_txt = k.anvendelse
+                     LIMIT 1
+                 ) eksempel,
+                 jsonb_array_elements(eksempel.use_cases) AS uc_elem
+             ) uc
+        WHERE k.niveau = 'anvendelse' AND k.antal_enheder > 0
+    )
+    INSERT INTO potentialeberegner.overblik_kube (niveau, per_kommune, kommunekode, use_case_navn, kategori, antal_enheder)
+    SELECT 'use_case', per_kommune, kommunekode, use_case_navn, kategori, SUM(antal_enheder)
+    FROM anvendelse_use_cases
+    GROUP BY per_kommune, kommunekode, use_case_navn, kategori
+    UNION ALL
+    SELECT 'kategori', per_kommune, kommunekode, NULL, kategori, SUM(antal_enheder)
+    FROM (
+        -- En anvendelse tælles én gang per kategori
+        SELECT DISTINCT per_kommune, kommunekode, anvendelse, kategori, antal_enheder
+        FROM anvendelse_use_cases
+    ) per_anvendelse
+    GROUP BY per_kommune, kommunekode, kategori;
+
+    SELECT COUNT(*) INTO v_count FROM potentialeberegner.overblik_kube;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 3. OPDATERING EFTER GENBEREGNING
+-- -----------------------------------------------------------------------------
+INSERT INTO genberegning_efterbehandling (navn, sql, raekkefoelge) VALUES
+('overblik_kube', 'SELECT potentialeberegner.opdater_overblik_kube()', 20)
+ON CONFLICT (navn) DO UPDATE SET sql = EXCLUDED.sql, raekkefoelge = EXCLUDED.raekkefoelge;
+
+
+-- -----------------------------------------------------------------------------
+-- 4. FØRSTE OPFYLDNING
+-- -----------------------------------------------------------------------------
+SELECT opdater_overblik_kube();
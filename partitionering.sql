@@ -0,0 +1,279 @@
+-- ============================================================================
+-- PARTITIONERING - bbr_potentiale partitioneret efter kommunekode
+-- ============================================================================
+-- Baggrund:
+--   bbr_potentiale er én stor heap uden indeks på bygning, selvom alle
+--   detaljeforespørgsler filtrerer på bp.bygning. Enhederne i en bygning
+--   ligger spredt over hele tabellen, og et kommunefilter læser indekset
+--   for hele landet.
+--
+--   Efter denne fil er bbr_potentiale LIST-partitioneret efter kommunekode
+--   (én partition per kommune, bbr_potentiale_k<kode>) med en standard-
+--   partition til NULL og kommuner uden egen partition. Det giver:
+--     - kommunefiltre (kommunekode = ...) læser kun én partition
+--     - indeks på bygning, og enhederne ligger samlet per bygning
+--       (indlæses sorteret; klyng_bbr_potentiale() genskaber rækkefølgen)
+--     - genberegning per kommune (beregn_potentialer(NULL, NULL, kode))
+--       rører kun én partition
+--
+--   Eksisterende data flyttes én gang: den gamle tabel omdøbes, kopieres
+--   sorteret efter kommunekode og bygning ind i den partitionerede tabel og
+--   slettes. Indekser, triggers, kommentarer og views (også materialiserede,
+--   fx bygning_aggregat) der afhænger af tabellen, genoprettes med samme
+--   definition. Er tabellen allerede partitioneret, oprettes kun manglende
+--   partitioner og funktioner.
+--
+--   Bemærk: en partitioneret tabel kan ikke have en primærnøgle uden
+--   partitionsnøglen, og kommunekode kan være NULL. id er derfor indekseret
+--   (unik via sekvensen), og bbr_sensor_linje's fremmednøgle (ON DELETE
+--   CASCADE) erstattes af en slette-trigger.
+--
+-- Kør EFTER sensor_linjer.sql og de øvrige scripts (views genoprettes).
+-- Nye kommuner i en import lander i standardpartitionen; kør derefter
+-- SELECT opret_kommune_partitioner();
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. FUNKTION: Partition for én kommune
+-- -----------------------------------------------------------------------------
+-- Har standardpartitionen allerede rækker for kommunen, flyttes de over
+-- (sorteret efter bygning) før partitionen tilknyttes. Rækkerne flyttes
+-- direkte mellem partitionerne, så statement-triggers på bbr_potentiale
+-- (sensorlinjerne) ikke fyrer.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION opret_kommune_partition(p_kommunekode VARCHAR)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_partition TEXT := 'bbr_potentiale_k' || p_kommunekode;
+BEGIN
+    IF to_regclass('potentialeberegner.' || quote_ident(v_partition)) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM potentialeberegner.bbr_potentiale_standard WHERE kommunekode = p_kommunekode) THEN
+        EXECUTE format('CREATE TABLE potentialeberegner.%I (LIKE potentialeberegner.bbr_potentiale INCLUDING DEFAULTS INCLUDING STORAGE)',
+                       v_partition);
+        EXECUTE format($sql$
+            WITH flyttet AS (
+                DELETE FROM potentialeberegner.bbr_potentiale_standard
+                WHERE kommunekode = %L
+                RETURNING *
+            )
+            INSERT INTO potentialeberegner.%I SELECT * FROM flyttet ORDER BY bygning, id
+        $sql$, p_kommunekode, v_partition);
+        EXECUTE format('ALTER TABLE potentialeberegner.bbr_potentiale ATTACH PARTITION potentialeberegner.%I FOR VALUES IN (%L)',
+                       v_partition, p_kommunekode);
+    ELSE
+        EXECUTE format('CREATE TABLE potentialeberegner.%I PARTITION OF potentialeberegner.bbr_potentiale FOR VALUES IN (%L)',
+                       v_partition, p_kommunekode);
+    END IF;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitioner for alle kommuner i standardpartitionen (efter import)
+CREATE OR REPLACE FUNCTION opret_kommune_partitioner()
+RETURNS INTEGER AS $$
+DECLARE
+    v_kode VARCHAR;
+    v_count INTEGER := 0;
+BEGIN
+    FOR v_kode IN
+        SELECT DISTINCT kommunekode FROM potentialeberegner.bbr_potentiale_standard
+        WHERE kommunekode IS NOT NULL
+        ORDER BY kommunekode
+    LOOP
+        IF potentialeberegner.opret_kommune_partition(v_kode) THEN
+            v_count := v_count + 1;
+        END IF;
+    END LOOP;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 2. MIGRERING: Flyt en upartitioneret bbr_potentiale over
+-- -----------------------------------------------------------------------------
+DO $$
+DECLARE
+    v_gammel OID := 'potentialeberegner.bbr_potentiale'::regclass;
+    v_def RECORD;
+    v_kode VARCHAR;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = v_gammel) = 'p' THEN
+        RAISE NOTICE 'bbr_potentiale er allerede partitioneret';
+        RETURN;
+    END IF;
+
+    -- Definitioner gemmes før omdøbningen, så de stadig peger på bbr_potentiale.
+    -- Indekset på kommunekode udelades: partitionerne afgrænser allerede kommunen.
+    CREATE TEMP TABLE partition_genopret (nr SERIAL, sql TEXT) ON COMMIT DROP;
+
+    INSERT INTO partition_genopret (sql)
+    SELECT indexdef FROM pg_indexes
+    WHERE schemaname = 'potentialeberegner' AND tablename = 'bbr_potentiale'
+      AND indexname NOT IN ('bbr_potentiale_pkey', 'idx_bbr_potentiale_kommunekode');
+
+    INSERT INTO partition_genopret (sql)
+    SELECT pg_get_triggerdef(t.oid) FROM pg_trigger t
+    WHERE t.tgrelid = v_gammel AND NOT t.tgisinternal;
+
+    -- Views og materialiserede views der (også indirekte) bygger på tabellen,
+    -- i den rækkefølge de skal oprettes igen
+    INSERT INTO partition_genopret (sql)
+    WITH RECURSIVE afhaengige(oid, niveau) AS (
+        SELECT r.ev_class, 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = v_gammel AND r.ev_class <> v_gammel
+        UNION
+        SELECT r.ev_class, a.niveau + 1
+        FROM afhaengige a
+        JOIN pg_depend d ON d.refobjid = a.oid
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.classid = 'pg_rewrite'::regclass AND r.ev_class <> a.oid
+    ),
+    views AS (
+        SELECT a.oid, MAX(a.niveau) AS niveau FROM afhaengige a GROUP BY a.oid
+    )
+    SELECT s.sql FROM (
+        SELECT v.niveau, c.oid, 1 AS trin,
+               format('CREATE %s %s AS %s',
+                      CASE c.relkind WHEN 'm' THEN 'MATERIALIZED VIEW' ELSE 'VIEW' END,
+                      c.oid::regclass, rtrim(pg_get_viewdef(c.oid), ';')) AS sql
+        FROM views v JOIN pg_class c ON c.oid = v.oid
+        UNION ALL
+        SELECT v.niveau, c.oid, 2, pg_get_indexdef(i.indexrelid)
+        FROM views v JOIN pg_class c ON c.oid = v.oid JOIN pg_index i ON i.indrelid = c.oid
+        UNION ALL
+        SELECT v.niveau, c.oid, 3,
+               format('COMMENT ON %s %s IS %L',
+                      CASE c.relkind WHEN 'm' THEN 'MATERIALIZED VIEW' ELSE 'VIEW' END,
+                      c.oid::regclass, obj_description(c.oid, 'pg_class'))
+        FROM views v JOIN pg_class c ON c.oid = v.oid
+        WHERE obj_description(c.oid, 'pg_class') IS NOT NULL
+    ) s
+    ORDER BY s.niveau, s.oid, s.trin;
+
+    ALTER TABLE bbr_potentiale RENAME TO bbr_potentiale_upartitioneret;
+
+    CREATE TABLE bbr_potentiale (
+        LIKE bbr_potentiale_upartitioneret INCLUDING DEFAULTS INCLUDING STORAGE INCLUDING COMMENTS
+    ) PARTITION BY LIST (kommunekode);
+    ALTER SEQUENCE bbr_potentiale_id_seq OWNED BY bbr_potentiale.id;
+
+    CREATE TABLE bbr_potentiale_standard PARTITION OF bbr_potentiale DEFAULT;
+    FOR v_kode IN
+        SELECT DISTINCT kommunekode FROM bbr_potentiale_upartitioneret
+        WHERE kommunekode IS NOT NULL
+        ORDER BY kommunekode
+    LOOP
+        PERFORM opret_kommune_partition(v_kode);
+    END LOOP;
+
+    -- Sorteret indlæsning: enhederne i en bygning ender på samme sider
+    INSERT INTO bbr_potentiale
+    SELECT * FROM bbr_potentiale_upartitioneret
+    ORDER BY kommunekode, bygning, id;
+
+    -- CASCADE fjerner views og bbr_sensor_linje's fremmednøgle
+    DROP TABLE bbr_potentiale_upartitioneret CASCADE;
+
+    CREATE INDEX idx_bbr_potentiale_id ON bbr_potentiale (id);
+    CREATE INDEX idx_bbr_potentiale_bygning ON bbr_potentiale (bygning);
+
+    FOR v_def IN SELECT sql FROM partition_genopret ORDER BY nr LOOP
+        EXECUTE v_def.sql;
+    END LOOP;
+
+    ANALYZE bbr_potentiale;
+END;
+$$;
+
+-- Indekserne findes allerede efter migreringen; her for en tabel der er
+-- oprettet partitioneret på anden vis
+CREATE INDEX IF NOT EXISTS idx_bbr_potentiale_id ON bbr_potentiale (id);
+CREATE INDEX IF NOT EXISTS idx_bbr_potentiale_bygning ON bbr_potentiale (bygning);
+
+COMMENT ON TABLE bbr_potentiale IS 'BBR-enheder med use cases og sensorer, LIST-partitioneret efter kommunekode (partitionering.sql)';
+
+
+-- -----------------------------------------------------------------------------
+-- 3. SENSORLINJER: Sletning via trigger i stedet for fremmednøgle
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION trg_sensor_linjer_slet()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM potentialeberegner.bbr_sensor_linje
+    WHERE enhed_id IN (SELECT g.id FROM gamle g);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sensor_linjer_delete ON bbr_potentiale;
+CREATE TRIGGER trg_sensor_linjer_delete
+AFTER DELETE ON bbr_potentiale
+REFERENCING OLD TABLE AS gamle
+FOR EACH STATEMENT EXECUTE FUNCTION trg_sensor_linjer_slet();
+
+
+-- -----------------------------------------------------------------------------
+-- 4. FUNKTION: Klyng partitionerne efter bygning
+-- -----------------------------------------------------------------------------
+-- Opdateringer (genberegning) skriver nye rækkeversioner hvor der er plads,
+-- så rækkefølgen efter bygning udvandes med tiden. CLUSTER omskriver én
+-- partition ad gangen og låser kun den. p_kommunekode = NULL klynger alle.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION klyng_bbr_potentiale(p_kommunekode VARCHAR DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_partition RECORD;
+    v_count INTEGER := 0;
+BEGIN
+    FOR v_partition IN
+        SELECT p.inhrelid::regclass AS partition, ic.relname AS indeks
+        FROM pg_inherits p
+        JOIN pg_index i ON i.indrelid = p.inhrelid
+        JOIN pg_inherits pi ON pi.inhrelid = i.indexrelid
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        WHERE p.inhparent = 'potentialeberegner.bbr_potentiale'::regclass
+          AND pi.inhparent = 'potentialeberegner.idx_bbr_potentiale_bygning'::regclass
+          AND (p_kommunekode IS NULL
+               OR p.inhrelid = to_regclass('potentialeberegner.' || quote_ident('bbr_potentiale_k' || p_kommunekode)))
+        ORDER BY 1
+    LOOP
+        EXECUTE format('CLUSTER %s USING %I', v_partition.partition, v_partition.indeks);
+        v_count := v_count + 1;
+    END LOOP;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 5. EKSEMPEL
+-- -----------------------------------------------------------------------------
+/*
+-- Kun én partition læses (Seq/Index Scan on bbr_potentiale_k0101)
+EXPLAIN SELECT COUNT(*) FROM bbr_potentiale WHERE kommunekode = '0101';
+
+-- Enhederne i en bygning ligger på få sider
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM bbr_potentiale WHERE bygning = (SELECT bygning FROM bbr_potentiale LIMIT 1);
+
+-- Efter import af nye kommuner
+SELECT opret_kommune_partitioner();
+
+-- Genberegn og klyng én kommune
+SELECT * FROM beregn_potentialer(NULL, NULL, '0101');
+SELECT klyng_bbr_potentiale('0101');
+
+-- Partitioner og størrelse
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), pg_size_pretty(pg_relation_size(c.oid))
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'bbr_potentiale'::regclass
+ORDER BY 1;
+*/
@@ -0,0 +1,33 @@
+"""
+Potentialeberegner - genbrugelig beregningskerne uden Streamlit
+
+Navnene herunder importeres først, når de bruges (PEP 562), så
+`import potentialeberegner.data` ikke trækker pandas og numpy med.
+"""
+
+import importlib
+
+# Navn -> modul det eksporteres fra
+_EKSPORT = {
+    'Katalog': '.beregning',
+    'hent_katalog': '.beregning',
+    'hent_enheder': '.beregning',
+    'beregn_potentialer': '.beregning',
+    'skriv_potentialer': '.beregning',
+    'Datalag': '.data',
+    'HukommelsesCache': '.data',
+}
+
+__all__ = list(_EKSPORT)
+
+
+def __getattr__(navn):
+    if navn not in _EKSPORT:
+        raise AttributeError(f"module {__name__!r} has no attribute {navn!r}")
+    vaerdi = getattr(importlib.import_module(_EKSPORT[navn], __name__), navn)
+    globals()[navn] = vaerdi
+    return vaerdi
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
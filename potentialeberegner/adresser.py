@@ -0,0 +1,148 @@
+"""
+Adresseindeks i hukommelsen
+
+Alle adresser med bygning holdes sorteret i én sammenhængende tekst med
+offsets (numpy), så en adresse koster omtrent sin længde i bytes plus
+offsets og 16 bytes bygnings-ID. Søgning:
+
+    præfiks   adresser der begynder med søgeteksten (binær søgning)
+    ord       adresser hvor hvert ord i søgeteksten er begyndelsen af et ord
+              i adressen ("vester 12 aarhus" finder "Vestergade 12, 8000 Aarhus C")
+
+Ordsøgningen bruger et inverteret indeks: sorterede ord og adressenumre
+(int32) i ét array, hvor ord med samme begyndelse ligger samlet.
+"""
+
+import re
+import sys
+import uuid
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+_ORD = re.compile(r'\w+')
+_MAX_TEGN = '\U0010ffff'
+
+
+def normaliser(adresse):
+    """Små bogstaver og enkelte mellemrum (nøglen der søges i)"""
+    return ' '.join(adresse.lower().split())
+
+
+def _ord(tekst):
+    return _ORD.findall(tekst)
+
+
+class _Tekster:
+    """Sorterede tekster i én streng med offsets; understøtter len, [] og bisect"""
+
+    def __init__(self, tekster):
+        laengder = np.fromiter((len(t) for t in tekster), dtype=np.int64, count=len(tekster))
+        self.offsets = np.concatenate([[0], np.cumsum(laengder)])
+        self.tekst = ''.join(tekster)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.tekst[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self.tekst) + self.offsets.nbytes
+
+
+def _praefiks_interval(sekvens, praefiks):
+    """[lo, hi) for elementerne i en sorteret sekvens der begynder med praefiks"""
+    return bisect_left(sekvens, praefiks), bisect_left(sekvens, praefiks + _MAX_TEGN)
+
+
+class AdresseIndeks:
+    """
+    Søgbart indeks over (adresse, bygnings-ID).
+    Opret med AdresseIndeks.fra_dataframe(df) med kolonnerne adresse og bygning_id.
+    """
+
+    def __init__(self, adresser, bygninger):
+        noegler = [normaliser(a) for a in adresser]
+        orden = sorted(range(len(noegler)), key=noegler.__getitem__)
+        noegler = [noegler[i] for i in orden]
+        self._noegler = _Tekster(noegler)
+        self._adresser = _Tekster([adresser[i] for i in orden])
+        self._bygninger = np.frombuffer(
+            b''.join(_uuid_bytes(bygninger[i]) for i in orden), dtype=np.uint8
+        ).reshape(-1, 16)
+
+        # Inverteret indeks: adressenumre per ord (stigende, da adresserne gennemløbes i orden)
+        poster_per_ord = {}
+        for nr, noegle in enumerate(noegler):
+            for ord_ in set(_ord(noegle)):
+                poster = poster_per_ord.get(ord_)
+                if poster is None:
+                    poster = poster_per_ord[ord_] = array('i')
+                poster.append(nr)
+        self._ordliste = sorted(poster_per_ord)
+        laengder = np.fromiter((len(poster_per_ord[o]) for o in self._ordliste), dtype=np.int64,
+                               count=len(self._ordliste))
+        self._ord_start = np.concatenate([[0], np.cumsum(laengder)])
+        self._poster = np.concatenate(
+            [np.frombuffer(poster_per_ord[o], dtype=np.int32) for o in self._ordliste]
+        ) if self._ordliste else np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def fra_dataframe(cls, df):
+        """Indeks fra en DataFrame med unikke par af adresse og bygning_id (SELECT DISTINCT)"""
+        df = df.dropna(subset=['adresse', 'bygning_id'])
+        return cls(df['adresse'].tolist(), df['bygning_id'].tolist())
+
+    def __len__(self):
+        return len(self._noegler)
+
+    @property
+    def nbytes(self):
+        """Omtrentligt hukommelsesforbrug i bytes"""
+        return (self._noegler.nbytes + self._adresser.nbytes + self._bygninger.nbytes
+                + self._ord_start.nbytes + self._poster.nbytes
+                + sum(sys.getsizeof(o) for o in self._ordliste))
+
+    def praefiks(self, tekst, antal=10):
+        """Adressenumre (alfabetisk) for adresser der begynder med tekst"""
+        lo, hi = _praefiks_interval(self._noegler, normaliser(tekst))
+        return np.arange(lo, min(hi, lo + antal))
+
+    def ordsoeg(self, tekst, antal=10):
+        """Adressenumre (alfabetisk) hvor hvert ord i tekst begynder et ord i adressen"""
+        intervaller = []
+        for ord_ in set(_ord(tekst.lower())):
+            lo, hi = _praefiks_interval(self._ordliste, ord_)
+            intervaller.append((self._ord_start[lo], self._ord_start[hi]))
+        if not intervaller:
+            return np.zeros(0, dtype=np.int32)
+
+        # Mindste postliste først; de øvrige ord filtrerer kandidaterne
+        intervaller.sort(key=lambda iv: iv[1] - iv[0])
+        start, slut = intervaller[0]
+        # Foreningen af ordenes postlister (et ord kan forekomme i flere af dem)
+        maske = np.zeros(len(self), dtype=bool)
+        maske[self._poster[start:slut]] = True
+        kandidater = np.flatnonzero(maske)
+        for start, slut in intervaller[1:]:
+            if len(kandidater) == 0:
+                break
+            kandidater = kandidater[np.isin(kandidater, self._poster[start:slut], kind='table')]
+        return kandidater[:antal]
+
+    def soeg(self, tekst, antal=10):
+        """
+        Op til antal (adresse, bygning_id): præfiks-match først, derefter ord-match.
+        """
+        numre = list(self.praefiks(tekst, antal))
+        if len(numre) < antal:
+            fundet = set(numre)
+            numre += [nr for nr in self.ordsoeg(tekst, antal + len(numre)) if nr not in fundet][:antal - len(numre)]
+        return [(self._adresser[nr], str(uuid.UUID(bytes=self._bygninger[nr].tobytes()))) for nr in numre]
+
+
+def _uuid_bytes(vaerdi):
+    return vaerdi.bytes if isinstance(vaerdi, uuid.UUID) else uuid.UUID(str(vaerdi)).bytes
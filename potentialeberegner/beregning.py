@@ -0,0 +1,307 @@
+"""
+Vektoriseret potentialeberegning i Python
+
+Spejler get_use_cases_for_anvendelse() og get_sensors_with_quantities()
+(inkl. areal_per_500m2 fra patch_co2_500m2.sql) for en hel DataFrame af
+BBR-enheder ad gangen. Katalogtabellerne læses én gang, og sensorantal
+beregnes kolonnevis med numpy i stedet for én funktionskald per enhed.
+"""
+
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# =============================================================================
+# KONSTANTER
+# =============================================================================
+
+DEFAULT_SCHEMA = "potentialeberegner"
+
+# Toiletforhold der tæller som toiletter (andre værdier nulstiller antal)
+TOILETFORHOLD = ('Vandskyllende toilet i enheden', 'Vandskyllende toilet uden for enheden')
+
+# Køkkenforhold der giver antal_koekken = 1
+KOEKKENFORHOLD = ('Eget køkken med afløb', 'Adgang til fælles køkken')
+
+# Multiplikator-kilder: antal sensorer som funktion af enhedens faciliteter.
+# Ukendte kilder behandles som 'enhed' (ELSE 1 i SQL).
+MULTIPLIKATOR_KILDER = {
+    'enhed': lambda f: np.ones(len(f), dtype=np.int64),
+    'toilet': lambda f: np.maximum(f['antal_toiletter'].to_numpy(), 1),
+    'badevaerelser': lambda f: np.maximum(f['antal_badevaerelser'].to_numpy(), 1),
+    'koekken': lambda f: np.maximum(f['antal_koekken'].to_numpy(), 1),
+    'areal_per_100m2': lambda f: np.maximum(np.ceil(f['areal_m2'].to_numpy() / 100), 1).astype(np.int64),
+    'areal_per_500m2': lambda f: np.maximum(np.ceil(f['areal_m2'].to_numpy() / 500), 1).astype(np.int64),
+}
+
+# BBR-kolonner der skal bruges som input
+ENHED_KOLONNER = [
+    'id',
+    'enh020_enhedens_anvendelse_txt',
+    'enh032_toiletforhold_txt',
+    'enh034_koekkenforhold_txt',
+    'enh065_antal_vandskyllede_toiletter',
+    'enh066_antal_badevaerelser',
+    'enh026_enhedenssamledeareal',
+]
+
+# =============================================================================
+# KATALOG
+# =============================================================================
+
+@dataclass(frozen=True)
+class Katalog:
+    """De små katalogtabeller der styrer beregningen"""
+    use_cases: pd.DataFrame
+    sensor_typer: pd.DataFrame
+    use_case_sensor: pd.DataFrame
+    anvendelse_use_case: pd.DataFrame
+
+
+def hent_katalog(conn, schema=DEFAULT_SCHEMA):
+    """Læs katalogtabellerne én gang fra databasen"""
+    def read(sql):
+        return pd.read_sql(text(sql), conn)
+
+    return Katalog(
+        use_cases=read(f"SELECT id, use_case_navn, kategori, link FROM {schema}.use_cases"),
+        sensor_typer=read(f"""
+            SELECT id, sensor_type, pris_min_kr, pris_max_kr, aktiv
+            FROM {schema}.iot_sensor_types
+        """),
+        use_case_sensor=read(f"""
+            SELECT use_case_id, sensor_type_id, er_primaer, multiplikator_kilde
+            FROM {schema}.use_case_sensor_mapping
+        """),
+        anvendelse_use_case=read(f"""
+            SELECT id, anvendelse_tekst, use_case_id, relevans_score
+            FROM {schema}.anvendelse_use_case_mapping
+        """),
+    )
+
+
+def hent_enheder(conn, where_clause='', schema=DEFAULT_SCHEMA, params=None):
+    """Hent input-kolonner for enheder (where_clause starter med AND, params er dens bundne parametre)"""
+    sql = f"""
+    SELECT {', '.join(ENHED_KOLONNER)}
+    FROM {schema}.bbr_potentiale bp
+    WHERE 1=1
+    {where_clause}
+    """
+    return pd.read_sql(text(sql), conn, params=params)
+
+# =============================================================================
+# SKABELONER (beregnes én gang per katalog)
+# =============================================================================
+
+def _tekst(value):
+    """NULL-værdier fra pandas (NaN/None) som JSON null"""
+    return None if pd.isna(value) else value
+
+
+def byg_use_case_skabelon(katalog):
+    """Use cases per anvendelsestekst som JSON-tekst og antal"""
+    df = katalog.anvendelse_use_case.merge(
+        katalog.use_cases, left_on='use_case_id', right_on='id', suffixes=('_mapping', '')
+    )
+    # ORDER BY relevans_score DESC (stabil på mapping-id ved lighed)
+    df = df.sort_values(['anvendelse_tekst', 'relevans_score', 'id_mapping'],
+                        ascending=[True, False, True], kind='stable')
+
+    rows = {}
+    for anvendelse, gruppe in df.groupby('anvendelse_tekst', sort=False):
+        use_cases = [
+            {
+                'id': int(r.id),
+                'navn': _tekst(r.use_case_navn),
+                'kategori': _tekst(r.kategori),
+                'relevans': int(r.relevans_score),
+                'link': _tekst(r.link),
+            }
+            for r in gruppe.itertuples(index=False)
+        ]
+        rows[anvendelse] = (json.dumps(use_cases, ensure_ascii=False), len(use_cases))
+
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['use_cases', 'antal_use_cases'])
+
+
+def byg_sensor_skabelon(katalog):
+    """
+    Én række per (anvendelsestekst, sensortype) med antal mappings per
+    multiplikator-kilde. get_sensors_with_quantities summerer antal over alle
+    use cases der bruger sensoren, så antal for en enhed er
+    sum(n_kilde * multiplikator(kilde)).
+    """
+    aktive = katalog.sensor_typer[katalog.sensor_typer['aktiv'].fillna(False).astype(bool)]
+    df = (katalog.anvendelse_use_case[['anvendelse_tekst', 'use_case_id']]
+          .merge(katalog.use_case_sensor, on='use_case_id')
+          .merge(aktive, left_on='sensor_type_id', right_on='id'))
+
+    kilde = df['multiplikator_kilde'].where(df['multiplikator_kilde'].isin(MULTIPLIKATOR_KILDER), 'enhed')
+    df = df.assign(kilde=kilde)
+
+    noegle = ['anvendelse_tekst', 'sensor_type_id']
+    antal_per_kilde = (df.pivot_table(index=noegle, columns='kilde', values='use_case_id',
+                                      aggfunc='count', fill_value=0)
+                         .reindex(columns=list(MULTIPLIKATOR_KILDER), fill_value=0))
+
+    attributter = df.groupby(noegle).agg(
+        sensor_type=('sensor_type', 'first'),
+        pris_min=('pris_min_kr', 'first'),
+        pris_max=('pris_max_kr', 'first'),
+        er_primaer=('er_primaer', lambda s: bool(s.fillna(False).any())),
+        for_use_cases=('use_case_id', lambda s: sorted(set(int(v) for v in s))),
+    )
+
+    skabelon = attributter.join(antal_per_kilde).reset_index()
+    skabelon['pris_min'] = skabelon['pris_min'].astype(float)
+    skabelon['pris_max'] = skabelon['pris_max'].astype(float)
+
+    # Den del af JSON-objektet der ikke afhænger af enheden
+    skabelon['json_prefix'] = [
+        json.dumps({
+            'id': int(r.sensor_type_id),
+            'type': r.sensor_type,
+            'pris_min': r.pris_min,
+            'pris_max': r.pris_max,
+            'er_primaer': r.er_primaer,
+            'for_use_cases': r.for_use_cases,
+        }, ensure_ascii=False)[:-1]
+        for r in skabelon.itertuples(index=False)
+    ]
+    return skabelon
+
+# =============================================================================
+# BEREGNING
+# =============================================================================
+
+def beregn_faciliteter(enheder):
+    """Facilitet-tællinger som i update_enhed_potentiale()"""
+    toiletforhold = enheder['enh032_toiletforhold_txt']
+    toiletter = pd.to_numeric(enheder['enh065_antal_vandskyllede_toiletter']).fillna(0).astype(np.int64)
+    # NULL toiletforhold nulstiller ikke (IF ... NOT IN er NULL i plpgsql)
+    nulstil = toiletforhold.notna() & ~toiletforhold.isin(TOILETFORHOLD)
+
+    return pd.DataFrame({
+        'id': enheder['id'].to_numpy(),
+        'anvendelse': enheder['enh020_enhedens_anvendelse_txt'].to_numpy(),
+        'antal_toiletter': np.where(nulstil, 0, toiletter),
+        'antal_badevaerelser': pd.to_numeric(enheder['enh066_antal_badevaerelser']).fillna(0).astype(np.int64).to_numpy(),
+        'antal_koekken': enheder['enh034_koekkenforhold_txt'].isin(KOEKKENFORHOLD).astype(np.int64).to_numpy(),
+        'areal_m2': pd.to_numeric(enheder['enh026_enhedenssamledeareal']).fillna(100).astype(float).to_numpy(),
+    })
+
+
+def beregn_sensorer(faciliteter, sensor_skabelon):
+    """Lang tabel med én række per (enhed, sensortype) inkl. antal og totalpriser"""
+    lang = faciliteter.merge(sensor_skabelon, left_on='anvendelse', right_on='anvendelse_tekst', how='inner')
+
+    antal = np.zeros(len(lang), dtype=np.int64)
+    for kilde, multiplikator in MULTIPLIKATOR_KILDER.items():
+        antal += lang[kilde].to_numpy(dtype=np.int64) * multiplikator(lang)
+
+    lang['antal'] = antal
+    lang['pris_total_min'] = antal * lang['pris_min'].to_numpy()
+    lang['pris_total_max'] = antal * lang['pris_max'].to_numpy()
+    return lang
+
+
+def _sensor_json(lang):
+    """Byg iot_sensorer JSON-tekst per enhed (ORDER BY antal DESC, sensor_type)"""
+    lang = lang.sort_values(['id', 'antal', 'sensor_type'], ascending=[True, False, True])
+    # JSON-serialisering er tekstarbejde per element; alt andet er beregnet kolonnevis
+    elementer = [
+        f'{prefix}, "antal": {antal}, "pris_total_min": {total_min}, "pris_total_max": {total_max}}}'
+        for prefix, antal, total_min, total_max in zip(
+            lang['json_prefix'].to_numpy(dtype=object),
+            lang['antal'].to_numpy().tolist(),
+            lang['pris_total_min'].to_numpy().tolist(),
+            lang['pris_total_max'].to_numpy().tolist(),
+        )
+    ]
+
+    # Rækkerne er sorteret efter id, så hver enhed er et sammenhængende udsnit
+    ids = lang['id'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    return pd.Series(
+        ['[' + ', '.join(elementer[a:b]) + ']' for a, b in zip(starts, ends)],
+        index=ids[starts],
+    )
+
+
+def beregn_potentialer(enheder, katalog, som_json=True):
+    """
+    Beregn use cases, sensorer og investering for en DataFrame af enheder.
+
+    enheder skal have kolonnerne i ENHED_KOLONNER. Returnerer én række per
+    enhed med samme kolonner som de beregnede felter i bbr_potentiale.
+    Med som_json=False udelades JSON-kolonnerne (hurtigere til what-if).
+    """
+    faciliteter = beregn_faciliteter(enheder)
+    lang = beregn_sensorer(faciliteter, byg_sensor_skabelon(katalog))
+
+    totaler = lang.groupby('id').agg(
+        antal_sensor_typer=('antal', 'size'),
+        total_antal_sensorer=('antal', 'sum'),
+        samlet_investering_min_kr=('pris_total_min', 'sum'),
+        samlet_investering_max_kr=('pris_total_max', 'sum'),
+    )
+    use_case_skabelon = byg_use_case_skabelon(katalog)
+
+    resultat = faciliteter.drop(columns=['areal_m2']).join(totaler, on='id')
+    resultat['antal_use_cases'] = (resultat['anvendelse'].map(use_case_skabelon['antal_use_cases'])
+                                   .fillna(0).astype(np.int64))
+    for kolonne in ['antal_sensor_typer', 'total_antal_sensorer']:
+        resultat[kolonne] = resultat[kolonne].fillna(0).astype(np.int64)
+    for kolonne in ['samlet_investering_min_kr', 'samlet_investering_max_kr']:
+        resultat[kolonne] = resultat[kolonne].fillna(0.0).round(2)
+
+    if som_json:
+        resultat['use_cases'] = resultat['anvendelse'].map(use_case_skabelon['use_cases']).fillna('[]')
+        resultat['iot_sensorer'] = resultat['id'].map(_sensor_json(lang)).fillna('[]')
+
+    return resultat.drop(columns=['anvendelse'])
+
+
+def skriv_potentialer(conn, resultat, schema=DEFAULT_SCHEMA):
+    """
+    Skriv beregnede felter tilbage til bbr_potentiale via en midlertidig tabel.
+    Tabellen er sessionens egen og forsvinder ved commit/rollback, så
+    overlappende genberegninger ikke deler den. Rækkerne indlæses med COPY.
+    """
+    kolonner = ['id', 'antal_toiletter', 'antal_badevaerelser', 'antal_koekken',
+                'use_cases', 'iot_sensorer', 'antal_use_cases', 'antal_sensor_typer',
+                'total_antal_sensorer', 'samlet_investering_min_kr', 'samlet_investering_max_kr']
+    liste = ', '.join(kolonner)
+    # Kolonnetyper fra bbr_potentiale, men uden NOT NULL og andre constraints
+    conn.execute(text(f"""
+        CREATE TEMP TABLE tmp_potentialer ON COMMIT DROP AS
+        SELECT {liste} FROM {schema}.bbr_potentiale WITH NO DATA
+    """))
+    raekker = resultat[kolonner].astype(object)
+    raekker = raekker.where(raekker.notna(), None)
+    with conn.connection.driver_connection.cursor() as cur:
+        with cur.copy(f"COPY tmp_potentialer ({liste}) FROM STDIN") as copy:
+            for raekke in raekker.itertuples(index=False, name=None):
+                copy.write_row(raekke)
+    opdateret = conn.execute(text(f"""
+        UPDATE {schema}.bbr_potentiale bp SET
+            antal_toiletter = t.antal_toiletter,
+            antal_badevaerelser = t.antal_badevaerelser,
+            antal_koekken = t.antal_koekken,
+            use_cases = t.use_cases,
+            iot_sensorer = t.iot_sensorer,
+            antal_use_cases = t.antal_use_cases,
+            antal_sensor_typer = t.antal_sensor_typer,
+            total_antal_sensorer = t.total_antal_sensorer,
+            samlet_investering_min_kr = t.samlet_investering_min_kr,
+            samlet_investering_max_kr = t.samlet_investering_max_kr,
+            updated_at = CURRENT_TIMESTAMP
+        FROM tmp_potentialer t
+        WHERE bp.id = t.id
+    """)).rowcount
+    return opdateret
@@ -0,0 +1,1066 @@
+"""
+Datalag - dashboardets forespørgsler uden Streamlit
+
+Alle forespørgsler bag app.py (overblik, kort, top-bygninger, kombo-besparelse
+og detaljevisningen for en bygning) som metoder på Datalag, så batchjobs,
+benchmarks og rapportgeneratoren kan bruge dem uden at starte Streamlit.
+app.py er en tynd UI ovenpå: hver hentefunktion der er en one-liner under
+@st.cache_data.
+
+Cache-backend: Datalag(cache=...) tager ethvert objekt med hent(noegle) (None
+ved miss) og gem(noegle, vaerdi), fx HukommelsesCache (LRU i processen) eller
+ResultatCache (Parquet på disk, delt af alle processer). De tunge metoder
+slås op i cachen med dataversion i nøglen, så en genberegning giver nye
+nøgler; uden dataversion læses den aktuelle fra databasen.
+
+Modulet importerer kun standardbiblioteket og filtre.py - pandas, SQLAlchemy
+og resten af pakken importeres ved første forespørgsel, så en worker kan
+importere datalaget på få millisekunder.
+
+Eksempel:
+    from potentialeberegner.data import Datalag, HukommelsesCache
+    from potentialeberegner.db import lav_engine
+
+    data = Datalag(lav_engine(url), cache=HukommelsesCache())
+    overblik = data.hent_overblik(('kommune', '0101'))
+    bygning = data.hent_bygning('<uuid>')
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from .filtre import BYGNING_KOLONNER, ENHED_KOLONNER, filter_sql, ilike_moenster
+
+# =============================================================================
+# KONSTANTER
+# =============================================================================
+
+# Højst så mange bygninger som punkter på kortet (største investering først)
+KORT_MAX_PUNKTER = 100000
+
+# Kommunekode til navn (filter-dropdown)
+KOMMUNE_NAVNE = {
+    '0101': 'København', '0147': 'Frederiksberg', '0151': 'Ballerup', '0153': 'Brøndby',
+    '0155': 'Dragør', '0157': 'Gentofte', '0159': 'Gladsaxe', '0161': 'Glostrup',
+    '0163': 'Herlev', '0165': 'Albertslund', '0167': 'Hvidovre', '0169': 'Høje-Taastrup',
+    '0173': 'Lyngby-Taarbæk', '0175': 'Rødovre', '0183': 'Ishøj', '0185': 'Tårnby',
+    '0187': 'Vallensbæk', '0190': 'Furesø', '0201': 'Allerød', '0210': 'Fredensborg',
+    '0217': 'Helsingør', '0219': 'Hillerød', '0223': 'Hørsholm', '0230': 'Rudersdal',
+    '0240': 'Egedal', '0250': 'Frederikssund', '0253': 'Greve', '0259': 'Køge',
+    '0260': 'Halsnæs', '0265': 'Roskilde', '0269': 'Solrød', '0270': 'Gribskov',
+    '0306': 'Odsherred', '0316': 'Holbæk', '0320': 'Faxe', '0326': 'Kalundborg',
+    '0329': 'Ringsted', '0330': 'Slagelse', '0336': 'Stevns', '0340': 'Sorø',
+    '0350': 'Lejre', '0360': 'Lolland', '0370': 'Næstved', '0376': 'Guldborgsund',
+    '0390': 'Vordingborg', '0400': 'Bornholm', '0410': 'Middelfart', '0411': 'Christiansø',
+    '0420': 'Assens', '0430': 'Faaborg-Midtfyn', '0440': 'Kerteminde', '0450': 'Nyborg',
+    '0461': 'Odense', '0479': 'Svendborg', '0480': 'Nordfyns', '0482': 'Langeland',
+    '0492': 'Ærø', '0510': 'Haderslev', '0530': 'Billund', '0540': 'Sønderborg',
+    '0550': 'Tønder', '0561': 'Esbjerg', '0563': 'Fanø', '0573': 'Varde',
+    '0575': 'Vejen', '0580': 'Aabenraa', '0607': 'Fredericia', '0615': 'Horsens',
+    '0621': 'Kolding', '0630': 'Vejle', '0657': 'Herning', '0661': 'Holstebro',
+    '0665': 'Lemvig', '0671': 'Struer', '0706': 'Syddjurs', '0707': 'Norddjurs',
+    '0710': 'Favrskov', '0727': 'Odder', '0730': 'Randers', '0740': 'Silkeborg',
+    '0741': 'Samsø', '0746': 'Skanderborg', '0751': 'Aarhus', '0756': 'Ikast-Brande',
+    '0760': 'Ringkøbing-Skjern', '0766': 'Hedensted', '0773': 'Morsø', '0779': 'Skive',
+    '0787': 'Thisted', '0791': 'Viborg', '0810': 'Brønderslev', '0813': 'Frederikshavn',
+    '0820': 'Vesthimmerlands', '0825': 'Læsø', '0840': 'Rebild', '0846': 'Mariagerfjord',
+    '0849': 'Jammerbugt', '0851': 'Aalborg', '0860': 'Hjørring'
+}
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+def cache_noegle(navn, *argumenter, **noegleord):
+    """Nøgle (hex) ud fra navn og argumenter; repr af tupler, str og tal er stabil"""
+    tekst = repr((navn, argumenter, sorted(noegleord.items())))
+    return hashlib.sha256(tekst.encode('utf-8')).hexdigest()
+
+
+class HukommelsesCache:
+    """
+    Cache-backend i processens hukommelse, højst max_entries værdier (LRU).
+    Værdierne deles af alle kald - kalderen må ikke ændre dem.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._vaerdier = OrderedDict()
+        self._laas = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hent(self, noegle):
+        """Værdien for noegle, eller None hvis den ikke findes"""
+        with self._laas:
+            vaerdi = self._vaerdier.get(noegle)
+            if vaerdi is None:
+                self.misses += 1
+                return None
+            self._vaerdier.move_to_end(noegle)
+            self.hits += 1
+            return vaerdi
+
+    def gem(self, noegle, vaerdi):
+        """Gem vaerdi under noegle og smid de mindst nyligt brugte ud"""
+        with self._laas:
+            self._vaerdier[noegle] = vaerdi
+            self._vaerdier.move_to_end(noegle)
+            while len(self._vaerdier) > self.max_entries:
+                self._vaerdier.popitem(last=False)
+        return True
+
+
+def _cachet(metode):
+    """Slå metodens resultat op i Datalag.cache med schema, argumenter og dataversion i nøglen"""
+    navn = f"{__name__}.{metode.__qualname__}"
+
+    @wraps(metode)
+    def med_cache(self, *argumenter, dataversion=None):
+        if self.cache is None:
+            return metode(self, *argumenter)
+        if dataversion is None:
+            dataversion = self.aktuel_dataversion()
+        noegle = cache_noegle(navn, self.schema, *argumenter, dataversion)
+        vaerdi = self.cache.hent(noegle)
+        if vaerdi is None:
+            vaerdi = metode(self, *argumenter)
+            self.cache.gem(noegle, vaerdi)
+        return vaerdi
+
+    return med_cache
+
+
+def mangler_objekt(fejl):
+    """
+    Sandt hvis fejl skyldes en tabel, et view eller en funktion der ikke findes
+    (fx et SQL-script der ikke er installeret). pandas pakker SQLAlchemy-fejlen
+    ind, så hele __cause__-kæden gennemgås. Timeouts, afbrudte forbindelser og
+    andre fejl giver False.
+    """
+    from psycopg import errors
+    from sqlalchemy.exc import ProgrammingError
+    while fejl is not None:
+        if isinstance(fejl, ProgrammingError) and isinstance(
+                fejl.orig, (errors.UndefinedTable, errors.UndefinedFunction)):
+            return True
+        fejl = fejl.__cause__
+    return False
+
+
+def _dele(raekke):
+    """Én række med en json_agg-kolonne per del som dict med en DataFrame per del"""
+    import pandas as pd
+    return {del_: pd.DataFrame(raekke[del_] or []) for del_ in raekke.index}
+
+
+def _bundt(bundt):
+    """bygning_detaljer()-dokumentet som dict med en DataFrame per del og kombos som liste"""
+    import pandas as pd
+    if isinstance(bundt, str):
+        import json
+        bundt = json.loads(bundt)
+    return {
+        del_: (vaerdi or []) if del_ == 'kombos' else pd.DataFrame(vaerdi or [])
+        for del_, vaerdi in bundt.items()
+    }
+
+
+def bbox_clause(bbox):
+    """WHERE-led og parametre for bygninger inden for bbox (vest, syd, oest, nord) i WGS84"""
+    vest, syd, oest, nord = bbox
+    # && bruger GIST-indekset på the_geom; lat/lng-betingelsen gør afgrænsningen præcis
+    return """
+    AND the_geom && ST_Transform(ST_MakeEnvelope(:vest, :syd, :oest, :nord, 4326), 25832)
+    AND latitude BETWEEN :syd AND :nord
+    AND longitude BETWEEN :vest AND :oest
+    """, {'vest': vest, 'syd': syd, 'oest': oest, 'nord': nord}
+
+
+def kombo_mix(katalog, sensor_df):
+    """Bedste kombo-mix uden overlap (KomboKatalog.loes) ud fra bygningens sensor_summary"""
+    sensor_antal = dict(zip(sensor_df['sensor_type'], sensor_df['antal'])) if len(sensor_df) > 0 else {}
+    return katalog.loes(sensor_antal)
+
+# =============================================================================
+# DELTE SQL-DELE
+# =============================================================================
+
+# overblik_kube-rækkerne for kommunerne i CTE'en kommuner (NULL = hele landet)
+# med rapport_kode = kommunen rækken tilhører
+_KUBE = """
+        kube AS (
+            SELECT k.*, CASE WHEN k.per_kommune THEN k.kommunekode END AS rapport_kode
+            FROM {schema}.overblik_kube k
+            WHERE NOT k.per_kommune OR k.kommunekode IN (SELECT kommunekode FROM kommuner)
+        )"""
+
+# overblik()-delene fra kube for kommunen kk.kommunekode
+_KUBE_DELE = """
+            (SELECT json_agg(json_build_object(
+                'antal_bygninger', k.antal_bygninger,
+                'antal_enheder', k.antal_enheder,
+                'gns_enheder_per_bygning', ROUND(k.antal_enheder::NUMERIC / NULLIF(k.antal_bygninger, 0), 1),
+                'total_sensorer', k.antal_sensorer,
+                'total_investering_min', k.investering_min_kr,
+                'total_investering_max', k.investering_max_kr,
+                'gns_investering_per_bygning', ROUND(k.investering_max_kr / NULLIF(k.antal_bygninger, 0), 0)
+            )) FROM kube k
+            WHERE k.rapport_kode IS NOT DISTINCT FROM kk.kommunekode AND k.niveau = 'total') AS statistik,
+            (SELECT json_agg(json_build_object(
+                'anvendelse', k.anvendelse,
+                'antal_bygninger', k.antal_bygninger,
+                'antal_enheder', k.antal_enheder,
+                'gns_enheder_per_bygning', ROUND(k.antal_enheder::NUMERIC / NULLIF(k.antal_bygninger, 0), 1),
+                'total_sensorer', k.antal_sensorer,
+                'investering_min_kr', k.investering_min_kr,
+                'investering_max_kr', k.investering_max_kr
+            ) ORDER BY k.investering_max_kr DESC) FROM kube k
+            WHERE k.rapport_kode IS NOT DISTINCT FROM kk.kommunekode
+              AND k.niveau = 'anvendelse' AND k.anvendelse IS NOT NULL AND k.antal_enheder > 0) AS anvendelse,
+            (SELECT json_agg(json_build_object(
+                'kommunekode', k.kommunekode,
+                'antal_bygninger', k.antal_bygninger,
+                'antal_enheder', k.antal_enheder,
+                'total_sensorer', k.antal_sensorer,
+                'investering_min_kr', k.investering_min_kr,
+                'investering_max_kr', k.investering_max_kr
+            ) ORDER BY k.investering_max_kr DESC) FROM {schema}.overblik_kube k
+            -- Kommunerækker findes kun per kommune
+            WHERE k.niveau = 'total' AND k.per_kommune AND k.kommunekode IS NOT NULL AND k.antal_enheder > 0
+              AND (kk.kommunekode IS NULL OR k.kommunekode = kk.kommunekode)) AS kommune,
+            (SELECT json_agg(json_build_object(
+                'sensor_type', k.sensor_type,
+                'antal_enheder', k.antal_enheder,
+                'total_antal_sensorer', k.antal_sensorer,
+                'total_pris_min', k.investering_min_kr,
+                'total_pris_max', k.investering_max_kr
+            ) ORDER BY k.antal_sensorer DESC) FROM kube k
+            WHERE k.rapport_kode IS NOT DISTINCT FROM kk.kommunekode AND k.niveau = 'sensor') AS sensor,
+            (SELECT json_agg(json_build_object(
+                'use_case_navn', k.use_case_navn,
+                'kategori', k.kategori,
+                'antal_enheder', k.antal_enheder
+            ) ORDER BY k.antal_enheder DESC) FROM kube k
+            WHERE k.rapport_kode IS NOT DISTINCT FROM kk.kommunekode AND k.niveau = 'use_case') AS usecase,
+            (SELECT json_agg(f ORDER BY f.total_faciliteter DESC, f.anvendelse) FROM (
+                SELECT 
+                    k.anvendelse,
+                    k.alle_enheder AS antal_enheder,
+                    k.total_toiletter,
+                    k.total_badevaerelser,
+                    k.total_koekken,
+                    k.total_faciliteter
+                FROM kube k
+                WHERE k.rapport_kode IS NOT DISTINCT FROM kk.kommunekode
+                  AND k.niveau = 'anvendelse' AND k.anvendelse IS NOT NULL
+                ORDER BY k.total_faciliteter DESC, k.anvendelse
+                LIMIT 15
+            ) f) AS facilitet"""
+
+# kombo_besparelse()-delene summeret fra CTE'en kilde for rækkerne i hvor
+_KOMBO_DELE = """
+            (SELECT json_agg(k ORDER BY k.besparelse_max DESC) FROM (
+                SELECT kombo_navn, SUM(antal_bygninger) AS antal_bygninger, SUM(antal_kombos) AS antal_kombos,
+                       SUM(besparelse_min) AS besparelse_min, SUM(besparelse_max) AS besparelse_max
+                FROM kilde WHERE {hvor} GROUP BY kombo_navn
+            ) k) AS kombo,
+            (SELECT json_agg(k ORDER BY k.besparelse_max DESC) FROM (
+                SELECT kommunekode, SUM(antal_bygninger) AS antal_bygninger, SUM(antal_kombos) AS antal_kombos,
+                       SUM(besparelse_min) AS besparelse_min, SUM(besparelse_max) AS besparelse_max
+                FROM kilde WHERE kilde.kommunekode IS NOT NULL AND {hvor} GROUP BY kommunekode
+            ) k) AS {kommune}"""
+
+# Kolonnerne i top_bygninger()
+_TOP_NAVNE = ("bygning_id, adresse, anvendelsestyper, kommunekode, antal_enheder, total_sensorer, "
+              "investering_min_kr, investering_max_kr")
+_TOP_KOLONNER = _TOP_NAVNE.replace("bygning_id,", "bygning_id::TEXT AS bygning_id,", 1)
+
+# =============================================================================
+# DATALAG
+# =============================================================================
+
+class Datalag:
+    """
+    Dashboardets forespørgsler mod schema via engine (db.lav_engine).
+    cache er en backend med hent()/gem() (se modulets docstring) eller None.
+    Filtre er tupler fra filtre.normaliser_filter().
+    """
+
+    def __init__(self, engine, schema=None, cache=None):
+        if schema is None:
+            from .beregning import DEFAULT_SCHEMA
+            schema = DEFAULT_SCHEMA
+        self.engine = engine
+        self.schema = schema
+        self.cache = cache
+
+    def query_df(self, sql, params=None):
+        """Kør SQL med bundne parametre (:navn) og returner DataFrame"""
+        import pandas as pd
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn, params=params)
+
+    def query_gdf(self, sql, params=None):
+        """Kør SQL med bundne parametre (:navn) og returner GeoDataFrame"""
+        import geopandas as gpd
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            return gpd.read_postgis(text(sql), conn, geom_col='the_geom', params=params)
+
+    def dataversion(self):
+        """Dataversion (batch_beregning.sql) - tælles op af afslut_genberegning() og ved katalogændringer"""
+        return int(self.query_df(f"SELECT version FROM {self.schema}.dataversion")['version'].iloc[0])
+
+    def aktuel_dataversion(self):
+        """
+        Dataversion til cache-nøglerne.
+        Uden dataversion-tabellen skifter nøglen hvert 5. minut.
+        """
+        try:
+            return self.dataversion()
+        except Exception:
+            return f"t{int(time.time() // 300)}"
+
+    # -------------------------------------------------------------------------
+    # Filter og adresser
+    # -------------------------------------------------------------------------
+
+    def kommuner(self):
+        """Kommuner med data til filter-dropdown: {kode: 'Navn (kode)'}"""
+        kommuner = self.query_df(f"""
+            SELECT DISTINCT kommunekode 
+            FROM {self.schema}.bbr_potentiale 
+            WHERE kommunekode IS NOT NULL 
+            ORDER BY kommunekode
+        """)
+        return {
+            kode: f"{KOMMUNE_NAVNE.get(kode, f'Kommune {kode}')} ({kode})"
+            for kode in kommuner['kommunekode'].tolist()
+        }
+
+    def find_bygning_id(self, filtr):
+        """Bygnings-ID for et filter - None hvis det rammer flere eller ingen bygninger"""
+        type_, vaerdi = filtr
+        if type_ == 'bygning':
+            return vaerdi
+        elif type_ == 'adresse':
+            sql = f"""
+            SELECT DISTINCT bygning 
+            FROM {self.schema}.bbr_potentiale 
+            WHERE adressebetegnelse ILIKE :adresse
+            AND bygning IS NOT NULL
+            LIMIT 2
+            """
+            result = self.query_df(sql, {'adresse': ilike_moenster(vaerdi)})
+            if len(result) == 1:
+                return str(result['bygning'].iloc[0])
+        return None
+
+    def adresse_indeks(self):
+        """Alle adresser med bygning som AdresseIndeks (adresser.py)"""
+        from .adresser import AdresseIndeks
+        adresser = self.query_df(f"""
+            SELECT DISTINCT adressebetegnelse AS adresse, bygning AS bygning_id
+            FROM {self.schema}.bbr_potentiale 
+            WHERE adressebetegnelse IS NOT NULL
+              AND bygning IS NOT NULL
+        """)
+        return AdresseIndeks.fra_dataframe(adresser)
+
+    def soeg_adresser(self, soegning, antal=10):
+        """Bedste adresser med bygnings-ID for en søgetekst (soeg_adresser i adresse_soegning.sql)"""
+        return self.query_df(
+            f"SELECT adresse, bygning_id, lighed FROM {self.schema}.soeg_adresser(:soegning, :antal)",
+            {'soegning': soegning, 'antal': antal}
+        )
+
+    # -------------------------------------------------------------------------
+    # Overblik
+    # -------------------------------------------------------------------------
+
+    @_cachet
+    def overblik(self, filtr):
+        """
+        Hent alle overbliksdata i én forespørgsel i stedet for seks.
+        Statistik, anvendelser, kommuner og faciliteter beregnes i ét gennemløb
+        med GROUPING SETS; use cases udledes af anvendelserne og sensorer tælles
+        fra bbr_sensor_linje. Returnerer dict med en DataFrame per del:
+        statistik, anvendelse, kommune, sensor, usecase og facilitet.
+        """
+        filter_clause, params = filter_sql(filtr, ENHED_KOLONNER)
+        sql = f"""
+        WITH
+        -- gruppe (GROUPING-bitmaske): 3 = alle, 1 = anvendelse, 2 = kommune.
+        -- Faciliteter tæller alle enheder med anvendelse, resten kun enheder med bygning.
+        rollup AS (
+            SELECT 
+                GROUPING(bp.enh020_enhedens_anvendelse_txt, bp.kommunekode) AS gruppe,
+                bp.enh020_enhedens_anvendelse_txt AS anvendelse,
+                bp.kommunekode,
+                COUNT(DISTINCT bp.bygning) AS antal_bygninger,
+                COUNT(*) FILTER (WHERE bp.bygning IS NOT NULL) AS antal_enheder,
+                COALESCE(SUM(bp.total_antal_sensorer) FILTER (WHERE bp.bygning IS NOT NULL), 0) AS total_sensorer,
+                COALESCE(SUM(bp.samlet_investering_min_kr) FILTER (WHERE bp.bygning IS NOT NULL), 0) AS investering_min_kr,
+                COALESCE(SUM(bp.samlet_investering_max_kr) FILTER (WHERE bp.bygning IS NOT NULL), 0) AS investering_max_kr,
+                COUNT(*) AS alle_enheder,
+                COALESCE(SUM(bp.antal_toiletter), 0) AS total_toiletter,
+                COALESCE(SUM(bp.antal_badevaerelser), 0) AS total_badevaerelser,
+                COALESCE(SUM(bp.antal_koekken), 0) AS total_koekken,
+                COALESCE(SUM(bp.antal_toiletter + bp.antal_badevaerelser + bp.antal_koekken), 0) AS total_faciliteter
+            FROM {self.schema}.bbr_potentiale bp
+            WHERE (bp.bygning IS NOT NULL OR bp.enh020_enhedens_anvendelse_txt IS NOT NULL)
+            {filter_clause}
+            GROUP BY GROUPING SETS ((), (bp.enh020_enhedens_anvendelse_txt), (bp.kommunekode))
+        ),
+        anvendelser AS (
+            SELECT 
+                r.anvendelse,
+                r.antal_bygninger,
+                r.antal_enheder,
+                ROUND(r.antal_enheder::NUMERIC / NULLIF(r.antal_bygninger, 0), 1) AS gns_enheder_per_bygning,
+                r.total_sensorer,
+                r.investering_min_kr,
+                r.investering_max_kr
+            FROM rollup r
+            WHERE r.gruppe = 1 AND r.anvendelse IS NOT NULL AND r.antal_enheder > 0
+        ),
+        kommuner AS (
+            SELECT 
+                r.kommunekode,
+                r.antal_bygninger,
+                r.antal_enheder,
+                r.total_sensorer,
+                r.investering_min_kr,
+                r.investering_max_kr
+            FROM rollup r
+            WHERE r.gruppe = 2 AND r.kommunekode IS NOT NULL AND r.antal_enheder > 0
+        ),
+        usecases AS (
+            -- En enheds use cases bestemmes af dens anvendelsestekst (se inkrementel_beregning.sql),
+            -- så use_cases udfoldes for én enhed per anvendelse og vægtes med antal enheder
+            SELECT 
+                uc.use_case_navn,
+                uc.kategori,
+                SUM(r.antal_enheder) AS antal_enheder
+            FROM rollup r,
+                 LATERAL (
+                     SELECT DISTINCT uc_elem->>'navn' AS use_case_navn, uc_elem->>'kategori' AS kategori
+                     FROM (
+                         SELECT bp.use_cases
+                         FROM {self.schema}.bbr_potentiale bp
+                         WHERE bp.enh020_enhedens_anvendelse_txt = r.anvendelse
+                         LIMIT 1
+                     ) eksempel,
+                     jsonb_array_elements(eksempel.use_cases) AS uc_elem
+                 ) uc
+            WHERE r.gruppe = 1 AND r.anvendelse IS NOT NULL AND r.antal_enheder > 0
+            GROUP BY uc.use_case_navn, uc.kategori
+        ),
+        faciliteter AS (
+            SELECT 
+                r.anvendelse,
+                r.alle_enheder AS antal_enheder,
+                r.total_toiletter,
+                r.total_badevaerelser,
+                r.total_koekken,
+                r.total_faciliteter
+            FROM rollup r
+            WHERE r.gruppe = 1 AND r.anvendelse IS NOT NULL
+            ORDER BY r.total_faciliteter DESC, r.anvendelse
+            LIMIT 15
+        ),
+        sensorer AS (
+            SELECT 
+                sl.sensor_type,
+                COUNT(*) AS antal_enheder,
+                SUM(sl.antal) AS total_antal_sensorer,
+                SUM(sl.pris_total_min) AS total_pris_min,
+                SUM(sl.pris_total_max) AS total_pris_max
+            FROM {self.schema}.bbr_sensor_linje sl
+            JOIN {self.schema}.bbr_potentiale bp ON bp.id = sl.enhed_id
+            WHERE bp.bygning IS NOT NULL
+            {filter_clause}
+            GROUP BY sl.sensor_type
+        )
+        SELECT 
+            (SELECT json_agg(json_build_object(
+                'antal_bygninger', r.antal_bygninger,
+                'antal_enheder', r.antal_enheder,
+                'gns_enheder_per_bygning', ROUND(r.antal_enheder::NUMERIC / NULLIF(r.antal_bygninger, 0), 1),
+                'total_sensorer', r.total_sensorer,
+                'total_investering_min', r.investering_min_kr,
+                'total_investering_max', r.investering_max_kr,
+                'gns_investering_per_bygning', ROUND(r.investering_max_kr / NULLIF(r.antal_bygninger, 0), 0)
+            )) FROM rollup r WHERE r.gruppe = 3) AS statistik,
+            (SELECT json_agg(a ORDER BY a.investering_max_kr DESC) FROM anvendelser a) AS anvendelse,
+            (SELECT json_agg(k ORDER BY k.investering_max_kr DESC) FROM kommuner k) AS kommune,
+            (SELECT json_agg(s ORDER BY s.total_antal_sensorer DESC) FROM sensorer s) AS sensor,
+            (SELECT json_agg(u ORDER BY u.antal_enheder DESC) FROM usecases u) AS usecase,
+            (SELECT json_agg(f ORDER BY f.total_faciliteter DESC, f.anvendelse) FROM faciliteter f) AS facilitet
+        """
+        raekke = self.query_df(sql, params).iloc[0]
+        return _dele(raekke)
+
+    @_cachet
+    def overblik_kube(self, kommunekode):
+        """
+        Samme dele som overblik(), læst fra overblik_kube (overblik_kube.sql).
+        kommunekode=None giver hele landet.
+        """
+        sql = f"""
+        WITH kommuner AS (
+            SELECT CAST(:kommunekode AS TEXT) AS kommunekode
+        ),
+        {_KUBE.format(schema=self.schema)}
+        SELECT {_KUBE_DELE.format(schema=self.schema)}
+        FROM kommuner kk
+        """
+        raekke = self.query_df(sql, {'kommunekode': kommunekode}).iloc[0]
+        return _dele(raekke)
+
+    def hent_overblik(self, filtr, dataversion=None):
+        """Overbliksdata fra overblik_kube ved Alle/Kommune, ellers direkte fra bbr_potentiale"""
+        type_, vaerdi = filtr
+        if type_ in ['alle', 'kommune']:
+            try:
+                return self.overblik_kube(vaerdi, dataversion=dataversion)
+            except Exception as e:
+                # Kun når overblik_kube.sql ikke er installeret - ved timeout o.l.
+                # skal den tungere forespørgsel ikke køres oveni
+                if not mangler_objekt(e):
+                    raise
+        return self.overblik(filtr, dataversion=dataversion)
+
+    @_cachet
+    def top_bygninger(self, filtr):
+        """De 20 bygninger med størst investering for filteret"""
+        filter_clause_view, params = filter_sql(filtr, BYGNING_KOLONNER)
+        sql = f"""
+        SELECT {_TOP_KOLONNER}
+        FROM {self.schema}.bygning_aggregat
+        WHERE 1=1
+        {filter_clause_view}
+        ORDER BY investering_max_kr DESC
+        LIMIT 20
+        """
+        return self.query_df(sql, params)
+
+    @_cachet
+    def kombo_besparelse(self, filtr):
+        """
+        Kombo-besparelse for filteret (kombo_batch.sql), bedste alternativ per bygning.
+        Alle/Kommune læses fra kombo_besparelse, ellers summeres bygning_kombo.
+        Returnerer dict med DataFrames: 'kombo' (per kombo) og 'kommune' (per kommune).
+        """
+        type_, vaerdi = filtr
+        if type_ in ['alle', 'kommune']:
+            kilde = f"""
+            SELECT kommunekode, kombo_navn, antal_bygninger, antal_kombos, besparelse_min, besparelse_max
+            FROM {self.schema}.kombo_besparelse
+            WHERE per_kommune
+            {"AND kommunekode = :kommunekode" if type_ == 'kommune' else ""}
+            """
+            params = {'kommunekode': vaerdi} if type_ == 'kommune' else None
+        else:
+            filter_clause_view, params = filter_sql(filtr, BYGNING_KOLONNER)
+            kilde = f"""
+            SELECT bk.kommunekode, bk.kombo_navn, 1 AS antal_bygninger, bk.antal AS antal_kombos,
+                   bk.besparelse_min, bk.besparelse_max
+            FROM {self.schema}.bygning_kombo bk
+            WHERE bk.bedste
+              AND bk.bygning_id IN (SELECT bygning_id FROM {self.schema}.bygning_aggregat WHERE 1=1 {filter_clause_view})
+            """
+        sql = f"""
+        WITH kilde AS ({kilde})
+        SELECT {_KOMBO_DELE.format(hvor='TRUE', kommune='kommune')}
+        """
+        raekke = self.query_df(sql, params).iloc[0]
+        return _dele(raekke)
+
+    def kommune_bundter(self, kommunekoder=None):
+        """
+        overblik_kube(), kombo_besparelse() og top_bygninger() for hele landet og
+        kommunerne (alle med data hvis kommunekoder er None) i én forespørgsel.
+        Returnerer {kommunekode eller None: {del: DataFrame}} med delene fra
+        overblik_kube() samt 'kombo', 'kombo_kommune' og 'top'.
+        Uden kombo_batch.sql er kombo-delene tomme.
+        """
+        har_kombo = self.query_df("SELECT to_regclass(:tabel) IS NOT NULL AS findes",
+                                  {'tabel': f"{self.schema}.kombo_besparelse"})['findes'].iloc[0]
+        if har_kombo:
+            kombo_kilde = f"""
+        kilde AS (
+            SELECT kommunekode, kombo_navn, antal_bygninger, antal_kombos, besparelse_min, besparelse_max
+            FROM {self.schema}.kombo_besparelse
+            WHERE per_kommune
+        ),"""
+            kombo_dele = _KOMBO_DELE.format(
+                hvor="(kk.kommunekode IS NULL OR kilde.kommunekode = kk.kommunekode)", kommune='kombo_kommune',
+            )
+        else:
+            kombo_kilde = ""
+            kombo_dele = "NULL::JSON AS kombo, NULL::JSON AS kombo_kommune"
+        sql = f"""
+        WITH kommuner AS (
+            SELECT NULL::TEXT AS kommunekode
+            UNION ALL
+            SELECT k.kommunekode
+            FROM {self.schema}.overblik_kube k
+            WHERE k.niveau = 'total' AND k.per_kommune AND k.kommunekode IS NOT NULL AND k.antal_enheder > 0
+            {"AND k.kommunekode = ANY(:kommunekoder)" if kommunekoder is not None else ""}
+        ),
+        {_KUBE.format(schema=self.schema)},{kombo_kilde}
+        top AS (
+            -- Top 20 for landet og per kommune i én gennemgang af bygning_aggregat
+            SELECT NULL::TEXT AS rapport_kode, t.* FROM (
+                SELECT {_TOP_KOLONNER} FROM {self.schema}.bygning_aggregat
+                ORDER BY investering_max_kr DESC
+                LIMIT 20
+            ) t
+            UNION ALL
+            SELECT t.kommunekode, {_TOP_NAVNE} FROM (
+                SELECT {_TOP_KOLONNER},
+                       ROW_NUMBER() OVER (PARTITION BY kommunekode ORDER BY investering_max_kr DESC) AS nr
+                FROM {self.schema}.bygning_aggregat
+                WHERE kommunekode IN (SELECT kommunekode FROM kommuner)
+            ) t
+            WHERE t.nr <= 20
+        )
+        SELECT
+            kk.kommunekode,
+            {_KUBE_DELE.format(schema=self.schema)},
+            {kombo_dele},
+            (SELECT json_agg(t ORDER BY t.investering_max_kr DESC) FROM (
+                SELECT {_TOP_NAVNE} FROM top WHERE top.rapport_kode IS NOT DISTINCT FROM kk.kommunekode
+            ) t) AS top
+        FROM kommuner kk
+        """
+        params = {'kommunekoder': list(kommunekoder)} if kommunekoder is not None else None
+        df = self.query_df(sql, params).set_index('kommunekode')
+        bundter = {(kode if isinstance(kode, str) else None): _dele(raekke) for kode, raekke in df.iterrows()}
+        for bundt in bundter.values():
+            if bundt['top'].empty:
+                # Samme kolonner som top_bygninger() uden bygninger
+                bundt['top'] = bundt['top'].reindex(columns=_TOP_NAVNE.split(', '))
+        return bundter
+
+    # -------------------------------------------------------------------------
+    # Kort
+    # -------------------------------------------------------------------------
+
+    def kort_udstraekning(self, filtr):
+        """Udstrækning (WGS84) af bygninger med koordinater for filteret"""
+        filter_clause_view, params = filter_sql(filtr, BYGNING_KOLONNER)
+        sql = f"""
+        SELECT 
+            MIN(longitude) AS vest,
+            MIN(latitude) AS syd,
+            MAX(longitude) AS oest,
+            MAX(latitude) AS nord,
+            COUNT(*) AS antal_bygninger
+        FROM {self.schema}.bygning_aggregat
+        WHERE latitude IS NOT NULL
+        {filter_clause_view}
+        """
+        return self.query_df(sql, params)
+
+    @_cachet
+    def geodata(self, filtr, bbox):
+        """Bygninger inden for kortudsnittet, højst KORT_MAX_PUNKTER (største investering først)"""
+        filter_clause_view, params = filter_sql(filtr, BYGNING_KOLONNER)
+        bbox_sql, bbox_params = bbox_clause(bbox)
+        sql = f"""
+        SELECT 
+            bygning_id,
+            antal_enheder,
+            anvendelsestyper,
+            adresse,
+            kommunekode,
+            total_sensorer,
+            investering_min_kr,
+            investering_max_kr,
+            investerings_niveau,
+            latitude,
+            longitude
+        FROM {self.schema}.bygning_aggregat
+        WHERE latitude IS NOT NULL
+        {bbox_sql}
+        {filter_clause_view}
+        ORDER BY investering_max_kr DESC
+        LIMIT {KORT_MAX_PUNKTER}
+        """
+        return self.query_df(sql, {**params, **bbox_params})
+
+    @_cachet
+    def kort_klynger(self, filtr, bbox, celle):
+        """Bygninger samlet i grid-celler (celle i grader) inden for kortudsnittet"""
+        filter_clause_view, params = filter_sql(filtr, BYGNING_KOLONNER)
+        bbox_sql, bbox_params = bbox_clause(bbox)
+        sql = f"""
+        SELECT 
+            AVG(latitude) AS latitude,
+            AVG(longitude) AS longitude,
+            COUNT(*) AS antal_bygninger,
+            SUM(antal_enheder) AS antal_enheder,
+            SUM(total_sensorer) AS total_sensorer,
+            SUM(investering_min_kr) AS investering_min_kr,
+            SUM(investering_max_kr) AS investering_max_kr
+        FROM {self.schema}.bygning_aggregat
+        WHERE latitude IS NOT NULL
+        {bbox_sql}
+        {filter_clause_view}
+        GROUP BY FLOOR(longitude / :celle), FLOOR(latitude / :celle)
+        """
+        return self.query_df(sql, {**params, **bbox_params, 'celle': celle})
+
+    # -------------------------------------------------------------------------
+    # Detalje (enkelt bygning)
+    # -------------------------------------------------------------------------
+
+    def bygning_bundt(self, bygning_id):
+        """
+        Hele detaljevisningen for en bygning i ét kald til bygning_detaljer()
+        (bygning_detaljer.sql).
+        Returnerer dict med en DataFrame per del og kombos som liste.
+        """
+        sql = f"SELECT {self.schema}.bygning_detaljer(CAST(:bygning_id AS UUID)) AS bundt"
+        return _bundt(self.query_df(sql, {'bygning_id': bygning_id})['bundt'].iloc[0])
+
+    def bygning_bundter(self, bygning_ids):
+        """bygning_bundt() for mange bygninger i én forespørgsel: {bygning_id: bundt}"""
+        if not bygning_ids:
+            return {}
+        sql = f"""
+        SELECT b.bygning_id::TEXT AS bygning_id, {self.schema}.bygning_detaljer(b.bygning_id) AS bundt
+        FROM unnest(CAST(:bygning_ids AS UUID[])) AS b(bygning_id)
+        """
+        df = self.query_df(sql, {'bygning_ids': list(bygning_ids)})
+        return {bygning_id: _bundt(bundt) for bygning_id, bundt in zip(df['bygning_id'], df['bundt'])}
+
+    def hent_bygning(self, bygning_id):
+        """
+        Detaljedata for en bygning: info, sensor_usecase_breakdown, usecase_summary,
+        sensor_summary, sensor_with_usecases og kombos.
+        Uden bygning_detaljer.sql hentes delene hver for sig.
+        """
+        try:
+            return self.bygning_bundt(bygning_id)
+        except Exception as e:
+            # Kun når bygning_detaljer.sql ikke er installeret - ved timeout o.l.
+            # skal der ikke sendes fem forespørgsler mere
+            if not mangler_objekt(e):
+                raise
+            return {
+                'info': self.bygning_info(bygning_id),
+                'sensor_usecase_breakdown': self.sensor_usecase_breakdown(bygning_id),
+                'usecase_summary': self.usecase_summary(bygning_id),
+                'sensor_summary': self.sensor_summary(bygning_id),
+                'sensor_with_usecases': self.sensor_with_usecases(bygning_id),
+                'kombos': self.kombo_alternativer(bygning_id),
+            }
+
+    def bygning_info(self, bygning_id):
+        """Detaljeret info om en enkelt bygning"""
+        sql = f"""
+        SELECT 
+            bg.bygning_id,
+            bg.adresse,
+            bg.anvendelsestyper,
+            bg.kommunekode,
+            bg.antal_enheder,
+            bg.total_sensorer,
+            bg.investering_min_kr,
+            bg.investering_max_kr,
+            bg.investerings_niveau,
+            bg.total_toiletter,
+            bg.total_badevaerelser,
+            bg.total_koekken,
+            bg.samlet_areal_m2
+        FROM {self.schema}.bygning_aggregat bg
+        WHERE bg.bygning_id = CAST(:bygning_id AS UUID)
+        """
+        return self.query_df(sql, {'bygning_id': bygning_id})
+
+    def sensor_usecase_breakdown(self, bygning_id):
+        """Sensor-breakdown per use case for en bygning"""
+        sql = f"""
+        WITH sensor_med_usecases AS (
+            SELECT 
+                sl.sensor_type,
+                sl.antal,
+                sl.pris_total_min AS pris_min,
+                sl.pris_total_max AS pris_max,
+                uc.use_case_navn
+            FROM {self.schema}.bbr_sensor_linje sl,
+                 unnest(sl.use_case_ids) AS uc_id
+            JOIN {self.schema}.use_cases uc ON uc.id = uc_id
+            WHERE sl.bygning = CAST(:bygning_id AS UUID)
+        )
+        SELECT 
+            use_case_navn,
+            sensor_type,
+            SUM(antal) AS antal_sensorer,
+            SUM(pris_min) AS pris_min,
+            SUM(pris_max) AS pris_max
+        FROM sensor_med_usecases
+        GROUP BY use_case_navn, sensor_type
+        ORDER BY use_case_navn, antal_sensorer DESC
+        """
+        return self.query_df(sql, {'bygning_id': bygning_id})
+
+    def usecase_summary(self, bygning_id):
+        """Use case summary med antal enheder og sensorer for en bygning"""
+        sql = f"""
+        WITH bygning_usecases AS (
+            SELECT 
+                bp.id AS enhed_id,
+                uc_elem->>'navn' AS use_case_navn,
+                uc_elem->>'kategori' AS kategori
+            FROM {self.schema}.bbr_potentiale bp,
+                 jsonb_array_elements(bp.use_cases) AS uc_elem
+            WHERE bp.bygning = CAST(:bygning_id AS UUID)
+        ),
+        usecase_sensor_count AS (
+            SELECT 
+                uc.use_case_navn,
+                SUM(sl.antal) AS sensorer_til_usecase
+            FROM {self.schema}.bbr_sensor_linje sl,
+                 unnest(sl.use_case_ids) AS uc_id
+            JOIN {self.schema}.use_cases uc ON uc.id = uc_id
+            WHERE sl.bygning = CAST(:bygning_id AS UUID)
+            GROUP BY uc.use_case_navn
+        )
+        SELECT 
+            bu.use_case_navn,
+            bu.kategori,
+            COUNT(DISTINCT bu.enhed_id) AS antal_enheder,
+            COALESCE(usc.sensorer_til_usecase, 0) AS antal_sensorer
+        FROM bygning_usecases bu
+        LEFT JOIN usecase_sensor_count usc ON bu.use_case_navn = usc.use_case_navn
+        GROUP BY bu.use_case_navn, bu.kategori, usc.sensorer_til_usecase
+        ORDER BY antal_sensorer DESC
+        """
+        return self.query_df(sql, {'bygning_id': bygning_id})
+
+    def sensor_summary(self, bygning_id):
+        """Sensor summary for en bygning"""
+        sql = f"""
+        SELECT 
+            sl.sensor_type,
+            SUM(sl.antal) AS antal,
+            SUM(sl.pris_total_min) AS pris_min,
+            SUM(sl.pris_total_max) AS pris_max
+        FROM {self.schema}.bbr_sensor_linje sl
+        WHERE sl.bygning = CAST(:bygning_id AS UUID)
+        GROUP BY sl.sensor_type
+        ORDER BY antal DESC
+        """
+        return self.query_df(sql, {'bygning_id': bygning_id})
+
+    def sensor_with_usecases(self, bygning_id):
+        """Sensorer med tilhørende use cases for en bygning"""
+        sql = f"""
+        WITH sensor_with_uc_names AS (
+            SELECT 
+                sl.sensor_type,
+                sl.antal,
+                sl.pris_total_min AS pris_min,
+                sl.pris_total_max AS pris_max,
+                uc.use_case_navn
+            FROM {self.schema}.bbr_sensor_linje sl,
+                 unnest(sl.use_case_ids) AS uc_id
+            LEFT JOIN {self.schema}.use_cases uc ON uc.id = uc_id
+            WHERE sl.bygning = CAST(:bygning_id AS UUID)
+        )
+        SELECT 
+            sensor_type,
+            SUM(antal) AS antal,
+            SUM(pris_min) AS pris_min,
+            SUM(pris_max) AS pris_max,
+            STRING_AGG(DISTINCT use_case_navn, ', ' ORDER BY use_case_navn) AS use_cases
+        FROM sensor_with_uc_names
+        GROUP BY sensor_type
+        ORDER BY antal DESC
+        """
+        return self.query_df(sql, {'bygning_id': bygning_id})
+
+    def kombo_alternativer(self, bygning_id):
+        """Kombo-alternativer for en bygning via database-funktion"""
+        try:
+            sql = f"SELECT {self.schema}.get_kombo_alternativer(CAST(:bygning_id AS UUID)) AS kombos"
+            result = self.query_df(sql, {'bygning_id': bygning_id})
+            if len(result) > 0 and result['kombos'].iloc[0]:
+                import json
+                kombos = result['kombos'].iloc[0]
+                if isinstance(kombos, str):
+                    return json.loads(kombos)
+                if isinstance(kombos, list):
+                    return kombos
+                return []
+            return []
+        except Exception as e:
+            # Fallback hvis funktionen ikke findes - beregn i Python
+            try:
+                return self.kombo_alternativer_fallback(bygning_id)
+            except Exception as e2:
+                # Hvis fallback også fejler, returner tom liste med fejl-info
+                return {'error': f"DB: {e}, Fallback: {e2}"}
+
+    def kombo_alternativer_fallback(self, bygning_id):
+        """Fallback beregning af kombo-alternativer hvis DB-funktion ikke findes"""
+        # Hent antal sensorer per type i bygningen
+        sensor_df = self.sensor_summary(bygning_id)
+        if len(sensor_df) == 0:
+            return []
+    
+        # Hent pris per stk fra iot_sensor_types
+        try:
+            pris_sql = f"""
+            SELECT sensor_type, pris_min_kr, pris_max_kr
+            FROM {self.schema}.iot_sensor_types
+            """
+            pris_df = self.query_df(pris_sql)
+            pris_lookup = {row['sensor_type']: {'pris_min': float(row['pris_min_kr']), 'pris_max': float(row['pris_max_kr'])} 
+                           for _, row in pris_df.iterrows()}
+        except Exception:
+            return []
+    
+        # Hent aktive kombos med deres komponent-priser
+        try:
+            kombo_sql = f"""
+            SELECT 
+                k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr,
+                ARRAY_AGG(ist.sensor_type ORDER BY ist.sensor_type) AS komponenter,
+                SUM(ist.pris_min_kr) AS enkelt_pris_min,
+                SUM(ist.pris_max_kr) AS enkelt_pris_max
+            FROM {self.schema}.iot_sensor_kombos k
+            JOIN {self.schema}.kombo_komponenter kk ON kk.kombo_id = k.id
+            JOIN {self.schema}.iot_sensor_types ist ON ist.id = kk.sensor_type_id
+            WHERE k.aktiv = TRUE
+            GROUP BY k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr
+            """
+            kombo_df = self.query_df(kombo_sql)
+        except Exception:
+            return []
+    
+        if len(kombo_df) == 0:
+            return []
+    
+        # Byg sensor antal lookup (kun antal, ikke pris)
+        sensor_antal = {}
+        for _, row in sensor_df.iterrows():
+            sensor_antal[row['sensor_type']] = int(row['antal'])
+    
+        # Alias: Bevægelsessensor og Tilstedeværelsessensor er ens (PIR)
+        pir_aliases = ['Bevægelsessensor', 'Tilstedeværelsessensor']
+        pir_antal = None
+        pir_name = None
+        for alias in pir_aliases:
+            if alias in sensor_antal:
+                pir_antal = sensor_antal[alias]
+                pir_name = alias
+                break
+    
+        # Tilføj aliaser
+        if pir_antal is not None:
+            for alias in pir_aliases:
+                if alias not in sensor_antal:
+                    sensor_antal[alias] = pir_antal
+    
+        alternativer = []
+        for _, kombo in kombo_df.iterrows():
+            komponenter = kombo['komponenter']
+            if komponenter is None or (hasattr(komponenter, '__len__') and len(komponenter) == 0):
+                continue
+        
+            if hasattr(komponenter, 'tolist'):
+                komponenter = komponenter.tolist()
+            elif not isinstance(komponenter, list):
+                komponenter = list(komponenter)
+        
+            # Fjern duplikater (f.eks. både Bevægelsessensor og Tilstedeværelsessensor)
+            unique_komponenter = []
+            has_pir = False
+            for k in komponenter:
+                if k in pir_aliases:
+                    if not has_pir:
+                        has_pir = True
+                        unique_komponenter.append(k)
+                else:
+                    unique_komponenter.append(k)
+        
+            # Tjek om alle komponenter findes i bygningen
+            matched_komponenter = []
+            all_found = True
+            for k in unique_komponenter:
+                if k in sensor_antal:
+                    matched_komponenter.append(k)
+                elif k in pir_aliases and pir_antal is not None:
+                    matched_komponenter.append(pir_name)
+                else:
+                    all_found = False
+                    break
+        
+            if not all_found or len(matched_komponenter) == 0:
+                continue
+        
+            # Antal kombos = minimum antal af alle komponenter
+            try:
+                antal = min(sensor_antal.get(k, 0) for k in matched_komponenter)
+            except (ValueError, KeyError):
+                continue
+            if antal <= 0:
+                continue
+        
+            # Beregn enkelt-pris per stk (sum af komponenternes priser fra iot_sensor_types)
+            enkelt_pris_per_stk_min = sum(pris_lookup.get(k, {'pris_min': 0})['pris_min'] for k in matched_komponenter)
+            enkelt_pris_per_stk_max = sum(pris_lookup.get(k, {'pris_max': 0})['pris_max'] for k in matched_komponenter)
+        
+            # Kombo-pris per stk
+            kombo_pris_per_stk_min = float(kombo['pris_min_kr'])
+            kombo_pris_per_stk_max = float(kombo['pris_max_kr'])
+        
+            # Vis hvis der er POTENTIEL besparelse (enkelt_max > kombo_min)
+            if enkelt_pris_per_stk_max > kombo_pris_per_stk_min:
+                alternativer.append({
+                    'kombo_navn': kombo['kombo_navn'],
+                    'erstatter': matched_komponenter,
+                    'antal': antal,
+                    'kombo_pris_min': kombo_pris_per_stk_min * antal,
+                    'kombo_pris_max': kombo_pris_per_stk_max * antal,
+                    'enkelt_pris_min': enkelt_pris_per_stk_min * antal,
+                    'enkelt_pris_max': enkelt_pris_per_stk_max * antal,
+                    'besparelse_min': (enkelt_pris_per_stk_min - kombo_pris_per_stk_max) * antal,
+                    'besparelse_max': (enkelt_pris_per_stk_max - kombo_pris_per_stk_min) * antal
+                })
+    
+        alternativer.sort(key=lambda x: x['besparelse_max'], reverse=True)
+        return alternativer
+
+    # -------------------------------------------------------------------------
+    # Kataloger (what-if og kombo-mix)
+    # -------------------------------------------------------------------------
+
+    def beregnings_katalog(self):
+        """Katalogtabellerne til what-if beregning"""
+        from .beregning import hent_katalog
+        with self.engine.connect() as conn:
+            return hent_katalog(conn, self.schema)
+
+    def bygning_enheder(self, bygning_id):
+        """BBR-input for bygningens enheder til what-if beregning"""
+        from .beregning import hent_enheder
+        with self.engine.connect() as conn:
+            return hent_enheder(conn, "AND bp.bygning = CAST(:bygning_id AS UUID)", self.schema,
+                                params={'bygning_id': bygning_id})
+
+    def kombo_katalog(self):
+        """Kombo-kataloget som KomboKatalog (kombo.py)"""
+        from .kombo import hent_kombo_katalog
+        with self.engine.connect() as conn:
+            return hent_kombo_katalog(conn, self.schema)
@@ -0,0 +1,77 @@
+"""
+Databaseforbindelse uden Streamlit
+
+Læser samme [database]-sektion som appens secrets.toml, så CLI-værktøjer
+og app bruger de samme credentials.
+
+Forbindelser bruger psycopg (version 3). Den sender parametre separat fra
+SQL-teksten og forbereder en forespørgsel på serveren (prepared statement),
+når samme SQL-tekst er kørt prepare_threshold gange på forbindelsen.
+"""
+
+import os
+import tomllib
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+DEFAULT_SECRETS = os.path.join(".streamlit", "secrets.toml")
+
+# Antal kørsler af samme SQL-tekst før psycopg forbereder den på serveren.
+# None slår prepared statements fra (fx bag PgBouncer i transaction-mode).
+PREPARE_THRESHOLD = 2
+
+# Standard for [pool]-sektionen i secrets.toml
+POOL_STANDARD = {
+    "pool_size": 8,
+    "max_overflow": 4,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+    "statement_timeout_ms": 60000,
+}
+
+
+def laes_secrets(sti=DEFAULT_SECRETS):
+    """Læs secrets.toml som dict"""
+    with open(sti, "rb") as f:
+        return tomllib.load(f)
+
+
+def connection_string(db):
+    """Byg connection string ud fra en [database]-sektion"""
+    return f"postgresql+psycopg://{db['user']}:{db['password']}@{db['host']}:{db['port']}/{db['database']}"
+
+
+def pool_indstillinger(pool=None):
+    """
+    create_engine-argumenter ud fra en [pool]-sektion (manglende nøgler fra
+    POOL_STANDARD). statement_timeout_ms sættes på hver forbindelse; 0 = ingen.
+    """
+    pool = {**POOL_STANDARD, **(pool or {})}
+    kwargs = {
+        "pool_size": int(pool["pool_size"]),
+        "max_overflow": int(pool["max_overflow"]),
+        "pool_pre_ping": bool(pool["pool_pre_ping"]),
+        "pool_recycle": int(pool["pool_recycle"]),
+    }
+    if pool["statement_timeout_ms"]:
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={int(pool['statement_timeout_ms'])}"}
+    return kwargs
+
+
+def lav_engine(url=None, secrets_sti=DEFAULT_SECRETS, prepare_threshold=PREPARE_THRESHOLD,
+               **engine_kwargs):
+    """
+    Opret engine ud fra url, DATABASE_URL eller secrets.toml (i den rækkefølge).
+    postgresql://-URL'er bruger psycopg-driveren.
+    engine_kwargs sendes videre til create_engine (fx pool_size).
+    """
+    url = url or os.environ.get("DATABASE_URL")
+    if url is None:
+        url = connection_string(laes_secrets(secrets_sti)["database"])
+    url = make_url(url)
+    if url.drivername == "postgresql":
+        url = url.set(drivername="postgresql+psycopg")
+    if url.get_driver_name() == "psycopg":
+        engine_kwargs.setdefault("connect_args", {}).setdefault("prepare_threshold", prepare_threshold)
+    return create_engine(url, **engine_kwargs)
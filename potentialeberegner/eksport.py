@@ -0,0 +1,420 @@
+"""
+Eksport af hele porteføljen (CSV, Parquet, XLSX) i konstant hukommelse
+
+Rækkerne hentes med en server-side cursor (stream_results) i bidder på
+bid_stoerrelse rækker og skrives direkte til outputfilen, så hverken
+databasedriveren eller pandas holder hele resultatet. En eksport af hele
+landet på enhedsniveau bruger derfor ikke mere hukommelse end én bid.
+
+Niveauer:
+    enhed       én række per enhed (bbr_potentiale)
+    bygning     én række per bygning (bygning_aggregat)
+    sensor      én række per enhed og sensortype (bbr_sensor_linje)
+    usecase     én række per enhed og use case (bbr_potentiale.use_cases)
+
+Filteret er det normaliserede dashboardfilter (filtre.normaliser_filter).
+XLSX skrives uden ekstra afhængigheder som en zip-fil med ét ark per
+1.048.575 rækker (Excels grænse).
+
+Eksempler:
+    python -m potentialeberegner.eksport --niveau enhed -o enheder.parquet
+    python -m potentialeberegner.eksport --niveau sensor --kommune 0101 -o sensorer.csv
+    python -m potentialeberegner.eksport --niveau bygning --format xlsx -o bygninger.xlsx
+"""
+
+import argparse
+import csv
+import io
+import logging
+import math
+import os
+import re
+import sys
+import time
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from .beregning import DEFAULT_SCHEMA
+from .db import DEFAULT_SECRETS, lav_engine
+from .filtre import ALLE, BYGNING_KOLONNER, ENHED_KOLONNER, filter_sql
+
+log = logging.getLogger(__name__)
+
+BID_STOERRELSE = 50000
+
+# =============================================================================
+# NIVEAUER
+# =============================================================================
+
+NIVEAU_TITLER = {
+    'enhed': 'Enheder',
+    'bygning': 'Bygninger',
+    'sensor': 'Sensorlinjer',
+    'usecase': 'Use cases',
+}
+
+# Ingen ORDER BY: rækkerne skal kunne streames uden at databasen sorterer alt først
+_NIVEAU_SQL = {
+    'enhed': """
+    SELECT
+        bp.id AS enhed_id,
+        bp.id_lokalid AS enhed_uuid,
+        bp.bygning AS bygning_id,
+        bp.kommunekode,
+        bp.adressebetegnelse AS adresse,
+        bp.enh020_enhedens_anvendelse AS anvendelseskode,
+        bp.enh020_enhedens_anvendelse_txt AS anvendelse,
+        bp.enh026_enhedenssamledeareal AS areal_m2,
+        bp.antal_toiletter,
+        bp.antal_badevaerelser,
+        bp.antal_koekken,
+        bp.antal_use_cases,
+        bp.antal_sensor_typer,
+        bp.total_antal_sensorer,
+        bp.samlet_investering_min_kr,
+        bp.samlet_investering_max_kr
+    FROM {schema}.bbr_potentiale bp
+    WHERE TRUE {filter}
+    """,
+    'bygning': """
+    SELECT
+        bygning_id,
+        adresse,
+        kommunekode,
+        antal_enheder,
+        samlet_areal_m2,
+        anvendelsestyper,
+        total_toiletter,
+        total_badevaerelser,
+        total_koekken,
+        total_use_cases,
+        total_sensorer,
+        investering_min_kr,
+        investering_max_kr,
+        investerings_niveau,
+        latitude,
+        longitude
+    FROM {schema}.bygning_aggregat
+    WHERE TRUE {filter}
+    """,
+    'sensor': """
+    SELECT
+        sl.enhed_id,
+        sl.bygning AS bygning_id,
+        bp.kommunekode,
+        bp.adressebetegnelse AS adresse,
+        sl.sensor_type,
+        sl.antal,
+        sl.pris_min,
+        sl.pris_max,
+        sl.pris_total_min,
+        sl.pris_total_max,
+        sl.er_primaer,
+        sl.use_case_ids
+    FROM {schema}.bbr_sensor_linje sl
+    JOIN {schema}.bbr_potentiale bp ON bp.id = sl.enhed_id
+    WHERE TRUE {filter}
+    """,
+    'usecase': """
+    SELECT
+        bp.id AS enhed_id,
+        bp.bygning AS bygning_id,
+        bp.kommunekode,
+        bp.adressebetegnelse AS adresse,
+        (uc->>'id')::INTEGER AS use_case_id,
+        uc->>'navn' AS use_case_navn,
+        uc->>'kategori' AS kategori,
+        (uc->>'relevans')::INTEGER AS relevans
+    FROM {schema}.bbr_potentiale bp
+    CROSS JOIN LATERAL jsonb_array_elements(bp.use_cases) AS uc
+    WHERE TRUE {filter}
+    """,
+}
+
+
+def eksport_sql(niveau, filtr=ALLE, schema=DEFAULT_SCHEMA):
+    """(SQL, parametre) for et niveau og et normaliseret filter"""
+    kolonner = BYGNING_KOLONNER if niveau == 'bygning' else ENHED_KOLONNER
+    where, params = filter_sql(filtr, kolonner)
+    return _NIVEAU_SQL[niveau].format(schema=schema, filter=where), params
+
+
+def filnavn(niveau, filtr, format_):
+    """Filnavn til download, fx 'potentiale_enhed_kommune_0101.csv'"""
+    type_, vaerdi = filtr
+    dele = ['potentiale', niveau]
+    if type_ != 'alle':
+        dele += [type_, re.sub(r'[^0-9a-zA-ZæøåÆØÅ-]+', '_', vaerdi).strip('_')[:40]]
+    return f"{'_'.join(dele)}.{format_}"
+
+# =============================================================================
+# STREAMING FRA DATABASEN
+# =============================================================================
+
+# PostgreSQL type-OID -> (arrow-type, konvertering af Python-værdien eller None)
+_TYPER = {
+    16: (pa.bool_(), None),                                   # boolean
+    20: (pa.int64(), None),                                   # bigint
+    21: (pa.int16(), None),                                   # smallint
+    23: (pa.int32(), None),                                   # integer
+    700: (pa.float32(), None),                                # real
+    701: (pa.float64(), None),                                # double precision
+    1700: (pa.float64(), float),                              # numeric
+    25: (pa.string(), None),                                  # text
+    1042: (pa.string(), None),                                # char
+    1043: (pa.string(), None),                                # varchar
+    2950: (pa.string(), str),                                 # uuid
+    1082: (pa.date32(), None),                                # date
+    1114: (pa.timestamp('us'), None),                         # timestamp
+    1184: (pa.timestamp('us', tz='UTC'), None),               # timestamptz
+    1007: (pa.list_(pa.int32()), None),                       # integer[]
+}
+_UKENDT_TYPE = (pa.string(), str)
+
+
+def _kolonne_typer(cursor):
+    """(arrow-type, konvertering) per kolonne ud fra cursorens beskrivelse"""
+    return [_TYPER.get(getattr(kolonne, 'type_code', None), _UKENDT_TYPE)
+            for kolonne in cursor.description]
+
+
+def hent_bidder(conn, sql, params=None, bid_stoerrelse=BID_STOERRELSE):
+    """
+    Kør sql med en server-side cursor. Returnerer (kolonner, typer, bidder),
+    hvor bidder giver lister med højst bid_stoerrelse rækker.
+    """
+    result = conn.execution_options(stream_results=True, max_row_buffer=bid_stoerrelse) \
+        .execute(text(sql), params or {})
+    return list(result.keys()), _kolonne_typer(result.cursor), result.partitions(bid_stoerrelse)
+
+# =============================================================================
+# SKRIVERE
+# =============================================================================
+
+def _csv_tal(vaerdi):
+    """Decimaltal med decimalkomma (1,5) som dansk Excel forventer"""
+    return str(vaerdi).replace('.', ',')
+
+
+def _csv_liste(vaerdi):
+    """Array som '1, 2' - mellemrummet forhindrer Excel i at læse det som et decimaltal"""
+    return ', '.join(str(v) for v in vaerdi)
+
+
+def _csv_formatering(type_):
+    if pa.types.is_floating(type_):
+        return _csv_tal
+    if pa.types.is_list(type_):
+        return _csv_liste
+    return None
+
+
+def skriv_csv(fil, kolonner, typer, bidder):
+    """
+    Semikolonsepareret UTF-8 med BOM (åbner direkte i dansk Excel):
+    decimaltal med decimalkomma og arrays som kommaseparerede lister
+    """
+    tekst = io.TextIOWrapper(fil, encoding='utf-8-sig', newline='')
+    writer = csv.writer(tekst, delimiter=';')
+    writer.writerow(kolonner)
+    formatering = [(i, f) for i, f in enumerate(_csv_formatering(type_) for type_, _ in typer) if f is not None]
+    antal = 0
+    for bid in bidder:
+        if formatering:
+            bid = [list(raekke) for raekke in bid]
+            for raekke in bid:
+                for i, f in formatering:
+                    if raekke[i] is not None:
+                        raekke[i] = f(raekke[i])
+        writer.writerows(bid)
+        antal += len(bid)
+    tekst.flush()
+    tekst.detach()  # fil lukkes af kalderen
+    return antal
+
+
+def skriv_parquet(fil, kolonner, typer, bidder):
+    """zstd-komprimeret Parquet med én row group per bid"""
+    schema = pa.schema([(navn, type_) for navn, (type_, _) in zip(kolonner, typer)])
+    antal = 0
+    with pq.ParquetWriter(fil, schema, compression='zstd') as writer:
+        for bid in bidder:
+            arrays = []
+            for i, (type_, konverter) in enumerate(typer):
+                vaerdier = [raekke[i] for raekke in bid]
+                if konverter is not None:
+                    vaerdier = [None if v is None else konverter(v) for v in vaerdier]
+                arrays.append(pa.array(vaerdier, type=type_))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            antal += len(bid)
+    return antal
+
+
+XLSX_MAX_RAEKKER = 1048576
+_ULOVLIGE_TEGN = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_celle(vaerdi):
+    if vaerdi is None:
+        return '<c/>'
+    if isinstance(vaerdi, bool):
+        return f'<c t="b"><v>{int(vaerdi)}</v></c>'
+    if isinstance(vaerdi, (int, float, Decimal)):
+        if isinstance(vaerdi, float) and not math.isfinite(vaerdi):
+            return '<c/>'
+        return f'<c><v>{vaerdi}</v></c>'
+    tekst = escape(_ULOVLIGE_TEGN.sub('', str(vaerdi))[:32767])
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{tekst}</t></is></c>'
+
+
+def _xlsx_raekke(vaerdier):
+    return '<row>' + ''.join(_xlsx_celle(v) for v in vaerdier) + '</row>'
+
+
+_XLSX_ARK_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                   '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                   '<sheetData>')
+_XLSX_ARK_SLUT = '</sheetData></worksheet>'
+
+
+def _xlsx_rammer(antal_ark):
+    """De faste XML-dele af en projektmappe med antal_ark ark"""
+    ark = range(1, antal_ark + 1)
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for n in ark)
+            + '</Types>'),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="xl/workbook.xml" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+            '</Relationships>'),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(f'<sheet name="Ark{n}" sheetId="{n}" r:id="rId{n}"/>' for n in ark)
+            + '</sheets></workbook>'),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                      'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                      for n in ark)
+            + '</Relationships>'),
+    }
+
+
+def skriv_xlsx(fil, kolonner, typer, bidder):
+    """
+    XLSX skrevet række for række direkte i zip-filen (inline-strenge, ingen
+    styles). Over XLSX_MAX_RAEKKER rækker fortsættes i et nyt ark med overskrifter.
+    """
+    overskrift = _xlsx_raekke(kolonner).encode('utf-8')
+    antal = 0
+    antal_ark = 0
+    with zipfile.ZipFile(fil, 'w', zipfile.ZIP_DEFLATED) as zf:
+        ark = None
+        i_ark = 0
+        try:
+            for bid in bidder:
+                for raekke in bid:
+                    if ark is None or i_ark == XLSX_MAX_RAEKKER:
+                        if ark is not None:
+                            ark.write(_XLSX_ARK_SLUT.encode('utf-8'))
+                            ark.close()
+                        antal_ark += 1
+                        ark = zf.open(f'xl/worksheets/sheet{antal_ark}.xml', 'w', force_zip64=True)
+                        ark.write(_XLSX_ARK_START.encode('utf-8') + overskrift)
+                        i_ark = 1
+                    ark.write(_xlsx_raekke(raekke).encode('utf-8'))
+                    i_ark += 1
+                antal += len(bid)
+            if ark is None:
+                # Tomt resultat: ét ark med overskrifterne
+                antal_ark = 1
+                ark = zf.open('xl/worksheets/sheet1.xml', 'w')
+                ark.write(_XLSX_ARK_START.encode('utf-8') + overskrift)
+            ark.write(_XLSX_ARK_SLUT.encode('utf-8'))
+        finally:
+            if ark is not None:
+                ark.close()
+        for navn, xml in _xlsx_rammer(antal_ark).items():
+            zf.writestr(navn, xml)
+    return antal
+
+
+FORMATER = {
+    'csv': (skriv_csv, 'text/csv'),
+    'parquet': (skriv_parquet, 'application/vnd.apache.parquet'),
+    'xlsx': (skriv_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# =============================================================================
+# EKSPORT
+# =============================================================================
+
+def eksporter(engine, niveau, filtr, format_, fil, schema=DEFAULT_SCHEMA, bid_stoerrelse=BID_STOERRELSE):
+    """Skriv niveau for filtr til den binære fil fil i format_. Returnerer antal rækker."""
+    skriv = FORMATER[format_][0]
+    sql, params = eksport_sql(niveau, filtr, schema)
+    with engine.connect() as conn:
+        kolonner, typer, bidder = hent_bidder(conn, sql, params, bid_stoerrelse)
+        return skriv(fil, kolonner, typer, bidder)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eksporter potentialet som CSV, Parquet eller XLSX")
+    parser.add_argument('--niveau', choices=list(NIVEAU_TITLER), default='enhed')
+    parser.add_argument('--format', choices=list(FORMATER),
+                        help="Filformat (default: ud fra filendelsen på -o)")
+    parser.add_argument('-o', '--output', required=True, help="Outputfil")
+    filter_gruppe = parser.add_mutually_exclusive_group()
+    filter_gruppe.add_argument('--kommune', help="Kun denne kommunekode")
+    filter_gruppe.add_argument('--adresse', help="Kun adresser der indeholder teksten")
+    filter_gruppe.add_argument('--bygning', help="Kun dette bygnings-UUID")
+    parser.add_argument('--bid', type=int, default=BID_STOERRELSE, help="Rækker per bid fra databasen")
+    parser.add_argument('--db-url', help="Database-URL (ellers DATABASE_URL eller secrets.toml)")
+    parser.add_argument('--secrets', default=DEFAULT_SECRETS, help="Sti til secrets.toml")
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    format_ = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if format_ not in FORMATER:
+        parser.error(f"ukendt format '{format_}' - angiv --format")
+    if args.kommune:
+        filtr = ('kommune', args.kommune)
+    elif args.adresse:
+        filtr = ('adresse', args.adresse.lower())
+    elif args.bygning:
+        filtr = ('bygning', args.bygning.lower())
+    else:
+        filtr = ALLE
+
+    engine = lav_engine(args.db_url, args.secrets, pool_size=1, max_overflow=0)
+    start = time.monotonic()
+    with open(args.output, 'wb') as fil:
+        antal = eksporter(engine, args.niveau, filtr, format_, fil, args.schema, args.bid)
+    log.info("%s rækker (%s) skrevet til %s på %.1f s",
+             f"{antal:,}", NIVEAU_TITLER[args.niveau].lower(), args.output, time.monotonic() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
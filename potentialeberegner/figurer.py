@@ -0,0 +1,215 @@
+"""
+Figurer og tabeller til dashboard og rapporter
+
+Plotly-figurerne og visningstabellerne bygges her ud fra de samme DataFrames
+som dashboardets hentefunktioner returnerer, så app.py og rapportgeneratoren
+(rapport.py) viser de samme grafer.
+
+plotly importeres først i figurfunktionerne, så dashboardet ikke betaler for
+det, før en sektion med grafer tegnes.
+"""
+
+import pandas as pd
+
+# =============================================================================
+# OVERBLIK
+# =============================================================================
+
+def anvendelse_investering(anvendelse_df):
+    """Vandret søjlediagram: investering per anvendelsestype (top 15)"""
+    import plotly.express as px
+    fig = px.bar(
+        anvendelse_df.head(15),
+        x='investering_max_kr',
+        y='anvendelse',
+        orientation='h',
+        title='Investering per anvendelsestype (Top 15)',
+        labels={'investering_max_kr': 'Investering (max kr)', 'anvendelse': 'Anvendelse'},
+        color='antal_bygninger',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+
+def anvendelse_fordeling(anvendelse_df):
+    """Donut: fordeling af bygninger på anvendelsestyper (top 10)"""
+    import plotly.express as px
+    fig = px.pie(
+        anvendelse_df.head(10),
+        values='antal_bygninger',
+        names='anvendelse',
+        title='Fordeling af bygninger (Top 10)',
+        hole=0.4
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def sensortyper(sensor_df):
+    """Vandret søjlediagram: mest anvendte sensortyper (top 15)"""
+    import plotly.express as px
+    fig = px.bar(
+        sensor_df.head(15),
+        x='total_antal_sensorer',
+        y='sensor_type',
+        orientation='h',
+        title='Mest anvendte sensortyper (Top 15)',
+        labels={'total_antal_sensorer': 'Antal sensorer', 'sensor_type': 'Sensortype'},
+        color='total_pris_max',
+        color_continuous_scale='Oranges'
+    )
+    fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+
+def kommune_investering(kommune_df):
+    """Søjlediagram: investering per kommune (top 20)"""
+    import plotly.express as px
+    fig = px.bar(
+        kommune_df.head(20),
+        x='kommunekode',
+        y='investering_max_kr',
+        title='Investering per kommune (Top 20)',
+        labels={'investering_max_kr': 'Investering (max kr)', 'kommunekode': 'Kommune'},
+        color='antal_bygninger',
+        color_continuous_scale='Greens'
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def kombo_per_kommune(kombo_kommune_df):
+    """Søjlediagram: kombo-besparelse per kommune (top 20)"""
+    import plotly.express as px
+    fig = px.bar(
+        kombo_kommune_df.head(20),
+        x='kommunekode',
+        y='besparelse_max',
+        title='Besparelse med kombo-sensorer per kommune (bedste enkelte alternativ, Top 20)',
+        labels={'besparelse_max': 'Besparelse (max kr)', 'kommunekode': 'Kommune'},
+        color='antal_bygninger',
+        color_continuous_scale='Greens'
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def use_cases(usecase_df):
+    """Vandret søjlediagram: mest anvendte use cases (top 15)"""
+    import plotly.express as px
+    fig = px.bar(
+        usecase_df.head(15),
+        x='antal_enheder',
+        y='use_case_navn',
+        orientation='h',
+        title='Mest anvendte use cases (Top 15)',
+        labels={'antal_enheder': 'Antal enheder', 'use_case_navn': 'Use case'},
+        color='kategori',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+
+def faciliteter(facilitet_df):
+    """Stablet søjlediagram: toiletter, badeværelser og køkkener per anvendelse"""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for navn, kolonne, farve in [
+        ('Toiletter', 'total_toiletter', '#2196f3'),
+        ('Badeværelser', 'total_badevaerelser', '#4caf50'),
+        ('Køkkener', 'total_koekken', '#ff9800'),
+    ]:
+        fig.add_trace(go.Bar(
+            name=navn,
+            x=facilitet_df['anvendelse'],
+            y=facilitet_df[kolonne],
+            marker_color=farve
+        ))
+    fig.update_layout(
+        barmode='stack',
+        title='Faciliteter per anvendelsestype',
+        xaxis_title='Anvendelse',
+        yaxis_title='Antal',
+        height=450,
+        xaxis_tickangle=-45
+    )
+    return fig
+
+
+def kombo_besparelse_tabel(kombo_df):
+    """Kombo-besparelse per kombo (get_kombo_besparelse()['kombo']) som visningstabel"""
+    kombo_display = kombo_df[['kombo_navn', 'antal_bygninger', 'antal_kombos', 'besparelse_min', 'besparelse_max']].copy()
+    kombo_display.columns = ['Kombo-sensor', 'Bygninger', 'Antal', 'Besparelse (min)', 'Besparelse (max)']
+    kombo_display['Besparelse (min)'] = kombo_display['Besparelse (min)'].apply(lambda x: f"{x:,.0f} kr")
+    kombo_display['Besparelse (max)'] = kombo_display['Besparelse (max)'].apply(lambda x: f"{x:,.0f} kr")
+    return kombo_display
+
+# =============================================================================
+# DETALJE (enkelt bygning)
+# =============================================================================
+
+def sensor_oversigt(breakdown_df):
+    """
+    Unikke sensortyper ud fra sensor_usecase_breakdown. MAX per type, da samme
+    sensor bruges til flere use cases, og priserne allerede er totaler.
+    """
+    sensor_summary = breakdown_df.groupby('sensor_type').agg({
+        'antal_sensorer': 'max',
+        'pris_min': 'max',
+        'pris_max': 'max',
+        'use_case_navn': lambda x: ', '.join(sorted(set(x)))
+    }).reset_index()
+
+    sensor_summary.columns = ['Sensortype', 'Antal', 'Pris total min', 'Pris total max', 'Use cases']
+    sensor_summary['Pris (min-max)'] = sensor_summary.apply(
+        lambda r: f"{r['Pris total min']:,.0f} - {r['Pris total max']:,.0f} kr", axis=1
+    )
+    return sensor_summary.sort_values('Antal', ascending=False)
+
+
+def usecase_oversigt(usecase_df):
+    """Unikke use cases (uden sensor-dubletter) med antal enheder"""
+    return usecase_df.groupby(['use_case_navn', 'kategori']).agg({
+        'antal_enheder': 'first'
+    }).reset_index()
+
+
+def kombo_tabel(raekker):
+    """Kombo-rækker (get_kombo_alternativer-form) som visningstabel"""
+    kombo_df = pd.DataFrame(raekker)
+
+    # Tilføj "Erstatter" kolonne fra 'erstatter' listen
+    kombo_df['Erstatter'] = kombo_df['erstatter'].apply(
+        lambda x: ', '.join(x) if isinstance(x, list) else str(x)
+    )
+
+    kombo_display = kombo_df[['kombo_navn', 'antal', 'Erstatter', 'enkelt_pris_max', 'kombo_pris_max', 'besparelse_max']].copy()
+    kombo_display.columns = ['Kombo-sensor', 'Antal', 'Erstatter (sensortyper)', 'Enkelt-pris', 'Kombo-pris', 'Besparelse']
+    kombo_display['Enkelt-pris'] = kombo_display['Enkelt-pris'].apply(lambda x: f"{x:,.0f} kr")
+    kombo_display['Kombo-pris'] = kombo_display['Kombo-pris'].apply(lambda x: f"{x:,.0f} kr")
+    kombo_display['Besparelse'] = kombo_display['Besparelse'].apply(lambda x: f"{x:,.0f} kr")
+    return kombo_display
+
+
+def sensor_usecase_matrix(breakdown_df):
+    """Heatmap over hvilke sensorer der bruges til hvilke use cases"""
+    import plotly.express as px
+    # Pivot med MAX (ikke sum, da samme sensor bruges til flere use cases)
+    pivot_df = breakdown_df.pivot_table(
+        index='use_case_navn',
+        columns='sensor_type',
+        values='antal_sensorer',
+        fill_value=0,
+        aggfunc='max'
+    )
+    fig = px.imshow(
+        pivot_df,
+        labels=dict(x="Sensortype", y="Use Case", color="Antal"),
+        title="Sensor/Use Case Matrix",
+        color_continuous_scale='Blues',
+        aspect='auto'
+    )
+    fig.update_layout(height=500)
+    return fig
@@ -0,0 +1,63 @@
+"""
+Filtre som bundne parametre
+
+Dashboardets filter (filtertype + værdi) normaliseres til en lille tuple,
+fx ('kommune', '0101') eller ('bygning', '<uuid>'). Tuplen er nøgle i
+st.cache_data, og filter_sql() laver et WHERE-led med :filter_vaerdi i
+stedet for at indsætte værdien i SQL-teksten. SQL-teksten er derfor den
+samme for alle værdier af en filtertype, så databasen kan genbruge planen
+(psycopg forbereder gentagne forespørgsler på serveren, se db.py).
+"""
+
+ALLE = ('alle', None)
+
+# Kolonner per filtertype for bbr_potentiale (alias bp) og bygning_aggregat
+ENHED_KOLONNER = {
+    'kommune': 'bp.kommunekode',
+    'adresse': 'bp.adressebetegnelse',
+    'bygning': 'bp.bygning',
+}
+BYGNING_KOLONNER = {
+    'kommune': 'kommunekode',
+    'adresse': 'adresse',
+    'bygning': 'bygning_id',
+}
+
+
+def normaliser_filter(filter_type, filter_value, bygning_id=None):
+    """
+    Filter fra sidebaren som (type, værdi).
+    Et fundet bygning_id bruges i stedet for adressen (detalje-mode).
+    """
+    vaerdi = (filter_value or '').strip()
+    if filter_type == 'Alle' or not vaerdi:
+        return ALLE
+    if bygning_id and filter_type in ['Adresse', 'Bygning ID']:
+        return ('bygning', str(bygning_id).lower())
+    if filter_type == 'Kommune':
+        return ('kommune', vaerdi)
+    if filter_type == 'Adresse':
+        # ILIKE skelner ikke store/små bogstaver - samme cache-nøgle
+        return ('adresse', vaerdi.lower())
+    if filter_type == 'Bygning ID':
+        return ('bygning', vaerdi.lower())
+    return ALLE
+
+
+def ilike_moenster(tekst):
+    """'%tekst%' hvor %, _ og \\ i teksten matches bogstaveligt"""
+    escaped = tekst.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def filter_sql(filtr, kolonner=ENHED_KOLONNER):
+    """Returnér (WHERE-led der starter med AND, parametre) for et normaliseret filter"""
+    type_, vaerdi = filtr
+    if type_ == 'alle':
+        return '', {}
+    kolonne = kolonner[type_]
+    if type_ == 'adresse':
+        return f"AND {kolonne} ILIKE :filter_vaerdi", {'filter_vaerdi': ilike_moenster(vaerdi)}
+    if type_ == 'bygning':
+        return f"AND {kolonne} = CAST(:filter_vaerdi AS UUID)", {'filter_vaerdi': vaerdi}
+    return f"AND {kolonne} = :filter_vaerdi", {'filter_vaerdi': vaerdi}
@@ -0,0 +1,233 @@
+"""
+Lokal fliseserver for bygningslaget
+
+Serverer vektorfliser (MVT) fra bygning_flise() i bygning_fliser.sql og
+cacher dem i hukommelsen per dataversion, z, x og y. Når dataversion
+ændres (efter en genberegning), tømmes cachen.
+
+Ruter:
+    /bygninger/{z}/{x}/{y}.pbf   vektorflise (lag: bygninger)
+    /version                     nuværende dataversion som JSON
+
+Eksempler:
+    python -m potentialeberegner.fliser --port 8081
+    python -m potentialeberegner.fliser --cache-mb 512 --workers 16
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import text
+
+from .beregning import DEFAULT_SCHEMA
+from .db import DEFAULT_SECRETS, lav_engine
+
+log = logging.getLogger(__name__)
+
+MAX_ZOOM = 22
+MVT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+_FLISE_STI = re.compile(r'^/bygninger/(\d+)/(\d+)/(\d+)\.(?:pbf|mvt)$')
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class FliseCache:
+    """LRU-cache af fliser begrænset af samlet størrelse i bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._fliser = OrderedDict()
+        self._laas = threading.Lock()
+
+    def hent(self, noegle):
+        with self._laas:
+            flise = self._fliser.get(noegle)
+            if flise is not None:
+                self._fliser.move_to_end(noegle)
+            return flise
+
+    def gem(self, noegle, flise):
+        if len(flise) > self.max_bytes:
+            return
+        with self._laas:
+            gammel = self._fliser.pop(noegle, None)
+            if gammel is not None:
+                self.bytes -= len(gammel)
+            self._fliser[noegle] = flise
+            self.bytes += len(flise)
+            while self.bytes > self.max_bytes:
+                _, fjernet = self._fliser.popitem(last=False)
+                self.bytes -= len(fjernet)
+
+    def ryd(self):
+        with self._laas:
+            self._fliser.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._fliser)
+
+# =============================================================================
+# FLISER FRA DATABASEN
+# =============================================================================
+
+class Fliser:
+    """
+    Henter fliser fra databasen gennem en FliseCache.
+
+    dataversion slås højst op hvert version_interval sekund, så en flise
+    fra cachen normalt ikke koster et databasekald.
+    """
+
+    def __init__(self, engine, cache, schema=DEFAULT_SCHEMA, version_interval=10.0):
+        self.engine = engine
+        self.cache = cache
+        self.schema = schema
+        self.version_interval = version_interval
+        self._version = None
+        self._version_hentet = 0.0
+        self._laas = threading.Lock()
+
+    def version(self):
+        """Nuværende dataversion (tømmer cachen hvis den er ændret)"""
+        with self._laas:
+            if time.monotonic() - self._version_hentet >= self.version_interval:
+                with self.engine.connect() as conn:
+                    version = conn.execute(text(f"SELECT version FROM {self.schema}.dataversion")).scalar()
+                if version != self._version:
+                    if self._version is not None:
+                        log.info("Dataversion %s -> %s: cache tømt", self._version, version)
+                    self.cache.ryd()
+                    self._version = version
+                self._version_hentet = time.monotonic()
+            return self._version
+
+    def flise(self, z, x, y):
+        """Returnér (version, flise-bytes)"""
+        version = self.version()
+        noegle = (version, z, x, y)
+        flise = self.cache.hent(noegle)
+        if flise is None:
+            with self.engine.connect() as conn:
+                flise = conn.execute(
+                    text(f"SELECT {self.schema}.bygning_flise(:z, :x, :y)"),
+                    {'z': z, 'x': x, 'y': y},
+                ).scalar()
+            flise = bytes(flise or b'')
+            self.cache.gem(noegle, flise)
+        return version, flise
+
+# =============================================================================
+# HTTP
+# =============================================================================
+
+class FliseHandler(BaseHTTPRequestHandler):
+    """HTTP-handler; server.fliser er en Fliser-instans"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/version':
+            self._svar(200, json.dumps({'version': self.server.fliser.version()}).encode(),
+                       'application/json', {'Cache-Control': 'no-cache'})
+            return
+
+        match = _FLISE_STI.match(url.path)
+        if match is None:
+            self._svar(404, b'', 'text/plain')
+            return
+        z, x, y = (int(v) for v in match.groups())
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            self._svar(404, b'', 'text/plain')
+            return
+
+        try:
+            version, flise = self.server.fliser.flise(z, x, y)
+        except Exception as e:
+            log.error("Flise %s/%s/%s fejlede: %s", z, x, y, e)
+            self._svar(500, b'', 'text/plain')
+            return
+
+        # Klienter der sender ?v=<version> (som dashboardet) får en URL per
+        # version og kan cache fliserne længe; andre revaliderer med ETag.
+        etag = f'"{version}-{z}-{x}-{y}"'
+        if parse_qs(url.query).get('v') == [str(version)]:
+            cache_control = 'public, max-age=86400, immutable'
+        else:
+            cache_control = 'no-cache'
+        headers = {'ETag': etag, 'Cache-Control': cache_control}
+
+        if self.headers.get('If-None-Match') == etag:
+            self._svar(304, b'', MVT_TYPE, headers)
+        else:
+            self._svar(200, flise, MVT_TYPE, headers)
+
+    def _svar(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        # Kortet i dashboardet og Grafana kører på en anden origin
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for navn, vaerdi in (headers or {}).items():
+            self.send_header(navn, vaerdi)
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.address_string(), format % args)
+
+
+def lav_server(fliser, host='127.0.0.1', port=8081):
+    """ThreadingHTTPServer der serverer fliser"""
+    server = ThreadingHTTPServer((host, port), FliseHandler)
+    server.daemon_threads = True
+    server.fliser = fliser
+    return server
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fliseserver for bygningslaget (MVT)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--workers', type=int, default=8, help="Antal databaseforbindelser")
+    parser.add_argument('--cache-mb', type=int, default=256, help="Maks. størrelse af flisecachen i MB")
+    parser.add_argument('--version-interval', type=float, default=10.0,
+                        help="Sekunder mellem opslag af dataversion")
+    parser.add_argument('--db-url', help="Database-URL (ellers DATABASE_URL eller secrets.toml)")
+    parser.add_argument('--secrets', default=DEFAULT_SECRETS, help="Sti til secrets.toml")
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(message)s")
+
+    engine = lav_engine(args.db_url, args.secrets, pool_size=args.workers, max_overflow=2, pool_pre_ping=True)
+    fliser = Fliser(engine, FliseCache(args.cache_mb * 1024 * 1024), args.schema, args.version_interval)
+    server = lav_server(fliser, args.host, args.port)
+
+    log.info("Fliser på http://%s:%s/bygninger/{z}/{x}/{y}.pbf (dataversion %s)",
+             args.host, args.port, fliser.version())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Parallel, genoptagelig genberegning af bbr_potentiale
+
+Opdeler tabellen efter kommunekode eller id-interval og kører
+beregn_potentialer() for hver del på flere forbindelser samtidig. Hver del
+committes for sig og registreres i genberegning_job (genberegning_job.sql),
+så en afbrudt kørsel kan genoptages. Med partitionering.sql er en
+kommune-del netop én partition af bbr_potentiale.
+
+Eksempler:
+    python -m potentialeberegner.genberegning --opdeling kommune --workers 8
+    python -m potentialeberegner.genberegning --opdeling interval --interval 50000
+    python -m potentialeberegner.genberegning --koersel genberegning_20240101_120000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import text
+
+from .beregning import DEFAULT_SCHEMA
+from .db import DEFAULT_SECRETS, lav_engine
+
+log = logging.getLogger(__name__)
+
+# =============================================================================
+# OPRET OG GENOPTAG KØRSLER
+# =============================================================================
+
+def opret_koersel(conn, koersel, opdeling, interval=50000, schema=DEFAULT_SCHEMA):
+    """Indsæt én job-række per del. Returnerer antal dele."""
+    if opdeling == 'kommune':
+        sql = f"""
+        INSERT INTO {schema}.genberegning_job (koersel, opdeling, kommunekode)
+        SELECT DISTINCT :koersel, 'kommune', kommunekode
+        FROM {schema}.bbr_potentiale
+        """
+        params = {'koersel': koersel}
+    else:
+        sql = f"""
+        INSERT INTO {schema}.genberegning_job (koersel, opdeling, id_fra, id_til)
+        SELECT :koersel, 'interval', fra, fra + :interval
+        FROM generate_series(
+            (SELECT MIN(id) FROM {schema}.bbr_potentiale),
+            (SELECT MAX(id) FROM {schema}.bbr_potentiale),
+            :interval
+        ) AS fra
+        """
+        params = {'koersel': koersel, 'interval': interval}
+    return conn.execute(text(sql), params).rowcount
+
+
+def genoptag_koersel(conn, koersel, schema=DEFAULT_SCHEMA):
+    """
+    Gør afbrudte og fejlede dele klar igen. Returnerer antal resterende dele,
+    eller None hvis kørslen ikke findes.
+    """
+    findes = conn.execute(
+        text(f"SELECT 1 FROM {schema}.genberegning_job WHERE koersel = :koersel LIMIT 1"),
+        {'koersel': koersel},
+    ).first()
+    if findes is None:
+        return None
+
+    conn.execute(text(f"""
+        UPDATE {schema}.genberegning_job
+        SET status = 'ventende', fejl = NULL, startet = NULL
+        WHERE koersel = :koersel AND status IN ('koerer', 'fejl')
+    """), {'koersel': koersel})
+    return conn.execute(text(f"""
+        SELECT COUNT(*) FROM {schema}.genberegning_job
+        WHERE koersel = :koersel AND status = 'ventende'
+    """), {'koersel': koersel}).scalar()
+
+# =============================================================================
+# WORKER
+# =============================================================================
+
+def _tag_del(conn, koersel, schema):
+    """Reserver næste ventende del (SKIP LOCKED så workers ikke kolliderer)"""
+    return conn.execute(text(f"""
+        UPDATE {schema}.genberegning_job SET status = 'koerer', startet = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM {schema}.genberegning_job
+            WHERE koersel = :koersel AND status = 'ventende'
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, opdeling, kommunekode, id_fra, id_til
+    """), {'koersel': koersel}).first()
+
+
+def _beregn_del(conn, del_, schema):
+    """Genberegn én del med beregn_potentialer()"""
+    if del_.opdeling == 'kommune' and del_.kommunekode is not None:
+        # Hele kommunen - med partitionering.sql kun kommunens partition
+        return conn.execute(text(f"""
+            SELECT * FROM {schema}.beregn_potentialer(NULL, NULL, :kommunekode)
+        """), {'kommunekode': del_.kommunekode}).one()
+    if del_.opdeling == 'kommune':
+        where, params = "kommunekode IS NULL", {}
+    else:
+        where, params = "id >= :id_fra AND id < :id_til", {'id_fra': del_.id_fra, 'id_til': del_.id_til}
+
+    return conn.execute(text(f"""
+        SELECT * FROM {schema}.beregn_potentialer(
+            ARRAY(SELECT id FROM {schema}.bbr_potentiale WHERE {where})
+        )
+    """), params).one()
+
+
+def koer_worker(engine, koersel, schema=DEFAULT_SCHEMA):
+    """Tag dele indtil køen er tom. Returnerer antal færdige dele."""
+    faerdige = 0
+    while True:
+        with engine.begin() as conn:
+            del_ = _tag_del(conn, koersel, schema)
+        if del_ is None:
+            return faerdige
+
+        try:
+            # Resultat og status committes samlet, så en del aldrig er halvt registreret
+            with engine.begin() as conn:
+                resultat = _beregn_del(conn, del_, schema)
+                conn.execute(text(f"""
+                    UPDATE {schema}.genberegning_job SET
+                        status = 'faerdig',
+                        antal_enheder = :antal_enheder,
+                        antal_opdateret = :antal_opdateret,
+                        varighed = :varighed,
+                        afsluttet = CURRENT_TIMESTAMP
+                    WHERE id = :id
+                """), {
+                    'id': del_.id,
+                    'antal_enheder': resultat.antal_enheder,
+                    'antal_opdateret': resultat.antal_opdateret,
+                    'varighed': resultat.varighed,
+                })
+            faerdige += 1
+            log.info("Del %s (%s) færdig: %s enheder, %s opdateret",
+                     del_.id, del_.kommunekode if del_.opdeling == 'kommune' else f"{del_.id_fra}-{del_.id_til}",
+                     resultat.antal_enheder, resultat.antal_opdateret)
+        except Exception as e:
+            log.error("Del %s fejlede: %s", del_.id, e)
+            with engine.begin() as conn:
+                conn.execute(text(f"""
+                    UPDATE {schema}.genberegning_job
+                    SET status = 'fejl', fejl = :fejl, afsluttet = CURRENT_TIMESTAMP
+                    WHERE id = :id
+                """), {'id': del_.id, 'fejl': str(e)})
+
+
+def koer(engine, koersel, workers, schema=DEFAULT_SCHEMA):
+    """Kør alle ventende dele på et antal parallelle forbindelser"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(koer_worker, engine, koersel, schema) for _ in range(workers)]
+        return sum(f.result() for f in futures)
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel genberegning af bbr_potentiale")
+    parser.add_argument('--opdeling', choices=['kommune', 'interval'], default='kommune',
+                        help="Opdel efter kommunekode eller id-interval (default: kommune)")
+    parser.add_argument('--interval', type=int, default=50000,
+                        help="Antal id'er per del ved --opdeling interval")
+    parser.add_argument('--workers', type=int, default=4, help="Antal parallelle forbindelser")
+    parser.add_argument('--koersel', help="Navn på kørsel; findes den, genoptages den")
+    parser.add_argument('--db-url', help="Database-URL (ellers DATABASE_URL eller secrets.toml)")
+    parser.add_argument('--secrets', default=DEFAULT_SECRETS, help="Sti til secrets.toml")
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(message)s")
+
+    engine = lav_engine(args.db_url, args.secrets, pool_size=args.workers, max_overflow=1)
+    koersel = args.koersel or f"genberegning_{datetime.now():%Y%m%d_%H%M%S}"
+
+    with engine.begin() as conn:
+        resterende = genoptag_koersel(conn, koersel, args.schema)
+        if resterende is None:
+            resterende = opret_koersel(conn, koersel, args.opdeling, args.interval, args.schema)
+            log.info("Kørsel %s oprettet med %s dele", koersel, resterende)
+        else:
+            log.info("Genoptager kørsel %s: %s dele mangler", koersel, resterende)
+
+    start = time.monotonic()
+    faerdige = koer(engine, koersel, args.workers, args.schema)
+
+    with engine.connect() as conn:
+        fejlede = conn.execute(text(f"""
+            SELECT COUNT(*) FROM {args.schema}.genberegning_job
+            WHERE koersel = :koersel AND status = 'fejl'
+        """), {'koersel': koersel}).scalar()
+
+    log.info("Kørsel %s: %s dele færdige, %s fejlede på %.1f s",
+             koersel, faerdige, fejlede, time.monotonic() - start)
+    if fejlede:
+        log.info("Genoptag med: python -m potentialeberegner.genberegning --koersel %s", koersel)
+        return 1
+
+    # Afledte tabeller opdateres først når alle dele er færdige
+    with engine.begin() as conn:
+        trin = conn.execute(text(f"SELECT {args.schema}.afslut_genberegning()")).scalar()
+    log.info("Efterbehandling: %s trin kørt", trin)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Optimalt kombo-mix per bygning
+
+get_kombo_alternativer() (kombo_sensorer.sql) viser hver kombo for sig, og
+alternativerne kan dele sensortyper: "Temperatur + Luftfugtighed" og
+"Temperatur + PIR" bruger begge bygningens temperaturfølere. Besparelserne
+kan derfor ikke summeres.
+
+KomboKatalog vælger i stedet det mix af kombos (resten købes som enkelt-
+sensorer), der giver størst samlet besparelse, uden at en sensor dækkes af
+mere end én kombo:
+
+    maksimér  sum(x_v * besparelse_v)
+    så        sum(x_v for v der indeholder t) <= antal_t   for hver sensortype t
+
+Kataloget oversættes én gang til bitmasker over sensortyperne. En kombo med
+PIR-komponent bliver én variant per PIR-alias (Bevægelsessensor,
+Tilstedeværelsessensor), så begge slags PIR-sensorer kan dækkes. Varianter
+der ikke deler sensortyper (masker uden fælles bits), løses hver for sig.
+Besparelsen per stk er midtpunktet (enkelt_min + enkelt_max - kombo_min -
+kombo_max) / 2 i øre, så sammenligningerne er eksakte heltal.
+
+Løsningen afhænger kun af antal per sensortype i kataloget, så den gemmes
+per signatur (tuple med antal); bygninger med samme sensorantal løses én gang.
+"""
+
+from dataclasses import dataclass
+from itertools import combinations, product
+from math import comb
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .beregning import DEFAULT_SCHEMA
+
+# Sensortyper der er samme fysiske PIR-sensor (PIR_GROUP i kombo_sensorer.sql)
+PIR_ALIASER = ('Bevægelsessensor', 'Tilstedeværelsessensor')
+
+
+@dataclass(frozen=True)
+class _Variant:
+    """Én kombo med konkrete sensortyper (én per komponent)"""
+    kombo: int
+    maske: int
+    bits: tuple
+    typer: tuple
+    enkelt_min: float
+    enkelt_max: float
+    besparelse: int
+
+
+def hent_kombo_katalog(conn, schema=DEFAULT_SCHEMA):
+    """Læs sensorpriser og aktive kombos med komponenter og byg et KomboKatalog"""
+    priser = pd.read_sql(text(f"""
+        SELECT sensor_type, pris_min_kr, pris_max_kr FROM {schema}.iot_sensor_types
+    """), conn)
+    kombos = pd.read_sql(text(f"""
+        SELECT k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr,
+               ARRAY_AGG(DISTINCT ist.sensor_type) AS komponenter
+        FROM {schema}.iot_sensor_kombos k
+        JOIN {schema}.kombo_komponenter kk ON kk.kombo_id = k.id
+        JOIN {schema}.iot_sensor_types ist ON ist.id = kk.sensor_type_id
+        WHERE k.aktiv = TRUE
+        GROUP BY k.id, k.kombo_navn, k.pris_min_kr, k.pris_max_kr
+        ORDER BY k.id
+    """), conn)
+    return KomboKatalog(
+        {r.sensor_type: (float(r.pris_min_kr), float(r.pris_max_kr)) for r in priser.itertuples(index=False)},
+        [(int(r.id), r.kombo_navn, float(r.pris_min_kr), float(r.pris_max_kr), list(r.komponenter))
+         for r in kombos.itertuples(index=False)],
+    )
+
+
+class KomboKatalog:
+    """
+    Kombo-kataloget som bitmasker.
+    sensor_priser: {sensor_type: (pris_min, pris_max)} per stk
+    kombos: [(kombo_id, kombo_navn, pris_min, pris_max, [sensortyper])]
+    """
+
+    def __init__(self, sensor_priser, kombos):
+        self.kombos = [(kombo_id, navn, float(pmin), float(pmax)) for kombo_id, navn, pmin, pmax, _ in kombos]
+        pir = [t for t in PIR_ALIASER if t in sensor_priser]
+
+        varianter = []
+        for nr, (_, _, pmin, pmax, komponenter) in enumerate(kombos):
+            grupper = []
+            for t in dict.fromkeys(komponenter):
+                if t in PIR_ALIASER:
+                    if pir not in grupper:
+                        grupper.append(pir)
+                elif t in sensor_priser:
+                    grupper.append([t])
+                else:
+                    grupper = None  # komponent uden pris kan ikke erstattes
+                    break
+            if not grupper:
+                continue
+            for typer in product(*grupper):
+                enkelt_min = sum(sensor_priser[t][0] for t in typer)
+                enkelt_max = sum(sensor_priser[t][1] for t in typer)
+                besparelse = round((enkelt_min + enkelt_max - pmin - pmax) * 50)
+                if besparelse > 0:
+                    varianter.append((nr, tuple(sorted(typer)), enkelt_min, enkelt_max, besparelse))
+
+        # Én bit per sensortype der indgår i en kombo
+        self.typer = tuple(sorted({t for v in varianter for t in v[1]}))
+        bit = {t: i for i, t in enumerate(self.typer)}
+        self.varianter = [
+            _Variant(nr, sum(1 << bit[t] for t in typer), tuple(bit[t] for t in typer), typer,
+                     enkelt_min, enkelt_max, besparelse)
+            for nr, typer, enkelt_min, enkelt_max, besparelse in varianter
+        ]
+
+        # Uafhængige grupper: varianter forbundet via fælles bits
+        grupper = []
+        for v in self.varianter:
+            maske, medlemmer = v.maske, [v]
+            for gruppe in [g for g in grupper if g[0] & maske]:
+                grupper.remove(gruppe)
+                maske |= gruppe[0]
+                medlemmer += gruppe[1]
+            grupper.append((maske, medlemmer))
+        self._grupper = [_Gruppe(maske, medlemmer) for maske, medlemmer in grupper]
+        self._loesninger = {}
+
+    def signatur(self, sensor_antal):
+        """Antal per sensortype i kataloget (nøglen løsningen gemmes under)"""
+        return tuple(int(sensor_antal.get(t, 0) or 0) for t in self.typer)
+
+    def loes(self, sensor_antal):
+        """
+        Bedste kombo-mix for en bygning ud fra {sensor_type: antal}.
+        Returnerer listen i samme form som get_kombo_alternativer() (én række
+        per valgt kombo), men uden overlap, så besparelserne kan summeres.
+        """
+        signatur = self.signatur(sensor_antal)
+        valg = self._loesninger.get(signatur)
+        if valg is None:
+            valg = self._loesninger[signatur] = self._loes_signatur(signatur)
+        return self._som_raekker(valg)
+
+    def loes_bygninger(self, sensorer):
+        """
+        Bedste mix for mange bygninger. sensorer er en DataFrame med kolonnerne
+        bygning_id, sensor_type og antal (fx fra bbr_sensor_linje).
+        Returnerer én række per (bygning_id, kombo) med kolonnerne fra loes().
+        """
+        bred = sensorer.pivot_table(index='bygning_id', columns='sensor_type', values='antal',
+                                    aggfunc='sum', fill_value=0)
+        bred = bred.reindex(columns=list(self.typer), fill_value=0).astype('int64')
+        raekker = []
+        for bygning_id, antal in zip(bred.index, bred.itertuples(index=False, name=None)):
+            valg = self._loesninger.get(antal)
+            if valg is None:
+                valg = self._loesninger[antal] = self._loes_signatur(antal)
+            for raekke in self._som_raekker(valg):
+                raekke['bygning_id'] = bygning_id
+                raekker.append(raekke)
+        kolonner = ['bygning_id', 'kombo_id', 'kombo_navn', 'erstatter', 'antal',
+                    'kombo_pris_min', 'kombo_pris_max', 'enkelt_pris_min', 'enkelt_pris_max',
+                    'besparelse_min', 'besparelse_max']
+        return pd.DataFrame(raekker, columns=kolonner)
+
+    @property
+    def antal_signaturer(self):
+        """Antal forskellige signaturer der er løst indtil nu"""
+        return len(self._loesninger)
+
+    # -------------------------------------------------------------------------
+    # Løsning
+    # -------------------------------------------------------------------------
+
+    def _loes_signatur(self, signatur):
+        """((variant, antal), ...) for signaturen"""
+        til_stede = sum(1 << i for i, n in enumerate(signatur) if n > 0)
+        valg = []
+        for gruppe in self._grupper:
+            if any(not v.maske & ~til_stede for v in gruppe.varianter):
+                valg += gruppe.loes(signatur)
+        return tuple(valg)
+
+    def _som_raekker(self, valg):
+        per_kombo = {}
+        for v, x in valg:
+            kombo_id, navn, pmin, pmax = self.kombos[v.kombo]
+            r = per_kombo.get(v.kombo)
+            if r is None:
+                r = per_kombo[v.kombo] = {
+                    'kombo_id': kombo_id, 'kombo_navn': navn, 'erstatter': [], 'antal': 0,
+                    'kombo_pris_min': 0.0, 'kombo_pris_max': 0.0,
+                    'enkelt_pris_min': 0.0, 'enkelt_pris_max': 0.0,
+                }
+            r['erstatter'] = sorted(set(r['erstatter']) | set(v.typer))
+            r['antal'] += x
+            r['kombo_pris_min'] += pmin * x
+            r['kombo_pris_max'] += pmax * x
+            r['enkelt_pris_min'] += v.enkelt_min * x
+            r['enkelt_pris_max'] += v.enkelt_max * x
+        raekker = list(per_kombo.values())
+        for r in raekker:
+            r['besparelse_min'] = r['enkelt_pris_min'] - r['kombo_pris_max']
+            r['besparelse_max'] = r['enkelt_pris_max'] - r['kombo_pris_min']
+        raekker.sort(key=lambda r: r['besparelse_max'], reverse=True)
+        return raekker
+
+
+# Største antal delmængder af begrænsninger der prøves ved hjørne-opregningen
+MAX_HJOERNE_KANDIDATER = 50000
+
+
+class _Gruppe:
+    """
+    Varianter der deler sensortyper, løst eksakt med gren og grænse.
+
+    Varianterne sorteres efter besparelse per stk (størst først), og
+    grenene prøver flest stk af en variant først, så første løsning er den
+    grådige. Øvre grænse for resten fra variant i er LP-relaksationen:
+
+        maks sum(x_j * s_j)  så  A x <= antal, x >= 0      (j >= i)
+      = min sum(antal_t * y_t)  over hjørnerne y i {y >= 0 : A^T y >= s}
+
+    Hjørnerne afhænger ikke af antal, så de findes én gang per niveau, og
+    grænsen i en knude er ét matrix-vektor-produkt.
+    """
+
+    def __init__(self, maske, varianter):
+        self.maske = maske
+        self.varianter = sorted(varianter, key=lambda v: (-v.besparelse, len(v.bits), v.kombo))
+        self.bits = sorted({b for v in self.varianter for b in v.bits})
+        lokal = {b: i for i, b in enumerate(self.bits)}
+        self._lokale_bits = [[lokal[b] for b in v.bits] for v in self.varianter]
+
+        A = np.zeros((len(self.varianter), len(self.bits)))
+        for j, lb in enumerate(self._lokale_bits):
+            A[j, lb] = 1
+        s = np.array([v.besparelse for v in self.varianter], dtype=float)
+        # _duale[i]: hjørner for varianterne fra i og frem; _vaegt[i][k, j] = sum af y_k over j's typer
+        self._duale = [_duale_hjoerner(A[i:], s[i:]) for i in range(len(self.varianter) + 1)]
+        self._vaegt = [Y @ A.T for Y in self._duale]
+
+    def loes(self, signatur):
+        """[(variant, antal)] med størst samlet besparelse for signaturen"""
+        varianter, lokale_bits = self.varianter, self._lokale_bits
+        n = len(varianter)
+        antal = np.array([signatur[b] for b in self.bits], dtype=float)
+        bedste = [0, ()]
+        valgt = [0] * n
+
+        def soeg(i, vaerdi):
+            if vaerdi > bedste[0]:
+                bedste[0] = vaerdi
+                bedste[1] = tuple((varianter[j], valgt[j]) for j in range(i) if valgt[j])
+            if i == n:
+                return
+            v, lb = varianter[i], lokale_bits[i]
+            u = int(antal[lb].min())
+            # Grænse for hvert x i 0..u: vaerdi + x*s_i + min_k(y_k . (antal - x*A_i))
+            x = np.arange(u, -1, -1)
+            grundlag = self._duale[i + 1] @ antal
+            graense = vaerdi + x * v.besparelse + (grundlag[None, :] - x[:, None] * self._vaegt[i + 1][:, i][None, :]).min(axis=1)
+            for x_i, g in zip(x.tolist(), graense.tolist()):
+                if g < bedste[0] + 1 - 1e-6:
+                    continue
+                antal[lb] -= x_i
+                valgt[i] = x_i
+                soeg(i + 1, vaerdi + x_i * v.besparelse)
+                antal[lb] += x_i
+            valgt[i] = 0
+
+        soeg(0, 0)
+        return list(bedste[1])
+
+
+def _duale_hjoerner(A, s):
+    """
+    Hjørnerne i {y >= 0 : A y >= s} (A: varianter × typer med 0/1), uden
+    hjørner der er mindst lige så store i alle typer som et andet. Er der for
+    mange kombinationer at prøve, bruges kun y_t = største s_j / |j| over
+    varianterne med t (gyldig, men løsere grænse).
+    """
+    n, T = A.shape
+    if n == 0:
+        return np.zeros((1, T))
+    G = np.vstack([A, np.eye(T)])
+    h = np.concatenate([s, np.zeros(T)])
+    if comb(n + T, T) > MAX_HJOERNE_KANDIDATER:
+        return np.max(A * (s / A.sum(axis=1))[:, None], axis=0)[None, :]
+
+    valg = np.array(list(combinations(range(n + T), T)))
+    M = G[valg]
+    regulaer = np.abs(np.linalg.det(M)) > 1e-9
+    Y = np.linalg.solve(M[regulaer], h[valg[regulaer]][..., None])[..., 0]
+    mulig = (Y >= -1e-9).all(axis=1) & (Y @ A.T >= s - 1e-6).all(axis=1)
+    Y = np.unique(np.round(np.clip(Y[mulig], 0, None), 9), axis=0)
+    domineret = [
+        any(k != j and (Y[j] <= Y[k]).all() and (Y[j] < Y[k]).any() for j in range(len(Y)))
+        for k in range(len(Y))
+    ]
+    return Y[~np.array(domineret, dtype=bool)]
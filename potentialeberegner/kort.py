@@ -0,0 +1,276 @@
+"""
+Kortlag til bygningskortet
+
+Farve, radius og popup-felter beregnes kolonnevis, og alle bygninger sendes
+som ét kompakt data-array til et FastMarkerCluster-lag. Markører og popups
+oprettes i browseren, så HTML-størrelsen vokser med data og ikke med
+folium-objekter per bygning.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from folium.plugins import FastMarkerCluster, VectorGridProtobuf
+
+# Farvepalette for anvendelser
+ANVENDELSE_FARVER = {
+    'Daginstitution': '#e41a1c',
+    '(UDFASES) Daginstitution.': '#e41a1c',
+    'Grundskole': '#377eb8',
+    'Universitet': '#4daf4a',
+    'Anden enhed til undervisning og forskning': '#4daf4a',
+    'Enhed til kontor': '#984ea3',
+    '(UDFASES) Offentlig administration.': '#984ea3',
+    'Bibliotek': '#ff7f00',
+    'Forsamlingshus': '#ffff33',
+    'Anden enhed til kulturelle formål': '#a65628',
+    'Sundhedscenter, lægehus, fødeklinik mv.': '#f781bf',
+    'Svømmehal': '#00bcd4',
+    'Idrætshal': '#2196f3',
+    'Anden enhed til idrætsformål': '#03a9f4',
+    'Klubhus i forbindelse med fritid- og idræt': '#009688',
+    'Feriecenter, center til campingplads mv.': '#8bc34a',
+    'Bolig i etageejendom, flerfamiliehus eller to-familiehus': '#795548',
+    'Bolig i døgninstitution': '#9e9e9e',
+}
+STANDARD_FARVE = '#999999'
+
+# Fra dette zoomniveau vises hver bygning som sin egen cirkel
+ZOOM_UDEN_KLYNGER = 14
+
+# =============================================================================
+# FARVE OG RADIUS
+# =============================================================================
+
+def get_color(anvendelse):
+    """Returner farve for anvendelse"""
+    if pd.isna(anvendelse):
+        return STANDARD_FARVE
+    first_type = anvendelse.split(',')[0].strip()
+    return ANVENDELSE_FARVER.get(first_type, STANDARD_FARVE)
+
+
+def get_radius(investering):
+    """Beregn radius baseret på investering"""
+    if pd.isna(investering) or investering <= 0:
+        return 4
+    return min(4 + np.sqrt(investering) / 50, 20)
+
+
+def farver(anvendelsestyper):
+    """get_color() for en hel Series"""
+    foerste = anvendelsestyper.str.split(',', n=1).str[0].str.strip()
+    return foerste.map(ANVENDELSE_FARVER).fillna(STANDARD_FARVE)
+
+
+def radier(investering):
+    """get_radius() for en hel Series"""
+    investering = pd.to_numeric(investering, errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        radius = np.minimum(4 + np.sqrt(investering) / 50, 20)
+    return np.where(np.isnan(investering) | (investering <= 0), 4, radius).round(1)
+
+# =============================================================================
+# KORTLAG
+# =============================================================================
+
+# Kolonnerækkefølge i data-arrayet (skal matche _MARKER_JS).
+# Tekstkolonner med få forskellige værdier sendes som indeks i en opslagsliste.
+_KOLONNER = [
+    'latitude', 'longitude', 'farve', 'radius',
+    'adresse', 'anvendelsestyper', 'kommunekode', 'antal_enheder',
+    'total_sensorer', 'investering_min_kr', 'investering_max_kr',
+    'investerings_niveau', 'bygning_kort',
+]
+_OPSLAG_KOLONNER = ['farve', 'anvendelsestyper', 'kommunekode', 'investerings_niveau']
+
+_MARKER_JS = """
+(function () {
+    var opslag = %(opslag)s;
+    function tal(v) { return Number(v || 0).toLocaleString('en-US', {maximumFractionDigits: 0}); }
+    function esc(v) {
+        return String(v === null || v === undefined ? '' : v)
+            .replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    }
+    return function (row) {
+        var farve = opslag.farve[row[2]];
+        var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+            radius: row[3], color: farve, fill: true, fillColor: farve,
+            fillOpacity: 0.7, weight: 1
+        });
+        marker.bindPopup(function () {
+            return '<div style="min-width: 250px;">'
+                + '<h4 style="margin: 0 0 10px 0;">' + esc(row[4] || 'Ukendt adresse') + '</h4>'
+                + '<table style="width: 100%%; font-size: 12px;">'
+                + '<tr><td><b>Anvendelse:</b></td><td>' + esc(opslag.anvendelsestyper[row[5]]) + '</td></tr>'
+                + '<tr><td><b>Kommune:</b></td><td>' + esc(opslag.kommunekode[row[6]]) + '</td></tr>'
+                + '<tr><td><b>Enheder:</b></td><td>' + tal(row[7]) + '</td></tr>'
+                + '<tr><td><b>Sensorer:</b></td><td>' + tal(row[8]) + '</td></tr>'
+                + '<tr><td><b>Investering:</b></td><td>' + tal(row[9]) + ' - ' + tal(row[10]) + ' kr</td></tr>'
+                + '<tr><td><b>Niveau:</b></td><td>' + esc(opslag.investerings_niveau[row[11]]) + '</td></tr>'
+                + '</table>'
+                + '<p style="margin: 10px 0 0 0; font-size: 10px; color: #666;">'
+                + 'Bygning ID: ' + esc(row[12]) + '...</p></div>';
+        }, {maxWidth: 350});
+        return marker;
+    };
+})()
+"""
+
+
+def bygning_data(df):
+    """
+    Byg data-arrayet og opslagslisterne til kortlaget kolonnevis.
+
+    df skal have latitude/longitude (WGS84) og kolonnerne fra bygning_aggregat.
+    Rækker uden koordinater udelades. Returnerer (rækker, opslag).
+    """
+    df = df[df['latitude'].notna() & df['longitude'].notna()]
+    data = pd.DataFrame({
+        'latitude': df['latitude'].astype(float).round(6),
+        'longitude': df['longitude'].astype(float).round(6),
+        'farve': farver(df['anvendelsestyper'].astype('string')),
+        'radius': radier(df['investering_max_kr']),
+        'adresse': df['adresse'],
+        'anvendelsestyper': df['anvendelsestyper'],
+        'kommunekode': df['kommunekode'],
+        'antal_enheder': df['antal_enheder'],
+        'total_sensorer': df['total_sensorer'],
+        'investering_min_kr': pd.to_numeric(df['investering_min_kr']).round(0),
+        'investering_max_kr': pd.to_numeric(df['investering_max_kr']).round(0),
+        'investerings_niveau': df['investerings_niveau'],
+        'bygning_kort': df['bygning_id'].astype(str).str[:8],
+    }, index=df.index)
+
+    opslag = {}
+    for kolonne in _OPSLAG_KOLONNER:
+        # NULL får koden -1, som slår op til undefined (vises som tom tekst)
+        koder, vaerdier = pd.factorize(data[kolonne])
+        data[kolonne] = koder
+        opslag[kolonne] = [str(v) for v in vaerdier]
+
+    # object-dtype så NaN bliver None (JSON null) i stedet for float NaN
+    data = data[_KOLONNER].astype(object)
+    return data.where(data.notna(), None).to_numpy().tolist(), opslag
+
+
+def bygningslag(df, name='Bygninger'):
+    """Ét FastMarkerCluster-lag med alle bygninger i df"""
+    data, opslag = bygning_data(df)
+    return FastMarkerCluster(
+        data,
+        callback=_MARKER_JS % {'opslag': json.dumps(opslag, ensure_ascii=False).replace('</', '<\\/')},
+        name=name,
+        options={
+            'disableClusteringAtZoom': ZOOM_UDEN_KLYNGER,
+            'chunkedLoading': True,
+            'spiderfyOnMaxZoom': False,
+        },
+    )
+
+# =============================================================================
+# GRID-KLYNGER (lav zoom)
+# =============================================================================
+
+# Under dette zoomniveau hentes grid-klynger i stedet for enkelte bygninger
+KLYNGE_ZOOM = 12
+
+# Antal grid-celler per kortflise (256 px) i hver retning
+CELLER_PER_FLISE = 8
+
+
+def klynge_celle(zoom):
+    """Cellestørrelse i grader for et zoomniveau (ca. 32 px på skærmen)"""
+    return 360 / (2 ** zoom) / CELLER_PER_FLISE
+
+
+_KLYNGE_JS = """
+function (row) {
+    function tal(v) { return Number(v || 0).toLocaleString('en-US', {maximumFractionDigits: 0}); }
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: row[2], color: '#08519c', fill: true, fillColor: '#3182bd',
+        fillOpacity: 0.6, weight: 1
+    });
+    marker.bindTooltip(tal(row[3]) + ' bygninger');
+    marker.bindPopup(function () {
+        return '<div style="min-width: 220px;">'
+            + '<h4 style="margin: 0 0 10px 0;">' + tal(row[3]) + ' bygninger</h4>'
+            + '<table style="width: 100%; font-size: 12px;">'
+            + '<tr><td><b>Enheder:</b></td><td>' + tal(row[4]) + '</td></tr>'
+            + '<tr><td><b>Sensorer:</b></td><td>' + tal(row[5]) + '</td></tr>'
+            + '<tr><td><b>Investering:</b></td><td>' + tal(row[6]) + ' - ' + tal(row[7]) + ' kr</td></tr>'
+            + '</table>'
+            + '<p style="margin: 10px 0 0 0; font-size: 10px; color: #666;">Zoom ind for enkelte bygninger</p></div>';
+    }, {maxWidth: 300});
+    return marker;
+}
+"""
+
+
+def klyngelag(df, name='Bygninger (klynger)'):
+    """
+    Lag med én cirkel per grid-celle. df har kolonnerne fra
+    hent-klynger-forespørgslen (latitude, longitude, antal_bygninger, ...).
+    Radius vokser logaritmisk med summeret investering.
+    """
+    investering = pd.to_numeric(df['investering_max_kr']).fillna(0).to_numpy(dtype=float)
+    data = pd.DataFrame({
+        'latitude': df['latitude'].astype(float).round(6),
+        'longitude': df['longitude'].astype(float).round(6),
+        'radius': np.clip(4 + 3 * np.log10(1 + investering / 1000), 5, 30).round(1),
+        'antal_bygninger': df['antal_bygninger'],
+        'antal_enheder': df['antal_enheder'],
+        'total_sensorer': df['total_sensorer'],
+        'investering_min_kr': pd.to_numeric(df['investering_min_kr']).round(0),
+        'investering_max_kr': investering.round(0),
+    })
+    data = data.astype(object)
+    return FastMarkerCluster(
+        data.where(data.notna(), None).to_numpy().tolist(),
+        callback=_KLYNGE_JS,
+        name=name,
+        # Klyngerne er allerede samlet på serveren
+        options={'disableClusteringAtZoom': 0},
+    )
+
+# =============================================================================
+# VEKTORFLISER (hele landet)
+# =============================================================================
+
+# Samme farve og radius som bygningslag(), beregnet i browseren per punkt
+_FLISE_OPTIONS = """{
+    "rendererFactory": L.canvas.tile,
+    "interactive": true,
+    "maxNativeZoom": 16,
+    "getFeatureId": function (f) { return f.properties.bygning_id; },
+    "vectorTileLayerStyles": {
+        "bygninger": function (p) {
+            var farver = %(farver)s;
+            var foerste = String(p.anvendelsestyper || '').split(',')[0].trim();
+            var farve = farver[foerste] || '%(standard)s';
+            var inv = Number(p.investering_max_kr || 0);
+            return {
+                radius: inv > 0 ? Math.min(4 + Math.sqrt(inv) / 50, 20) : 4,
+                color: farve, weight: 1, fill: true, fillColor: farve, fillOpacity: 0.7
+            };
+        }
+    }
+}"""
+
+
+def flise_lag(url, version=None, name='Bygninger (fliser)'):
+    """
+    Lag med alle bygninger som vektorfliser fra potentialeberegner.fliser.
+
+    url er serverens rod (fx http://localhost:8081). Med version tilføjes
+    ?v=<version>, så browseren kan cache fliserne indtil næste genberegning.
+    """
+    flise_url = url.rstrip('/') + '/bygninger/{z}/{x}/{y}.pbf'
+    if version is not None:
+        flise_url += f'?v={version}'
+    options = _FLISE_OPTIONS % {
+        'farver': json.dumps(ANVENDELSE_FARVER, ensure_ascii=False),
+        'standard': STANDARD_FARVE,
+    }
+    return VectorGridProtobuf(flise_url, name=name, options=options)
@@ -0,0 +1,491 @@
+"""
+Batchrapporter per kommune og per bygning (HTML eller PDF)
+
+Laver statiske rapporter med de samme nøgletal, grafer (figurer.py) og
+kombo-afsnit som dashboardet - uden Streamlit, fx som natligt job:
+
+    index.html              hele landet med links til kommunerapporterne
+    kommune_<kode>.html     én per kommune
+    bygning_<uuid>.html     én per valgt bygning
+
+Data hentes i forælderprocessen med dashboardets forespørgsler (Datalag i
+data.py): overblik, kombo-besparelse og top-bygninger for alle kommuner i én
+forespørgsel (kommune_bundter), og bygning_detaljer() for alle valgte
+bygninger i én forespørgsel.
+Rapporterne tegnes derefter i en procespulje, hvor hver proces får data én
+gang (initializer) og kun modtager en nøgle per rapport.
+
+HTML-rapporterne deler én plotly.min.js i outputmappen og virker uden net.
+PDF kræver weasyprint og kaleido (grafer som SVG).
+
+Eksempler:
+    python -m potentialeberegner.rapport --kommuner alle -o rapporter
+    python -m potentialeberegner.rapport --kommuner 0101 0147 --top-bygninger 10 -o rapporter
+    python -m potentialeberegner.rapport --bygninger <uuid> <uuid> --format pdf -o rapporter
+"""
+
+import argparse
+import html
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from . import figurer
+from .beregning import DEFAULT_SCHEMA
+from .data import Datalag, kombo_mix, mangler_objekt
+from .db import DEFAULT_SECRETS, lav_engine
+from .filtre import ALLE
+
+log = logging.getLogger(__name__)
+
+# =============================================================================
+# DATA
+# =============================================================================
+
+def _kombo_besparelse(datalag, filtr):
+    """Datalag.kombo_besparelse() - tomme dele uden kombo_batch.sql"""
+    try:
+        return datalag.kombo_besparelse(filtr)
+    except Exception as e:
+        if not mangler_objekt(e):
+            raise
+        return {'kombo': pd.DataFrame(), 'kommune': pd.DataFrame()}
+
+
+def hent_kommuner(datalag, kommunekoder=None):
+    """
+    Rapportdata for kommunerne (alle med data hvis kommunekoder er None) og hele
+    landet i én forespørgsel (Datalag.kommune_bundter).
+    Returnerer {kommunekode eller None: {del: DataFrame}} med hele landet
+    først og kommunerne efter investering som i landsrapportens kommunetabel.
+    """
+    try:
+        bundter = datalag.kommune_bundter(kommunekoder)
+    except Exception as e:
+        # Kun når overblik_kube.sql ikke er installeret
+        if not mangler_objekt(e):
+            raise
+        return _hent_kommuner_enkeltvis(datalag, kommunekoder)
+    land = bundter[None]['kommune']
+    med_data = land['kommunekode'].tolist() if len(land) > 0 else []
+    return {kode: bundter[kode] for kode in [None] + med_data if kode in bundter}
+
+
+def _hent_kommuner_enkeltvis(datalag, kommunekoder):
+    """hent_kommuner() med Datalag-forespørgslerne per kommune (overblik fra bbr_potentiale)"""
+    land = datalag.hent_overblik(ALLE)
+    med_data = land['kommune']['kommunekode'].tolist() if len(land['kommune']) > 0 else []
+    if kommunekoder is None:
+        kommunekoder = med_data
+    else:
+        kommunekoder = [kode for kode in med_data if kode in kommunekoder]
+
+    kommuner = {}
+    for kode in [None] + list(kommunekoder):
+        filtr = ('kommune', kode) if kode else ALLE
+        data = dict(land) if kode is None else datalag.hent_overblik(filtr)
+        kombo = _kombo_besparelse(datalag, filtr)
+        data['kombo'] = kombo['kombo']
+        data['kombo_kommune'] = kombo['kommune']
+        data['top'] = datalag.top_bygninger(filtr)
+        kommuner[kode] = data
+    return kommuner
+
+
+def hent_bygninger(datalag, bygning_ids):
+    """
+    Datalag.bygning_bundter() for alle bygninger i én forespørgsel og bedste
+    kombo-mix per bygning. Returnerer {bygning_id: bundt}.
+    """
+    bygninger = datalag.bygning_bundter(bygning_ids)
+    if not bygninger:
+        return bygninger
+
+    try:
+        katalog = datalag.kombo_katalog()
+    except Exception as e:
+        log.warning("Kombo-kataloget kunne ikke hentes (%s) - rapporterne får ikke kombo-mix", e)
+        katalog = None
+    for bundt in bygninger.values():
+        bundt['mix'] = kombo_mix(katalog, bundt['sensor_summary']) if katalog else None
+    return bygninger
+
+# =============================================================================
+# HTML
+# =============================================================================
+
+_CSS = """
+body { font-family: -apple-system, 'Segoe UI', Roboto, sans-serif; max-width: 1200px; margin: 0 auto;
+       padding: 20px; color: #262730; }
+h2 { margin-top: 40px; }
+.banner { background: linear-gradient(135deg, #2e7d32 0%, #4caf50 100%); padding: 25px; border-radius: 12px;
+          color: white; }
+.banner.bygning { background: linear-gradient(135deg, #1e3a5f 0%, #2d5a87 100%); }
+.banner h1 { margin: 0; }
+.banner p { margin: 10px 0 0 0; opacity: .85; }
+.boks { padding: 15px; border-radius: 8px; margin: 15px 0; font-weight: bold; }
+.groen { background: #e8f5e9; border-left: 4px solid #2e7d32; color: #1b5e20; }
+.graa { background: #f5f5f5; border-left: 4px solid #666; color: #333; }
+.info { background: #e3f2fd; padding: 15px; border-radius: 8px; margin: 15px 0; }
+.metrics { display: flex; flex-wrap: wrap; gap: 30px; margin: 15px 0; }
+.metric .label { font-size: .9em; color: #555; }
+.metric .vaerdi { font-size: 1.8em; }
+table.tabel { border-collapse: collapse; width: 100%; margin: 10px 0; font-size: .9em; }
+table.tabel th, table.tabel td { border-bottom: 1px solid #e0e0e0; padding: 6px 8px; text-align: left; }
+.caption { color: #666; font-size: .9em; }
+.figur { page-break-inside: avoid; }
+footer { margin-top: 50px; color: #888; font-size: .85em; }
+"""
+
+
+def _metrics(par):
+    return '<div class="metrics">' + ''.join(
+        f'<div class="metric"><div class="label">{html.escape(navn)}</div>'
+        f'<div class="vaerdi">{html.escape(vaerdi)}</div></div>'
+        for navn, vaerdi in par
+    ) + '</div>'
+
+
+def _tabel(df):
+    return df.to_html(index=False, classes='tabel', border=0, escape=True)
+
+
+def _boks(tekst, klasse='groen'):
+    return f'<div class="boks {klasse}">{html.escape(tekst)}</div>'
+
+
+def _side(titel, indhold, fmt, dataversion):
+    script = '<script src="plotly.min.js"></script>' if fmt == 'html' else ''
+    genereret = f"{datetime.now():%d-%m-%Y %H:%M}"
+    version = f" | dataversion {dataversion}" if dataversion is not None else ""
+    return (f'<!DOCTYPE html>\n<html lang="da"><head><meta charset="utf-8">'
+            f'<title>{html.escape(titel)}</title><style>{_CSS}</style>{script}</head><body>'
+            f'{indhold}<footer>Potentialeberegner v2 | Data fra BBR | Genereret {genereret}{version}'
+            f'</footer></body></html>')
+
+
+def _figur(fig, fmt):
+    if fmt == 'pdf':
+        # weasyprint kører ikke JavaScript - grafen indsættes som SVG (kaleido)
+        svg = fig.to_image(format='svg', width=1100).decode('utf-8')
+        return f'<div class="figur">{svg}</div>'
+    return '<div class="figur">' + fig.to_html(full_html=False, include_plotlyjs=False,
+                                               config={'displayModeBar': False}) + '</div>'
+
+
+def kommune_html(kommunekode, data, fmt='html', links=None, dataversion=None):
+    """
+    Rapport for en kommune (eller hele landet når kommunekode er None) med samme
+    afsnit som dashboardets overblik. links: {kommunekode/bygning_id: filnavn}.
+    """
+    links = links or {}
+    df = data
+    navn = f"kommune {kommunekode}" if kommunekode else "hele landet"
+    dele = [f'<div class="banner"><h1>📈 Statistik for {html.escape(navn)}</h1>'
+            f'<p>Aggregerede nøgletal for alle bygninger i {"kommunen" if kommunekode else "landet"}</p></div>']
+
+    # Statistik
+    if len(df['statistik']) > 0:
+        s = df['statistik'].iloc[0]
+        dele.append(_boks("📊 Nøgletal for separate sensorer"))
+        dele.append(_metrics([
+            ("Bygninger", f"{s['antal_bygninger']:,.0f}"),
+            ("Enheder", f"{s['antal_enheder']:,.0f}"),
+            ("Sensorer", f"{s['total_sensorer']:,.0f}"),
+            ("Investering (max)", f"{s['total_investering_max']:,.0f} kr"),
+            ("Investering (min)", f"{s['total_investering_min']:,.0f} kr"),
+        ]))
+        dele.append('<div class="info"><b>💡 Om tallene:</b> Investeringen er baseret på <b>separate '
+                    'enkelt-sensorer</b> – én sensor per funktion. Med <b>kombo-sensorer</b> kan den samlede '
+                    'investering reduceres væsentligt, se nedenfor.</div>')
+
+    # Kombo-besparelse
+    kombo_df = df['kombo']
+    if len(kombo_df) > 0:
+        besparelse_max = kombo_df['besparelse_max'].sum()
+        dele.append(_boks("✅ Besparelse med kombo-sensorer"))
+        dele.append(_metrics([
+            ("Bygninger med kombo-mulighed", f"{kombo_df['antal_bygninger'].sum():,.0f}"),
+            ("Antal kombo-sensorer", f"{kombo_df['antal_kombos'].sum():,.0f}"),
+            ("Besparelse (bedste enkelte alternativ)", f"{besparelse_max:,.0f} kr"),
+        ]))
+        dele.append(_tabel(figurer.kombo_besparelse_tabel(kombo_df)))
+        dele.append('<p class="caption">Besparelsen er det bedste enkelte kombo-alternativ per bygning, da '
+                    'alternativerne erstatter de samme sensorer. Bygningsrapporterne viser i stedet det mix af '
+                    'kombo-sensorer, der ikke overlapper, og kan derfor vise en større besparelse.</p>')
+
+    # Anvendelse
+    if len(df['anvendelse']) > 0:
+        dele.append('<h2>🏛️ Investering per Anvendelsestype</h2>')
+        dele.append(_figur(figurer.anvendelse_investering(df['anvendelse']), fmt))
+        dele.append(_figur(figurer.anvendelse_fordeling(df['anvendelse']), fmt))
+
+    # Sensorer
+    if len(df['sensor']) > 0:
+        dele.append('<h2>📡 Sensoroversigt</h2>')
+        dele.append(_figur(figurer.sensortyper(df['sensor']), fmt))
+
+    # Kommuner (kun landsrapporten)
+    if kommunekode is None and len(df['kommune']) > 0:
+        dele.append('<h2>🗺️ Kommuneoversigt</h2>')
+        dele.append(_figur(figurer.kommune_investering(df['kommune']), fmt))
+        if len(df['kombo_kommune']) > 0:
+            dele.append(_figur(figurer.kombo_per_kommune(df['kombo_kommune']), fmt))
+        kommune_tabel = df['kommune'][['kommunekode', 'antal_bygninger', 'antal_enheder',
+                                       'total_sensorer', 'investering_max_kr']].copy()
+        kommune_tabel['investering_max_kr'] = kommune_tabel['investering_max_kr'].apply(lambda x: f"{x:,.0f} kr")
+        kommune_tabel['kommunekode'] = [
+            f'<a href="{links[k]}">{html.escape(k)}</a>' if k in links else html.escape(k)
+            for k in kommune_tabel['kommunekode']
+        ]
+        kommune_tabel.columns = ['Kommune', 'Bygninger', 'Enheder', 'Sensorer', 'Investering (max)']
+        dele.append(kommune_tabel.to_html(index=False, classes='tabel', border=0, escape=False))
+
+    # Top bygninger
+    top_df = df['top']
+    if len(top_df) > 0:
+        dele.append('<h2>🏆 Top 20 Bygninger</h2>')
+        top_df = top_df.copy()
+        top_df['investering_min_kr'] = top_df['investering_min_kr'].apply(lambda x: f"{x:,.0f} kr")
+        top_df['investering_max_kr'] = top_df['investering_max_kr'].apply(lambda x: f"{x:,.0f} kr")
+        top_df['adresse'] = [
+            f'<a href="{links[b]}">{html.escape(a or "Ukendt adresse")}</a>' if b in links
+            else html.escape(a or "Ukendt adresse")
+            for b, a in zip(top_df['bygning_id'], top_df['adresse'])
+        ]
+        top_df = top_df.drop(columns='bygning_id').rename(columns={
+            'adresse': 'Adresse', 'anvendelsestyper': 'Anvendelse', 'kommunekode': 'Kommune',
+            'antal_enheder': 'Enheder', 'total_sensorer': 'Sensorer',
+            'investering_min_kr': 'Investering (min)', 'investering_max_kr': 'Investering (max)',
+        })
+        dele.append(top_df.to_html(index=False, classes='tabel', border=0, escape=False))
+
+    # Use cases
+    if len(df['usecase']) > 0:
+        dele.append('<h2>💡 Use Cases</h2>')
+        dele.append(_figur(figurer.use_cases(df['usecase']), fmt))
+
+    # Faciliteter
+    if len(df['facilitet']) > 0:
+        dele.append('<h2>🚿 Faciliteter</h2>')
+        dele.append(_figur(figurer.faciliteter(df['facilitet']), fmt))
+
+    return _side(f"Potentiale - {navn}", '\n'.join(dele), fmt, dataversion)
+
+
+def bygning_html(bygning_id, bundt, fmt='html', dataversion=None):
+    """Rapport for en bygning med samme afsnit som dashboardets detaljevisning"""
+    info_df = bundt['info']
+    breakdown_df = bundt['sensor_usecase_breakdown']
+    usecase_df = bundt['usecase_summary']
+    kombos = bundt.get('kombos') or []
+    mix = bundt.get('mix')
+
+    dele = []
+    titel = bygning_id
+    if len(info_df) > 0:
+        info = info_df.iloc[0]
+        titel = info['adresse'] or 'Ukendt adresse'
+        dele.append(f'<div class="banner bygning"><h1>📍 {html.escape(titel)}</h1>'
+                    f'<p>{html.escape(str(info["anvendelsestyper"]))} | Kommune: '
+                    f'{html.escape(str(info["kommunekode"]))}</p></div>')
+        dele.append(_boks("🏗️ Faciliteter i bygningen", 'graa'))
+        dele.append(_metrics([
+            ("Enheder", f"{info['antal_enheder']:,.0f}"),
+            ("Areal", f"{info['samlet_areal_m2'] or 0:,.0f} m²"),
+            ("Toiletter", f"{info['total_toiletter']:,.0f}"),
+            ("Badeværelser", f"{info['total_badevaerelser']:,.0f}"),
+            ("Køkkener", f"{info['total_koekken']:,.0f}"),
+        ]))
+
+    # Sensoroversigt
+    if len(breakdown_df) > 0:
+        sensor_summary = figurer.sensor_oversigt(breakdown_df)
+        dele.append('<h2>📡 Sensoroversigt – behov per sensortype</h2>')
+        dele.append(_tabel(sensor_summary[['Sensortype', 'Antal', 'Pris (min-max)', 'Use cases']]))
+        dele.append(f'<div class="info"><b>Samlet for separate enkelt-sensorer:</b> '
+                    f'{sensor_summary["Antal"].sum():.0f} sensorer | '
+                    f'{sensor_summary["Pris total min"].sum():,.0f} - '
+                    f'{sensor_summary["Pris total max"].sum():,.0f} kr</div>')
+
+    # Kombo-sensorer
+    if isinstance(kombos, list) and kombos:
+        dele.append('<h2>💰 Kombo-sensorer – den bedste investering</h2>')
+        if mix:
+            total_besparelse = sum(k['besparelse_max'] for k in mix)
+            dele.append(_boks("✅ Anbefalet investering med kombo-sensorer"))
+            dele.append(_metrics([
+                ("Investering (kombo)", f"{sum(k['kombo_pris_min'] for k in mix):,.0f} - "
+                                        f"{sum(k['kombo_pris_max'] for k in mix):,.0f} kr"),
+                ("Antal kombo-sensorer", f"{sum(k['antal'] for k in mix)}"),
+                ("Besparelse vs. enkelt", f"{total_besparelse:,.0f} kr"),
+            ]))
+            dele.append(_tabel(figurer.kombo_tabel(mix)))
+            kombo_liste = ', '.join(f"{k['kombo_navn']} ({k['antal']} stk)" for k in mix)
+            dele.append(f'<div class="info">💰 <b>Samlet potentiel besparelse:</b> {total_besparelse:,.0f} kr – '
+                        f'ved at bruge: {html.escape(kombo_liste)}</div>')
+        elif mix is not None:
+            dele.append('<div class="info">Ingen kombination af kombo-sensorer er billigere end '
+                        'enkelt-sensorer ved middelpriser.</div>')
+        dele.append(f'<h3>Alle kombo-alternativer hver for sig ({len(kombos)})</h3>')
+        dele.append(_tabel(figurer.kombo_tabel(kombos)))
+        dele.append('<p class="caption">Alternativerne kan ikke summeres, da flere kombo-sensorer kan indeholde '
+                    'de samme sensortyper. Anbefalingen er det mix hvor hver sensor højst dækkes af én kombo.</p>')
+
+    # Use cases
+    if len(usecase_df) > 0:
+        usecase_summary = figurer.usecase_oversigt(usecase_df)
+        dele.append('<h2>💡 Use Cases</h2>')
+        dele.append(_tabel(usecase_summary.rename(columns={
+            'use_case_navn': 'Use Case', 'kategori': 'Kategori', 'antal_enheder': 'Antal enheder'
+        })))
+
+    # Sensor/use case-matrix
+    if len(breakdown_df) > 0:
+        dele.append('<h2>🔗 Sensor/Use Case Matrix</h2>')
+        dele.append(_figur(figurer.sensor_usecase_matrix(breakdown_df), fmt))
+
+    return _side(f"Potentiale - {titel}", '\n'.join(dele), fmt, dataversion)
+
+# =============================================================================
+# PROCESPULJE
+# =============================================================================
+
+# Sættes én gang per arbejdsproces af _start_proces()
+_PROCES = {}
+
+
+def _start_proces(kommuner, bygninger, mappe, fmt, links, dataversion):
+    _PROCES.update(kommuner=kommuner, bygninger=bygninger, mappe=mappe, fmt=fmt,
+                   links=links, dataversion=dataversion)
+
+
+def rapport_filnavn(type_, noegle):
+    if type_ == 'bygning':
+        return f"bygning_{noegle}.html"
+    return f"kommune_{noegle}.html" if noegle else "index.html"
+
+
+def _tegn(type_, noegle):
+    """Tegn og skriv én rapport; returnerer stien"""
+    fmt = _PROCES['fmt']
+    if type_ == 'bygning':
+        indhold = bygning_html(noegle, _PROCES['bygninger'][noegle], fmt, _PROCES['dataversion'])
+    else:
+        indhold = kommune_html(noegle, _PROCES['kommuner'][noegle], fmt, _PROCES['links'],
+                               _PROCES['dataversion'])
+    sti = os.path.join(_PROCES['mappe'], rapport_filnavn(type_, noegle))
+    if fmt == 'pdf':
+        from weasyprint import HTML
+        sti = sti[:-len('.html')] + '.pdf'
+        HTML(string=indhold, base_url=_PROCES['mappe']).write_pdf(sti)
+    else:
+        with open(sti, 'w', encoding='utf-8') as f:
+            f.write(indhold)
+    return sti
+
+
+def tegn_rapporter(opgaver, kommuner, bygninger, mappe, fmt='html', workers=None, dataversion=None):
+    """
+    Tegn rapporterne i opgaver ((type, nøgle)-par) i en procespulje.
+    Returnerer (antal skrevet, antal fejlede).
+    """
+    os.makedirs(mappe, exist_ok=True)
+    if fmt == 'html':
+        from plotly.offline import get_plotlyjs
+        with open(os.path.join(mappe, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    # Links mellem rapporterne (kun HTML) - landsrapporten linker til kommunerne,
+    # kommunerapporternes top-lister til bygningerne
+    links = {}
+    if fmt == 'html':
+        links.update({kode: rapport_filnavn('kommune', kode) for type_, kode in opgaver
+                      if type_ == 'kommune' and kode})
+        links.update({b: rapport_filnavn('bygning', b) for type_, b in opgaver if type_ == 'bygning'})
+
+    skrevet = fejlede = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_proces,
+                             initargs=(kommuner, bygninger, mappe, fmt, links, dataversion)) as pulje:
+        fremtider = {pulje.submit(_tegn, type_, noegle): (type_, noegle) for type_, noegle in opgaver}
+        for fremtid in as_completed(fremtider):
+            type_, noegle = fremtider[fremtid]
+            try:
+                fremtid.result()
+                skrevet += 1
+            except Exception as e:
+                log.error("Rapport %s %s fejlede: %s", type_, noegle or 'hele landet', e)
+                fejlede += 1
+            if (skrevet + fejlede) % 50 == 0:
+                log.info("%s/%s rapporter", skrevet + fejlede, len(opgaver))
+    return skrevet, fejlede
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statiske rapporter per kommune og bygning")
+    parser.add_argument('--kommuner', nargs='*', metavar='KODE',
+                        help="Kommunekoder eller 'alle' (landsrapport og én rapport per kommune)")
+    parser.add_argument('--bygninger', nargs='*', default=[], metavar='UUID', help="Bygnings-UUID'er")
+    parser.add_argument('--top-bygninger', type=int, default=0, metavar='N',
+                        help="Rapport for de N bygninger med størst investering per kommune (højst 20)")
+    parser.add_argument('--format', choices=['html', 'pdf'], default='html')
+    parser.add_argument('-o', '--output', default='rapporter', help="Outputmappe")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Antal processer")
+    parser.add_argument('--db-url', help="Database-URL (ellers DATABASE_URL eller secrets.toml)")
+    parser.add_argument('--secrets', default=DEFAULT_SECRETS, help="Sti til secrets.toml")
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    args = parser.parse_args(argv)
+
+    if args.kommuner is None and not args.bygninger:
+        parser.error("angiv --kommuner og/eller --bygninger")
+    if args.top_bygninger and args.kommuner is None:
+        parser.error("--top-bygninger kræver --kommuner")
+    if args.format == 'pdf':
+        try:
+            import kaleido  # noqa: F401
+            import weasyprint  # noqa: F401
+        except ImportError:
+            parser.error("PDF kræver weasyprint og kaleido (pip install weasyprint kaleido)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    datalag = Datalag(lav_engine(args.db_url, args.secrets, pool_size=1, max_overflow=0), args.schema)
+    start = time.monotonic()
+    try:
+        dataversion = datalag.dataversion()
+    except Exception:
+        dataversion = None
+
+    kommuner = {}
+    opgaver = []
+    if args.kommuner is not None:
+        koder = None if not args.kommuner or args.kommuner == ['alle'] else args.kommuner
+        kommuner = hent_kommuner(datalag, koder)
+        opgaver += [('kommune', kode) for kode in kommuner]
+
+    bygning_ids = [b.lower() for b in args.bygninger]
+    for kode, data in kommuner.items():
+        if kode is not None:
+            bygning_ids += data['top']['bygning_id'].tolist()[:min(args.top_bygninger, 20)]
+    bygning_ids = list(dict.fromkeys(bygning_ids))
+    bygninger = hent_bygninger(datalag, bygning_ids)
+    opgaver += [('bygning', b) for b in bygninger]
+
+    log.info("Data til %s rapporter hentet på %.1f s", len(opgaver), time.monotonic() - start)
+    skrevet, fejlede = tegn_rapporter(opgaver, kommuner, bygninger, args.output, args.format,
+                                      args.workers, dataversion)
+    log.info("%s rapporter skrevet til %s, %s fejlede, på %.1f s",
+             skrevet, args.output, fejlede, time.monotonic() - start)
+    return 1 if fejlede else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
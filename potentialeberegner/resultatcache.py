@@ -0,0 +1,253 @@
+"""
+Delt resultatcache på disk (Parquet)
+
+st.cache_data lever i én Streamlit-proces, så hver replika (og hver genstart)
+sender de samme tunge forespørgsler til databasen. ResultatCache gemmer
+resultaterne som komprimerede Parquet-filer i en mappe som alle replikaer
+kan se (fx et delt volume), med nøgle ud fra funktionsnavn og argumenter -
+herunder dataversion, så en genberegning giver nye nøgler.
+
+Understøttede værdier: DataFrame, GeoDataFrame og dict med DataFrames
+(fx overbliksbundterne). Andre værdier caches ikke.
+
+Filer skrives til en midlertidig fil (.tmp) og flyttes på plads
+(os.replace), så en læser aldrig ser en halv fil. Et cache-hit sætter filens
+mtime, og når mappen fylder mere end max_mb (talt op efter hver skrivning, så
+andre processers filer tæller med), slettes de mindst nyligt brugte filer
+(LRU), til den er under 90 % af grænsen. Midlertidige filer tæller med i
+størrelsen, og dem der er ældre end _TMP_MAX_ALDER (efterladt af en proces,
+der gik ned midt i en skrivning), slettes ved næste optælling.
+"""
+
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .data import cache_noegle
+
+log = logging.getLogger(__name__)
+
+# Schema-metadata for en fil med flere DataFrames (dict)
+_TYPE_NOEGLE = b'potentialeberegner.type'
+_KOMPRESSION = 'zstd'
+# Sekunder før en .tmp-fil regnes for efterladt - en skrivning tager langt kortere tid
+_TMP_MAX_ALDER = 300
+
+
+class ResultatCache:
+    """
+    Parquet-filer i mappe, højst max_mb i alt (LRU).
+    Brug cache.cached(funktion) som dekorator, hent()/gem() direkte eller
+    som cache-backend i Datalag (data.py).
+    """
+
+    def __init__(self, mappe, max_mb=1024):
+        self.mappe = mappe
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(mappe, exist_ok=True)
+        self._laas = threading.Lock()
+        self._stoerrelse = 0
+        self.ryd_op()  # tæller mappen op og fjerner efterladte .tmp-filer
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def fra_secrets(cls, sektion):
+        """ResultatCache fra en [resultatcache]-sektion (mappe, max_mb) - None uden mappe"""
+        if not sektion or not sektion.get('mappe'):
+            return None
+        return cls(sektion['mappe'], sektion.get('max_mb', 1024))
+
+    # -------------------------------------------------------------------------
+    # Nøgler og opslag
+    # -------------------------------------------------------------------------
+
+    noegle = staticmethod(cache_noegle)
+
+    def _sti(self, noegle):
+        return os.path.join(self.mappe, f"{noegle}.parquet")
+
+    def hent(self, noegle):
+        """Værdien for noegle, eller None hvis den ikke findes (eller ikke kan læses)"""
+        sti = self._sti(noegle)
+        try:
+            vaerdi = _laes(sti)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            log.warning("Resultatcache: kan ikke læse %s (%s) - slettes", sti, e)
+            _slet(sti)
+            self.misses += 1
+            return None
+        try:
+            os.utime(sti)  # senest brugt (LRU)
+        except OSError:
+            pass  # skrivebeskyttet mappe eller slettet af en anden proces
+        self.hits += 1
+        return vaerdi
+
+    def gem(self, noegle, vaerdi):
+        """Gem vaerdi under noegle; returnerer False hvis værdien ikke kan gemmes"""
+        try:
+            data = _skriv(vaerdi)
+        except Exception as e:
+            log.debug("Resultatcache: %s gemmes ikke (%s)", type(vaerdi).__name__, e)
+            return False
+
+        fd, tmp = tempfile.mkstemp(dir=self.mappe, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._sti(noegle))
+        except OSError as e:
+            log.warning("Resultatcache: kan ikke skrive %s (%s)", noegle, e)
+            _slet(tmp)
+            return False
+
+        # Mappen deles med andre processer - tæl den op igen i stedet for at
+        # lægge egne skrivninger til (og ikke tælle overskrevne filer to gange)
+        filer = self._filer()
+        stoerrelse = sum(stoerrelse for _, stoerrelse, _ in filer)
+        with self._laas:
+            self._stoerrelse = stoerrelse
+        if stoerrelse > self.max_bytes or any(_efterladt(mtime, sti) for mtime, _, sti in filer):
+            self.ryd_op()
+        return True
+
+    def cached(self, funktion):
+        """Dekorator: slå op i cachen før funktionen kaldes, og gem resultatet bagefter"""
+        navn = f"{funktion.__module__}.{funktion.__qualname__}"
+
+        @wraps(funktion)
+        def med_cache(*argumenter, **noegleord):
+            noegle = self.noegle(navn, *argumenter, **noegleord)
+            vaerdi = self.hent(noegle)
+            if vaerdi is None:
+                vaerdi = funktion(*argumenter, **noegleord)
+                self.gem(noegle, vaerdi)
+            return vaerdi
+
+        return med_cache
+
+    # -------------------------------------------------------------------------
+    # LRU-oprydning
+    # -------------------------------------------------------------------------
+
+    def _filer(self):
+        """(mtime, størrelse, sti) for cachefilerne og de midlertidige filer i mappen"""
+        filer = []
+        with os.scandir(self.mappe) as it:
+            for entry in it:
+                if entry.name.endswith(('.parquet', '.tmp')):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # slettet af en anden proces
+                    filer.append((stat.st_mtime, stat.st_size, entry.path))
+        return filer
+
+    def ryd_op(self):
+        """
+        Slet efterladte .tmp-filer og derefter de mindst nyligt brugte
+        cachefiler, til mappen er under 90 % af max_bytes
+        """
+        with self._laas:
+            filer = sorted(self._filer())
+            total = sum(stoerrelse for _, stoerrelse, _ in filer)
+            maal = self.max_bytes * 0.9
+            slettet = 0
+            for mtime, stoerrelse, sti in filer:
+                if _efterladt(mtime, sti):
+                    if _slet(sti):
+                        slettet += 1
+                    total -= stoerrelse
+            for _, stoerrelse, sti in filer:
+                if total <= maal:
+                    break
+                if sti.endswith('.tmp'):
+                    continue  # en igangværende skrivning (efterladte er slettet ovenfor)
+                if _slet(sti):
+                    slettet += 1
+                total -= stoerrelse
+            self._stoerrelse = total
+        if slettet:
+            log.info("Resultatcache: %s filer slettet, %.1f MB tilbage", slettet, total / 1e6)
+
+    @property
+    def nbytes(self):
+        """Omtrentlig størrelse af mappen i bytes (alle processers filer)"""
+        return self._stoerrelse
+
+
+# =============================================================================
+# SERIALISERING
+# =============================================================================
+
+def _parquet_bytes(tabel):
+    buffer = io.BytesIO()
+    pq.write_table(tabel, buffer, compression=_KOMPRESSION)
+    return buffer.getvalue()
+
+
+def _dataframe_bytes(df):
+    if type(df).__name__ == 'GeoDataFrame':
+        # GeoParquet (geometri og CRS i metadata) via geopandas
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, compression=_KOMPRESSION)
+        return buffer.getvalue()
+    return _parquet_bytes(pa.Table.from_pandas(df))
+
+
+def _skriv(vaerdi):
+    """Parquet-bytes for en DataFrame, GeoDataFrame eller dict med DataFrames"""
+    if isinstance(vaerdi, pd.DataFrame):
+        return _dataframe_bytes(vaerdi)
+    if isinstance(vaerdi, dict) and all(isinstance(v, pd.DataFrame) for v in vaerdi.values()):
+        # Én fil: én række per del med delens egen Parquet-fil som bytes
+        tabel = pa.table({
+            'del': pa.array(list(vaerdi), pa.string()),
+            'parquet': pa.array([_dataframe_bytes(df) for df in vaerdi.values()], pa.binary()),
+        })
+        return _parquet_bytes(tabel.replace_schema_metadata({_TYPE_NOEGLE: b'dict'}))
+    raise TypeError(f"{type(vaerdi).__name__} understøttes ikke")
+
+
+def _laes(kilde):
+    """Værdien fra en fil eller Parquet-bytes skrevet af _skriv()"""
+    if isinstance(kilde, bytes):
+        kilde = pa.BufferReader(kilde)
+    tabel = pq.read_table(kilde)
+    metadata = tabel.schema.metadata or {}
+    if metadata.get(_TYPE_NOEGLE) == b'dict':
+        return {
+            del_: _laes(data)
+            for del_, data in zip(tabel.column('del').to_pylist(), tabel.column('parquet').to_pylist())
+        }
+    if b'geo' in metadata:
+        import geopandas as gpd
+        if isinstance(kilde, pa.BufferReader):
+            kilde.seek(0)
+        return gpd.read_parquet(kilde)
+    return tabel.to_pandas()
+
+
+def _efterladt(mtime, sti):
+    """Om sti er en .tmp-fil, som ingen skriver længere er i gang med"""
+    return sti.endswith('.tmp') and time.time() - mtime > _TMP_MAX_ALDER
+
+
+def _slet(sti):
+    try:
+        os.remove(sti)
+        return True
+    except FileNotFoundError:
+        return False
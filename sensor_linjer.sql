@@ -0,0 +1,177 @@
+-- ============================================================================
+-- SENSOR-LINJER - Typet linjetabel med én række per enhed og sensortype
+-- ============================================================================
+-- Baggrund:
+--   Dashboard, Grafana og get_kombo_alternativer() udfolder iot_sensorer med
+--   jsonb_array_elements() og caster tekst til tal ved hver visning.
+--
+--   bbr_sensor_linje indeholder de samme data som iot_sensorer, men typet og
+--   indekseret, så sensor-aggregeringer bliver almindelige GROUP BY.
+--   Tabellen vedligeholdes af statement-triggers på bbr_potentiale, så den
+--   følger med uanset om der skrives af beregn_potentialer(),
+--   update_enhed_potentiale() eller Python-modulet.
+--
+-- Kør EFTER potentialeberegner_v2.sql (før kombo_sensorer.sql).
+-- ============================================================================
+
+SET search_path TO potentialeberegner, public;
+
+-- -----------------------------------------------------------------------------
+-- 1. TABEL
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS bbr_sensor_linje (
+    enhed_id INTEGER NOT NULL REFERENCES bbr_potentiale(id) ON DELETE CASCADE,
+    bygning UUID,                                -- Kopi fra bbr_potentiale til bygningsopslag
+    sensor_type_id INTEGER NOT NULL,
+    sensor_type TEXT NOT NULL,
+    antal INTEGER NOT NULL,
+    pris_min NUMERIC(10,2),                      -- Pris per stk
+    pris_max NUMERIC(10,2),
+    pris_total_min NUMERIC(12,2),                -- antal × pris per stk
+    pris_total_max NUMERIC(12,2),
+    er_primaer BOOLEAN,
+    use_case_ids INTEGER[],                      -- for_use_cases fra iot_sensorer
+    PRIMARY KEY (enhed_id, sensor_type_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bbr_sensor_linje_bygning ON bbr_sensor_linje(bygning);
+CREATE INDEX IF NOT EXISTS idx_bbr_sensor_linje_sensor_type ON bbr_sensor_linje(sensor_type_id);
+
+COMMENT ON TABLE bbr_sensor_linje IS 'Typet udgave af bbr_potentiale.iot_sensorer (én række per enhed og sensortype)';
+
+
+-- -----------------------------------------------------------------------------
+-- 2. FUNKTIONER: Udfold og skriv linjer ud fra iot_sensorer
+-- -----------------------------------------------------------------------------
+-- udfold_sensorer() er en simpel SQL-funktion, så planneren inliner den.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION udfold_sensorer(p_iot_sensorer JSONB)
+RETURNS TABLE(
+    sensor_type_id INTEGER,
+    sensor_type TEXT,
+    antal INTEGER,
+    pris_min NUMERIC,
+    pris_max NUMERIC,
+    pris_total_min NUMERIC,
+    pris_total_max NUMERIC,
+    er_primaer BOOLEAN,
+    use_case_ids INTEGER[]
+) AS $$
+    SELECT
+        (s->>'id')::INTEGER,
+        s->>'type',
+        (s->>'antal')::NUMERIC::INTEGER,
+        (s->>'pris_min')::NUMERIC,
+        (s->>'pris_max')::NUMERIC,
+        (s->>'pris_total_min')::NUMERIC,
+        (s->>'pris_total_max')::NUMERIC,
+        (s->>'er_primaer')::BOOLEAN,
+        ARRAY(SELECT jsonb_array_elements_text(s->'for_use_cases')::INTEGER)
+    FROM jsonb_array_elements(p_iot_sensorer) AS s
+$$ LANGUAGE sql IMMUTABLE;
+
+
+-- p_ids = NULL genopbygger hele tabellen. Bruges til første opfyldning og
+-- som reparation; den løbende vedligeholdelse sker via triggers nedenfor.
+CREATE OR REPLACE FUNCTION skriv_sensor_linjer(p_ids INTEGER[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    IF p_ids IS NULL THEN
+        TRUNCATE potentialeberegner.bbr_sensor_linje;
+    ELSE
+        DELETE FROM potentialeberegner.bbr_sensor_linje
+        WHERE enhed_id IN (SELECT unnest(p_ids));
+    END IF;
+
+    INSERT INTO potentialeberegner.bbr_sensor_linje
+    SELECT bp.id, bp.bygning, s.*
+    FROM potentialeberegner.bbr_potentiale bp,
+         LATERAL potentialeberegner.udfold_sensorer(bp.iot_sensorer) s
+    WHERE p_ids IS NULL OR bp.id IN (SELECT unnest(p_ids));
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- -----------------------------------------------------------------------------
+-- 3. TRIGGERS: Hold linjerne i sync med bbr_potentiale
+-- -----------------------------------------------------------------------------
+-- Statement-triggers med transition tables, så en genberegning af millioner
+-- af enheder skriver linjerne i ét sæt i stedet for én gang per række.
+-- Kun enheder hvor iot_sensorer eller bygning faktisk ændres skrives om, og
+-- de nye værdier læses direkte fra transition-tabellen.
+-- Sletning håndteres af ON DELETE CASCADE (efter partitionering.sql af
+-- triggeren trg_sensor_linjer_delete).
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION trg_sensor_linjer()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO potentialeberegner.bbr_sensor_linje
+        SELECT n.id, n.bygning, s.*
+        FROM nye n,
+             LATERAL potentialeberegner.udfold_sensorer(n.iot_sensorer) s;
+        RETURN NULL;
+    END IF;
+
+    SELECT array_agg(n.id) INTO v_ids
+    FROM nye n
+    JOIN gamle g ON g.id = n.id
+    WHERE (n.iot_sensorer, n.bygning) IS DISTINCT FROM (g.iot_sensorer, g.bygning);
+
+    IF v_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM potentialeberegner.bbr_sensor_linje
+    WHERE enhed_id IN (SELECT unnest(v_ids));
+
+    INSERT INTO potentialeberegner.bbr_sensor_linje
+    SELECT n.id, n.bygning, s.*
+    FROM nye n
+    JOIN unnest(v_ids) AS u(id) ON u.id = n.id,
+         LATERAL potentialeberegner.udfold_sensorer(n.iot_sensorer) s;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sensor_linjer_insert ON bbr_potentiale;
+CREATE TRIGGER trg_sensor_linjer_insert
+AFTER INSERT ON bbr_potentiale
+REFERENCING NEW TABLE AS nye
+FOR EACH STATEMENT EXECUTE FUNCTION trg_sensor_linjer();
+
+DROP TRIGGER IF EXISTS trg_sensor_linjer_update ON bbr_potentiale;
+CREATE TRIGGER trg_sensor_linjer_update
+AFTER UPDATE ON bbr_potentiale
+REFERENCING OLD TABLE AS gamle NEW TABLE AS nye
+FOR EACH STATEMENT EXECUTE FUNCTION trg_sensor_linjer();
+
+
+-- -----------------------------------------------------------------------------
+-- 4. VIEW: v_sensor_anvendelse fra linjetabellen
+-- -----------------------------------------------------------------------------
+-- Samme kolonner som i potentialeberegner_v2.sql, uden JSON-udfoldning.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE VIEW v_sensor_anvendelse AS
+SELECT
+    sl.sensor_type,
+    COUNT(*) AS antal_enheder,
+    SUM(sl.antal) AS total_antal_sensorer,
+    SUM(sl.pris_total_min) AS total_pris_min,
+    SUM(sl.pris_total_max) AS total_pris_max
+FROM bbr_sensor_linje sl
+GROUP BY sl.sensor_type
+ORDER BY total_antal_sensorer DESC;
+
+
+-- -----------------------------------------------------------------------------
+-- 5. FØRSTE OPFYLDNING
+-- -----------------------------------------------------------------------------
+SELECT skriv_sensor_linjer();